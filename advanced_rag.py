@@ -21,7 +21,7 @@ from langchain.prompts import PromptTemplate
 from langchain.schema import BaseRetriever
 
 # Domain-specific embedding sistemi
-from domain_embeddings import TurkishDefenseEmbedding
+from domain_embeddings import TurkishDefenseEmbedding, EmbeddingBatcher
 from defense_vocabulary import DefenseVocabulary
 from langchain.callbacks.manager import CallbackManagerForRetrieverRun
 
@@ -71,6 +71,9 @@ class DeepSearchRetriever:
                 model_kwargs={'device': 'cpu'}
             )
         
+        # Eşzamanlı sorguların embedding'leri tek encode çağrısında birleştirilir
+        self._query_batcher = EmbeddingBatcher(self._encode_query_batch)
+        
         self._load_index()
     
     def _load_index(self):
@@ -83,22 +86,28 @@ class DeepSearchRetriever:
             logger.error(f"Failed to load FAISS index: {e}")
             raise
     
-    def get_relevant_documents(self, query: str) -> List[Document]:
+    def _encode_query_batch(self, queries: List[str]):
+        """Query batch'ini tek seferde encode et"""
+        if self.use_domain_embedding:
+            return self.domain_embedding_system.encode_queries(queries, enhance_domain_terms=True)
+        return self.embedding_model.embed_documents(queries)
+    
+    def embed_query(self, query: str):
+        """Query embedding'i üret (domain-aware)"""
+        # Domain-specific query enhancement
+        if self.use_domain_embedding:
+            # Query analysis ve enhancement
+            query_analysis = self.domain_embedding_system.analyze_query_complexity(query)
+            logger.info(f"Query domain relevance: {query_analysis['domain_relevance']:.2f}")
+        
+        # Query encoding (eşzamanlı isteklerle micro-batch)
+        return self._query_batcher.embed(query)
+    
+    def get_relevant_documents(self, query: str, query_embedding=None) -> List[Document]:
         """Query'e göre ilgili dokümanları getir (domain-aware)"""
         try:
-            # Domain-specific query enhancement
-            if self.use_domain_embedding:
-                # Query analysis ve enhancement
-                query_analysis = self.domain_embedding_system.analyze_query_complexity(query)
-                logger.info(f"Query domain relevance: {query_analysis['domain_relevance']:.2f}")
-                
-                # Enhanced query encoding
-                query_embedding = self.domain_embedding_system.encode_query(
-                    query, enhance_domain_terms=True
-                )
-            else:
-                # Base embedding
-                query_embedding = self.embedding_model.embed_query(query)
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # FAISS ile arama yap
             import faiss
@@ -216,7 +225,13 @@ BELGELER:
             logger.error(f"Failed to initialize RAG system: {e}")
             return False
     
-    def query_documents(self, question: str, query_type: str = "qa") -> Dict[str, Any]:
+    def embed_query(self, question: str):
+        """Soru embedding'i (semantic cache ve retrieval aynı vektörü paylaşır)"""
+        if not self.retriever:
+            return None
+        return self.retriever.embed_query(question)
+    
+    def query_documents(self, question: str, query_type: str = "qa", query_embedding=None) -> Dict[str, Any]:
         """Belgeleri sorgula ve AI-powered yanıt üret"""
         
         if not self.retriever:
@@ -227,7 +242,7 @@ BELGELER:
         
         try:
             # İlgili dokümanları getir
-            relevant_docs = self.retriever.get_relevant_documents(question)
+            relevant_docs = self.retriever.get_relevant_documents(question, query_embedding)
             
             if not relevant_docs:
                 return {
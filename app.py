@@ -17,7 +17,7 @@ from search_optimizer import search_optimizer
 from kobi_reporting import kobi_reporting
 from document_insights import insights_engine
 from security_manager import security_manager
-from database_optimizer import db_optimizer, get_optimized_user_documents, get_dashboard_analytics_optimized
+from database_optimizer import get_db_optimizer, get_optimized_user_documents, get_dashboard_analytics_optimized
 from faiss_optimizer import faiss_optimizer
 from resource_manager import memory_manager, resource_manager, optimize_system_performance, get_system_health
 from advanced_analytics import AdvancedAnalytics, SearchAnalytics
@@ -634,9 +634,36 @@ def rag_query():
             metadata={'query_type': query_type}
         )
         
-        # RAG sorgusu çalıştır
-        result = rag_system.query_documents(question, query_type)
-        
+        # RAG sorgusu çalıştır (aynı/benzer soru daha önce cevaplandıysa cache'ten)
+        query_embedding = None
+        cached = conversation_manager.lookup_exact_answer(user_id, question, query_type)
+        if not cached:
+            try:
+                query_embedding = rag_system.embed_query(question)
+            except Exception as embed_error:
+                print(f"Failed to embed RAG query: {embed_error}")
+
+            cached = conversation_manager.lookup_cached_answer(
+                user_id, question, query_embedding, query_type
+            )
+        if cached:
+            result = {
+                'answer': cached['answer'],
+                'sources': cached['sources'],
+                'query_type': query_type,
+                'timestamp': datetime.now().isoformat(),
+                'cached': True,
+                'success': True
+            }
+        else:
+            result = rag_system.query_documents(question, query_type, query_embedding=query_embedding)
+
+            if result.get('success') and result.get('sources'):
+                conversation_manager.store_answer(
+                    user_id, question, query_embedding, result['answer'],
+                    result['sources'], query_type, session_scope=session_id
+                )
+
         if result.get('success'):
             # Assistant cevabını kaydet
             conversation_manager.add_message(
@@ -736,8 +763,8 @@ def get_chat_sessions():
             session_data.append({
                 'session_id': s.session_id,
                 'title': s.title,
-                'created_at': s.created_at,
-                'last_activity': s.last_activity,
+                'created_at': s.created_at_iso,
+                'last_activity': s.last_activity_iso,
                 'message_count': s.message_count,
                 'is_active': s.is_active
             })
@@ -769,7 +796,7 @@ def get_session_messages(session_id):
                 'message_type': msg.message_type,
                 'content': msg.content,
                 'metadata': msg.metadata,
-                'timestamp': msg.timestamp
+                'timestamp': msg.timestamp_iso
             })
         
         return jsonify({'messages': message_data, 'success': True})
@@ -941,6 +968,10 @@ def upload_file():
                 'result': {'success': False, 'message': 'Geçersiz dosya adı'}
             })
     
+    # Doküman kümesi değişti; önceki RAG cevapları artık geçersiz
+    if any(item['result'].get('success') for item in results):
+        conversation_manager.invalidate_answer_cache()
+    
     return jsonify({'success': True, 'results': results})
 
 @app.route('/delete_file/<int:document_id>', methods=['POST'])
@@ -955,6 +986,7 @@ def delete_file(document_id):
     )
     
     if result['success']:
+        conversation_manager.invalidate_answer_cache()
         flash(result['message'], 'success')
     else:
         flash(result['message'], 'error')
@@ -968,6 +1000,7 @@ def index_file(document_id):
     result = upload_manager.process_file_for_indexing(document_id)
     
     if result['success']:
+        conversation_manager.invalidate_answer_cache()
         flash(result['message'], 'success')
     else:
         flash(result['message'], 'error')
@@ -1340,11 +1373,8 @@ def analyze_document():
             with open(safe_path(file_path), 'r', encoding='latin-1') as f:
                 content = f.read()
         
-        # Perform analysis
-        analysis = insights_engine.analyze_document_content(file_path, content)
-        
-        # Save analysis to database
-        insights_engine.save_analysis_to_db(analysis)
+        # Perform analysis and save it to the database
+        analysis = insights_engine.analyze_and_save(file_path, content)
         
         return jsonify({
             'success': True,
@@ -1440,7 +1470,7 @@ def performance_dashboard():
     current_user = get_current_user()
     
     # Get database performance stats
-    db_stats = db_optimizer.get_performance_stats()
+    db_stats = get_db_optimizer().get_performance_stats()
     
     # Get FAISS performance stats
     search_stats = faiss_optimizer.get_performance_stats()
@@ -1460,7 +1490,7 @@ def get_performance_stats():
     """Get performance statistics (AJAX)"""
     try:
         return jsonify({
-            'database': db_optimizer.get_performance_stats(),
+            'database': get_db_optimizer().get_performance_stats(),
             'search': faiss_optimizer.get_performance_stats(),
             'system': get_system_health()
         })
@@ -5,11 +5,114 @@ Handles professional categorization and security-level based access control
 
 import sqlite3
 import os
+import functools
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 import re
 import json
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+def _build_keyword_automaton(keywords) -> Optional['ahocorasick.Automaton']:
+    """Compile lowercased rule keywords into one Aho-Corasick automaton"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    keywords = sorted(keyword for keyword in keywords if keyword)
+    if not keywords:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+def _match_keywords(text: str, keywords: frozenset, automaton=None) -> set:
+    """Find all keywords occurring in the lowercased text in a single pass"""
+    if automaton is not None:
+        found = {keyword for _, keyword in automaton.iter(text)}
+        if '' in keywords:
+            found.add('')
+        return found
+    return {keyword for keyword in keywords if keyword in text}
+
+# Active rules in evaluation order; only the columns the matcher needs
+_ACTIVE_RULES_QUERY = '''
+    SELECT cr.id, cr.keywords, cr.category_id, cr.security_level_id, cr.confidence_threshold,
+           pc.name as category_name, sl.name as security_level_name
+    FROM classification_rules cr
+    JOIN professional_categories pc ON cr.category_id = pc.id
+    JOIN security_levels sl ON cr.security_level_id = sl.id
+    WHERE cr.is_active = 1
+    ORDER BY cr.confidence_threshold DESC
+'''
+
+def _parse_rule_keywords(keywords: str) -> List[str]:
+    """Decode a rule's JSON keyword array (legacy rows store a comma-separated string)"""
+    if keywords.startswith('['):
+        return json.loads(keywords)
+    return keywords.split(',')
+
+class ClassificationRuleSet:
+    """Active classification rules with keywords parsed and compiled once"""
+    
+    def __init__(self, rows: Tuple[tuple, ...]):
+        self.rules = []
+        for rule_id, keywords, category_id, security_level_id, threshold, category_name, level_name in rows:
+            self.rules.append(({
+                'id': rule_id,
+                'category_id': category_id,
+                'security_level_id': security_level_id,
+                'confidence_threshold': threshold,
+                'category_name': category_name,
+                'security_level_name': level_name,
+            }, tuple((kw, kw.lower()) for kw in (kw.strip() for kw in _parse_rule_keywords(keywords)))))
+        
+        self.keywords = frozenset(kw_lower for _, keywords in self.rules for _, kw_lower in keywords)
+        self.automaton = _build_keyword_automaton(self.keywords)
+    
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection) -> 'ClassificationRuleSet':
+        """Load active rules; the compiled set is reused until the rule rows change"""
+        rows = tuple(tuple(row) for row in conn.execute(_ACTIVE_RULES_QUERY))
+        return cls._build(rows)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def _build(cls, rows: Tuple[tuple, ...]) -> 'ClassificationRuleSet':
+        return cls(rows)
+    
+    def best_match(self, document_content: str) -> Optional[Dict]:
+        """Score every rule against the document and return the best match above threshold"""
+        found = _match_keywords(document_content.lower(), self.keywords, self.automaton)
+        
+        best_match = None
+        best_score = 0.0
+        
+        for rule, keywords in self.rules:
+            matched_keywords = [kw for kw, kw_lower in keywords if kw_lower in found]
+            total_keywords = len(keywords)
+            
+            score = len(matched_keywords) / total_keywords if total_keywords > 0 else 0
+            
+            if score >= rule['confidence_threshold'] and score > best_score:
+                best_score = score
+                best_match = {
+                    'rule_id': rule['id'],
+                    'category_id': rule['category_id'],
+                    'security_level_id': rule['security_level_id'],
+                    'confidence': score,
+                    'category_name': rule['category_name'],
+                    'security_level_name': rule['security_level_name'],
+                    'matched_keywords': matched_keywords
+                }
+        
+        return best_match
+
 class DocumentClassificationManager:
     def __init__(self):
         self.db_path = os.path.join(os.path.dirname(__file__), 'config', 'users.db')
@@ -210,50 +313,11 @@ class DocumentClassificationManager:
                              classified_by: int) -> Optional[Dict]:
         """Automatically classify document based on content and rules"""
         conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get classification rules
-        cursor.execute('''
-            SELECT cr.*, pc.name as category_name, sl.name as security_level_name
-            FROM classification_rules cr
-            JOIN professional_categories pc ON cr.category_id = pc.id
-            JOIN security_levels sl ON cr.security_level_id = sl.id
-            WHERE cr.is_active = 1
-            ORDER BY cr.confidence_threshold DESC
-        ''')
-        
-        rules = cursor.fetchall()
-        content_lower = document_content.lower()
-        
-        best_match = None
-        best_score = 0.0
-        
-        for rule in rules:
-            keywords = rule['keywords'].split(',')
-            matches = 0
-            total_keywords = len(keywords)
-            
-            for keyword in keywords:
-                keyword = keyword.strip().lower()
-                if keyword in content_lower:
-                    matches += 1
-            
-            score = matches / total_keywords if total_keywords > 0 else 0
-            
-            if score >= rule['confidence_threshold'] and score > best_score:
-                best_score = score
-                best_match = {
-                    'rule_id': rule['id'],
-                    'category_id': rule['category_id'],
-                    'security_level_id': rule['security_level_id'],
-                    'confidence': score,
-                    'category_name': rule['category_name'],
-                    'security_level_name': rule['security_level_name'],
-                    'matched_keywords': [kw.strip() for kw in keywords if kw.strip().lower() in content_lower]
-                }
-        
+        rule_set = ClassificationRuleSet.from_db(conn)
         conn.close()
         
+        best_match = rule_set.best_match(document_content)
+        
         # If auto-classification found a match, save it
         if best_match and best_match['confidence'] > 0.5:
             classification_id = self.classify_document(
@@ -288,7 +352,7 @@ class DocumentClassificationManager:
             }
         
         # Check category access
-        user_categories = [cat['category_id'] for cat in user_perms['categories']]
+        user_categories = {cat['category_id'] for cat in user_perms['categories']}
         category_access = doc_classification['category_id'] in user_categories
         
         # Check security level access
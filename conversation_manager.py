@@ -5,14 +5,342 @@ Chat session management, context retention ve multi-turn dialogue
 
 import sqlite3
 import json
-import uuid
-from datetime import datetime, timedelta
+import os
+import re
+import base64
+import math
+import time
+import hashlib
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, asdict
+from functools import cached_property
 import logging
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Zaman damgaları INTEGER epoch-mikrosaniye olarak saklanır
+_SQL_CREATE_SESSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        title TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        last_activity INTEGER NOT NULL,
+        context TEXT,  -- JSON
+        message_count INTEGER DEFAULT 0,
+        is_active BOOLEAN DEFAULT 1
+    )
+'''
+_SQL_CREATE_MESSAGES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        message_id TEXT PRIMARY KEY,
+        session_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        message_type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        metadata TEXT,  -- JSON
+        timestamp INTEGER NOT NULL,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
+    )
+'''
+
+# Sık çalışan SQL ifadeleri; metinleri sabit tutulduğu için sqlite3
+# statement cache'inden hazır (prepared) olarak tekrar kullanılır
+_SQL_INSERT_SESSION = '''
+    INSERT INTO chat_sessions
+    (session_id, user_id, title, created_at, last_activity, context, message_count, is_active)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_SELECT_SESSION = '''
+    SELECT session_id, user_id, title, created_at, last_activity,
+           context, message_count, is_active
+    FROM chat_sessions WHERE session_id = ?
+'''
+_SQL_SELECT_USER_SESSIONS = '''
+    SELECT session_id, user_id, title, created_at, last_activity,
+           context, message_count, is_active
+    FROM chat_sessions
+    WHERE user_id = ?
+    ORDER BY last_activity DESC
+    LIMIT ?
+'''
+_SQL_UPDATE_SESSION_CONTEXT = '''
+    UPDATE chat_sessions
+    SET context = ?, last_activity = ?
+    WHERE session_id = ?
+'''
+_SQL_UPDATE_SESSION_ACTIVITY = '''
+    UPDATE chat_sessions
+    SET last_activity = ?, message_count = message_count + ?
+    WHERE session_id = ?
+'''
+_SQL_INSERT_MSG = '''
+    INSERT INTO chat_messages
+    (message_id, session_id, user_id, message_type, content, metadata, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# Metadata'sız mesajlar (çoğunluk) için: metadata kolonu NULL kalır
+_SQL_INSERT_MSG_NO_META = '''
+    INSERT INTO chat_messages
+    (message_id, session_id, user_id, message_type, content, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+# Son `limit` mesaj, en eski mesajdan başlayarak
+_SQL_SELECT_MESSAGES = '''
+    SELECT message_id, session_id, user_id, message_type, content, metadata, timestamp
+    FROM (
+        SELECT message_id, session_id, user_id, message_type, content, metadata, timestamp
+        FROM chat_messages
+        WHERE session_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    )
+    ORDER BY timestamp ASC
+'''
+_SQL_CREATE_SEMANTIC_CACHE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        session_scope TEXT,
+        query_type TEXT,
+        query TEXT NOT NULL,
+        embedding BLOB NOT NULL,  -- float32
+        answer TEXT NOT NULL,
+        sources TEXT,  -- JSON
+        created_at INTEGER NOT NULL,
+        query_hash BLOB
+    )
+'''
+_SQL_MESSAGE_COUNTS = '''
+    SELECT message_type, COUNT(*)
+    FROM chat_messages
+    WHERE session_id = ?
+    GROUP BY message_type
+'''
+_SQL_RECENT_USER_CONTENTS = '''
+    SELECT content FROM (
+        SELECT content, message_type
+        FROM chat_messages
+        WHERE session_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    )
+    WHERE message_type = 'user'
+'''
+
+# Sayı içeren sorgular (tutar, tarih, miktar) semantic cache'e alınmaz
+_NUMERIC_QUERY_RE = re.compile(r'\d')
+
+# Intent analizi anahtar kelimeleri
+_DEFENSE_TERMS = frozenset({'güvenlik', 'savunma', 'askeri', 'operasyon', 'strateji'})
+_TECHNICAL_TERMS = frozenset({'sistem', 'yazılım', 'donanım', 'teknik', 'spesifikasyon'})
+_PROCESS_TERMS = frozenset({'prosedür', 'süreç', 'adım', 'işlem', 'protokol'})
+_QUESTION_WORDS = frozenset({'nasıl', 'nedir', 'neler', 'hangi', 'ne zaman', 'nerede'})
+
+# Takip soruları (konu sırası korunur)
+_FOLLOW_UP_TEMPLATES: Dict[str, tuple] = {
+    'güvenlik': (
+        "Bu güvenlik prosedürü hangi durumlar için geçerli?",
+        "Acil durum güvenlik protokolleri nelerdir?",
+        "Güvenlik ihlali durumunda ne yapılmalı?"
+    ),
+    'sistem': (
+        "Sistem gereksinimleri asgari mi yoksa önerilen mi?",
+        "Hangi işletim sistemleri desteklenmektedir?",
+        "Sistem performansı nasıl optimize edilir?"
+    ),
+    'risk': (
+        "Risk seviyeleri nasıl belirlenir?",
+        "Yüksek riskli durumlar için ek önlemler var mı?",
+        "Risk azaltma stratejileri nelerdir?"
+    ),
+}
+_GENERAL_FOLLOW_UPS = (
+    "Bu konu hakkında daha detaylı bilgi alabilir miyim?",
+    "İlgili diğer belgeler nelerdir?",
+    "Pratik uygulama örnekleri verebilir misiniz?"
+)
+
+# Anahtar kelime grupları: (analiz, etiket) -> kelimeler
+# Konu, intent ve takip sorusu analizleri tek bir taramayı paylaşır
+_KEYWORD_GROUPS = {
+    ('topic', 'Güvenlik'): frozenset({'güvenlik', 'emniyet', 'korunma'}),
+    ('topic', 'Sistem/Teknoloji'): frozenset({'sistem', 'yazılım', 'donanım'}),
+    ('topic', 'Prosedürler'): frozenset({'prosedür', 'işlem', 'adım'}),
+    ('topic', 'Risk Yönetimi'): frozenset({'risk', 'tehlike', 'tehdit'}),
+    ('topic', 'Raporlama'): frozenset({'rapor', 'analiz', 'değerlendirme'}),
+    ('intent', 'defense'): _DEFENSE_TERMS,
+    ('intent', 'technical'): _TECHNICAL_TERMS,
+    ('intent', 'process'): _PROCESS_TERMS,
+    ('intent', 'question'): _QUESTION_WORDS,
+    **{('follow_up', topic): frozenset({topic}) for topic in _FOLLOW_UP_TEMPLATES},
+}
+
+def _build_keyword_index() -> Dict[str, tuple]:
+    """Kelime -> etiket listesi eşlemesi oluştur"""
+    index = {}
+    for tag, keywords in _KEYWORD_GROUPS.items():
+        for keyword in keywords:
+            index.setdefault(keyword, []).append(tag)
+    return {keyword: tuple(tags) for keyword, tags in index.items()}
+
+_KEYWORD_INDEX = _build_keyword_index()
+
+if AHOCORASICK_AVAILABLE:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword, _tags in _KEYWORD_INDEX.items():
+        _KEYWORD_AUTOMATON.add_word(_keyword, _tags)
+    _KEYWORD_AUTOMATON.make_automaton()
+
+def _load_json(value: Optional[str]) -> Dict[str, Any]:
+    """JSON kolonunu çöz; NULL ve boş değerler için parse etmeden boş dict döndür"""
+    if not value or value == '{}':
+        return {}
+    if ORJSON_AVAILABLE:
+        return orjson.loads(value)
+    return json.loads(value)
+
+def _dump_json(value: Dict[str, Any]) -> str:
+    """Dict'i JSON metnine çevir (orjson varsa onunla)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(value)
+
+def _normalize_vector(vector):
+    """Embedding'i L2 normalize et (cosine = iç çarpım)"""
+    if NUMPY_AVAILABLE:
+        values = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(values)
+        return values / norm if norm > 0 else values
+    
+    values = [float(v) for v in vector]
+    norm = math.sqrt(sum(v * v for v in values))
+    if norm == 0:
+        return values
+    return [v / norm for v in values]
+
+# RFC 4648 base32 alfabesi -> Crockford base32 (ULID) alfabesi
+_CROCKFORD_TRANSLATION = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567', '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+)
+_id_lock = threading.Lock()
+_last_id_ms = 0
+_last_id_random = 0
+
+def _new_id() -> str:
+    """Zaman sıralı, monoton artan ULID (48 bit ms zaman + 80 bit rastgele, 26 karakter)
+    
+    Aynı milisaniyede üretilen id'lerde rastgele kısım bir artırılır; böylece
+    B-tree eklemeleri sona yapılır ve id sırası oluşturma sırasıyla aynıdır.
+    """
+    global _last_id_ms, _last_id_random
+    
+    with _id_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms <= _last_id_ms:
+            now_ms = _last_id_ms
+            random_part = _last_id_random + 1
+        else:
+            random_part = int.from_bytes(os.urandom(10), 'big')
+        _last_id_ms, _last_id_random = now_ms, random_part
+    
+    value = (now_ms << 80) | (random_part & ((1 << 80) - 1))
+    # 160 bit'e hizalanmış base32'nin son 26 karakteri = 128 bit ULID
+    encoded = base64.b32encode(value.to_bytes(20, 'big')).decode('ascii')[-26:]
+    return encoded.translate(_CROCKFORD_TRANSLATION)
+
+def _now_micros() -> int:
+    """Şu anki zaman (epoch mikrosaniye)"""
+    return time.time_ns() // 1000
+
+def _micros_to_iso(micros: int) -> str:
+    """Epoch mikrosaniyeyi yerel saatle ISO formatına çevir"""
+    return datetime.fromtimestamp(micros / 1_000_000).isoformat()
+
+def _query_hash(query: str) -> bytes:
+    """Normalize edilmiş sorgunun (küçük harf, tek boşluk) 16 byte'lık özeti"""
+    normalized = ' '.join(query.lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+def _vector_to_blob(vector) -> bytes:
+    """Normalize embedding'i float32 BLOB olarak serileştir"""
+    if NUMPY_AVAILABLE:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+    return array('f', vector).tobytes()
+
+class _SemanticCacheBucket:
+    """Bir kullanıcı + sorgu tipi için cache kayıtları ve normalize embedding matrisi
+    
+    Kayıtlar created_at'e göre sıralıdır; bucket'lar değiştirilmez, her ekleme
+    yeni bir bucket üretir (okuyucular kilitsiz dolaşabilir).
+    """
+    __slots__ = ('entries', 'matrix')
+    
+    def __init__(self, entries: List[Dict[str, Any]], matrix=None):
+        self.entries = entries
+        if matrix is None and NUMPY_AVAILABLE and entries:
+            matrix = np.stack([entry['embedding'] for entry in entries])
+        self.matrix = matrix
+    
+    def best_match(self, query_vector, cutoff: int):
+        """TTL içindeki en benzer kaydı (index, skor) olarak döndür"""
+        start = bisect.bisect_left(self.entries, cutoff, key=lambda entry: entry['created_at'])
+        if start >= len(self.entries):
+            return None, 0.0
+        
+        if self.matrix is not None:
+            # Tek matris-vektör çarpımı (BLAS)
+            scores = self.matrix[start:] @ query_vector
+            index = int(scores.argmax())
+            return start + index, float(scores[index])
+        
+        best_index, best_score = None, -1.0
+        for index in range(start, len(self.entries)):
+            score = sum(a * b for a, b in zip(self.entries[index]['embedding'], query_vector))
+            if score > best_score:
+                best_index, best_score = index, score
+        return best_index, best_score
+    
+    def appended(self, entry: Dict[str, Any], cutoff: int, max_entries: int) -> '_SemanticCacheBucket':
+        """Süresi dolanları atıp yeni kaydı ekleyen yeni bucket"""
+        start = bisect.bisect_left(self.entries, cutoff, key=lambda e: e['created_at'])
+        start = max(start, len(self.entries) + 1 - max_entries)
+        
+        entries = self.entries[start:] + [entry]
+        matrix = None
+        if self.matrix is not None:
+            matrix = np.vstack([self.matrix[start:], entry['embedding'][np.newaxis, :]])
+        return _SemanticCacheBucket(entries, matrix)
+
+def _match_keyword_tags(text: str) -> set:
+    """Küçük harfli metinde geçen tüm anahtar kelimelerin etiketlerini tek geçişte bul"""
+    if AHOCORASICK_AVAILABLE:
+        return {tag for _, tags in _KEYWORD_AUTOMATON.iter(text) for tag in tags}
+    return {tag for keyword, tags in _KEYWORD_INDEX.items() if keyword in text for tag in tags}
+
 @dataclass
 class ChatMessage:
     """Chat mesajı veri yapısı"""
@@ -22,7 +350,17 @@ class ChatMessage:
     message_type: str  # 'user', 'assistant', 'system'
     content: str
     metadata: Dict[str, Any]
-    timestamp: str
+    timestamp: int  # epoch mikrosaniye
+    
+    @property
+    def timestamp_iso(self) -> str:
+        """API yanıtları için ISO formatında zaman"""
+        return _micros_to_iso(self.timestamp)
+    
+    @cached_property
+    def content_lower(self) -> str:
+        """Küçük harfli içerik (analizlerde bir kez hesaplanır)"""
+        return self.content.lower()
     
 @dataclass
 class ChatSession:
@@ -30,17 +368,49 @@ class ChatSession:
     session_id: str
     user_id: str
     title: str
-    created_at: str
-    last_activity: str
+    created_at: int      # epoch mikrosaniye
+    last_activity: int   # epoch mikrosaniye
     context: Dict[str, Any]
     message_count: int
     is_active: bool
+    
+    @property
+    def created_at_iso(self) -> str:
+        return _micros_to_iso(self.created_at)
+    
+    @property
+    def last_activity_iso(self) -> str:
+        return _micros_to_iso(self.last_activity)
 
 class ConversationManager:
     """Conversational Interface Manager"""
     
     def __init__(self, db_path: str = "./config/users.db"):
         self.db_path = db_path
+        
+        # In-process cache (TTL + LRU)
+        self.session_cache_size = 1024
+        self.session_cache_ttl = 60  # saniye
+        self.messages_cache_max_limit = 10
+        self._session_cache = OrderedDict()   # session_id -> (expires_at, ChatSession)
+        self._messages_cache = OrderedDict()  # (session_id, limit) -> (expires_at, version, messages)
+        self._message_versions = {}           # session_id -> add_message sayacı
+        self._session_versions = {}           # session_id -> invalidation sayacı
+        self._cache_lock = threading.Lock()
+        
+        # Thread başına kalıcı bağlantı (statement cache bağlantıya özeldir)
+        self.cached_statements = 256
+        self._local = threading.local()
+        
+        # RAG semantic cache
+        self.semantic_cache_threshold = 0.92
+        self.semantic_cache_ttl = 7 * 24 * 3600  # 7 gün
+        self.semantic_cache_max_entries = 2000   # kullanıcı başına
+        self.semantic_cache_max_users = 256      # bellekte tutulan kullanıcı sayısı (LRU)
+        self._semantic_cache = OrderedDict()  # user_id -> {query_type: _SemanticCacheBucket} (lazy yüklenir)
+        self.exact_cache_size = 4096
+        self._exact_cache = OrderedDict()  # (user_id, query_type, query_hash) -> cache kaydı
+        
         self._init_tables()
     
     def _init_tables(self):
@@ -50,32 +420,18 @@ class ConversationManager:
             cursor = conn.cursor()
             
             # Chat sessions tablosu
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chat_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    last_activity TEXT NOT NULL,
-                    context TEXT,  -- JSON
-                    message_count INTEGER DEFAULT 0,
-                    is_active BOOLEAN DEFAULT 1
-                )
-            ''')
+            cursor.execute(_SQL_CREATE_SESSIONS_TABLE.format(table='chat_sessions'))
             
             # Chat messages tablosu
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    message_id TEXT PRIMARY KEY,
-                    session_id TEXT NOT NULL,
-                    user_id TEXT NOT NULL,
-                    message_type TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    metadata TEXT,  -- JSON
-                    timestamp TEXT NOT NULL,
-                    FOREIGN KEY (session_id) REFERENCES chat_sessions (session_id)
-                )
-            ''')
+            cursor.execute(_SQL_CREATE_MESSAGES_TABLE.format(table='chat_messages'))
+            
+            # Eski şemadaki ISO metin zaman damgalarını dönüştür
+            self._migrate_timestamp_columns(
+                conn, 'chat_sessions', _SQL_CREATE_SESSIONS_TABLE, ('created_at', 'last_activity')
+            )
+            self._migrate_timestamp_columns(
+                conn, 'chat_messages', _SQL_CREATE_MESSAGES_TABLE, ('timestamp',)
+            )
             
             # Chat analytics tablosu
             cursor.execute('''
@@ -89,7 +445,41 @@ class ConversationManager:
                     timestamp TEXT NOT NULL
                 )
             ''')
-            
+
+            # RAG semantic cache tablosu
+            cursor.execute(_SQL_CREATE_SEMANTIC_CACHE_TABLE.format(table='chat_semantic_cache'))
+
+            # Eski semantic cache tablolarına query_hash kolonu ekle
+            cursor.execute("PRAGMA table_info(chat_semantic_cache)")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'query_hash' not in columns:
+                cursor.execute('ALTER TABLE chat_semantic_cache ADD COLUMN query_hash BLOB')
+            self._migrate_timestamp_columns(
+                conn, 'chat_semantic_cache', _SQL_CREATE_SEMANTIC_CACHE_TABLE, ('created_at',)
+            )
+
+            # Sık kullanılan sorgular için index'ler
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_msg_session_ts
+                ON chat_messages(session_id, timestamp DESC, message_type)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sess_user_la
+                ON chat_sessions(user_id, last_activity DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_analytics_session
+                ON chat_analytics(session_id, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_semantic_cache_user
+                ON chat_semantic_cache(user_id, created_at)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_semantic_cache_hash
+                ON chat_semantic_cache(user_id, query_hash)
+            ''')
+
             conn.commit()
             conn.close()
             logger.info("Chat tables initialized successfully")
@@ -97,26 +487,55 @@ class ConversationManager:
         except Exception as e:
             logger.error(f"Failed to initialize chat tables: {e}")
     
+    def _migrate_timestamp_columns(self, conn: sqlite3.Connection, table: str,
+                                   create_sql: str, columns: tuple):
+        """TEXT (ISO) zaman damgası kolonlarını INTEGER epoch-mikrosaniyeye taşı"""
+        info = {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+        if all(info.get(column) == 'INTEGER' for column in columns):
+            return
+        
+        logger.info(f"Migrating {table} timestamps to epoch microseconds")
+        
+        # ISO değerler yerel saat olarak yazılmıştı ('utc' modifier ile UTC'ye çevrilir);
+        # saniye ve '.ffffff' kesri ayrı okunarak mikrosaniye hassasiyeti korunur
+        names = ', '.join(info)
+        values = ', '.join(
+            f"CAST(strftime('%s', {name}, 'utc') AS INTEGER) * 1000000"
+            f" + CAST(substr({name}, 21, 6) AS INTEGER)"
+            if name in columns else name
+            for name in info
+        )
+        
+        conn.execute('BEGIN')
+        conn.execute(create_sql.format(table=f'{table}_new'))
+        conn.execute(f'INSERT INTO {table}_new ({names}) SELECT {values} FROM {table}')
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+        conn.commit()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Bu thread'in veritabanı bağlantısını getir (ilk kullanımda aç)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=self.cached_statements)
+            self._local.conn = conn
+        return conn
+    
     def create_session(self, user_id: str, title: str = None) -> str:
         """Yeni chat session oluştur"""
         try:
-            session_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
+            session_id = _new_id()
+            now = _now_micros()
             
             if not title:
                 title = f"Chat Session - {datetime.now().strftime('%d.%m.%Y %H:%M')}"
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO chat_sessions 
-                (session_id, user_id, title, created_at, last_activity, context, message_count, is_active)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (session_id, user_id, title, now, now, json.dumps({}), 0, True))
+            conn = self._connect()
+            with conn:
+                conn.execute(_SQL_INSERT_SESSION,
+                             (session_id, user_id, title, now, now, None, 0, True))
             
-            conn.commit()
-            conn.close()
+            self._invalidate_session(session_id)
             
             logger.info(f"Created new chat session: {session_id}")
             return session_id
@@ -128,29 +547,27 @@ class ConversationManager:
     def get_session(self, session_id: str) -> Optional[ChatSession]:
         """Chat session bilgilerini getir"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT session_id, user_id, title, created_at, last_activity, 
-                       context, message_count, is_active
-                FROM chat_sessions WHERE session_id = ?
-            ''', (session_id,))
+            cached = self._get_cached_session(session_id)
+            if cached is not None:
+                return cached
             
-            row = cursor.fetchone()
-            conn.close()
+            # Versiyon sorgudan önce okunur: araya giren bir güncelleme eski satırın cache'lenmesini engeller
+            version = self._current_version(self._session_versions, session_id)
+            row = self._connect().execute(_SQL_SELECT_SESSION, (session_id,)).fetchone()
             
             if row:
-                return ChatSession(
+                session = ChatSession(
                     session_id=row[0],
                     user_id=row[1],
                     title=row[2],
                     created_at=row[3],
                     last_activity=row[4],
-                    context=json.loads(row[5] or '{}'),
+                    context=_load_json(row[5]),
                     message_count=row[6],
                     is_active=bool(row[7])
                 )
+                self._cache_session(session, version)
+                return session
             return None
             
         except Exception as e:
@@ -160,70 +577,91 @@ class ConversationManager:
     def add_message(self, session_id: str, user_id: str, message_type: str, 
                    content: str, metadata: Dict[str, Any] = None) -> str:
         """Chat'e mesaj ekle"""
+        message_ids = self.add_messages([(session_id, user_id, message_type, content, metadata)])
+        return message_ids[0] if message_ids else None
+    
+    def add_messages(self, messages: List[tuple]) -> List[str]:
+        """Birden fazla mesajı tek transaction içinde ekle
+        
+        messages: (session_id, user_id, message_type, content, metadata) tuple listesi
+        """
         try:
-            message_id = str(uuid.uuid4())
-            now = datetime.now().isoformat()
-            
-            if metadata is None:
-                metadata = {}
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            message_ids = []
+            rows = []            # metadata'lı mesajlar
+            rows_no_meta = []    # metadata'sız mesajlar (JSON serileştirme yok)
+            session_updates = {}
+            
+            for session_id, user_id, message_type, content, metadata in messages:
+                message_id = _new_id()
+                now = _now_micros()
+                message_ids.append(message_id)
+                
+                if metadata:
+                    rows.append((message_id, session_id, user_id, message_type, content,
+                                 _dump_json(metadata), now))
+                else:
+                    rows_no_meta.append((message_id, session_id, user_id, message_type, content, now))
+                
+                # Session başına son aktivite ve mesaj sayısı
+                _, count = session_updates.get(session_id, (None, 0))
+                session_updates[session_id] = (now, count + 1)
             
-            # Mesajı ekle
-            cursor.execute('''
-                INSERT INTO chat_messages 
-                (message_id, session_id, user_id, message_type, content, metadata, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (message_id, session_id, user_id, message_type, content, 
-                  json.dumps(metadata), now))
+            if not message_ids:
+                return []
             
-            # Session'ı güncelle
-            cursor.execute('''
-                UPDATE chat_sessions 
-                SET last_activity = ?, message_count = message_count + 1
-                WHERE session_id = ?
-            ''', (now, session_id))
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                
+                # Mesajları ekle
+                if rows_no_meta:
+                    conn.executemany(_SQL_INSERT_MSG_NO_META, rows_no_meta)
+                if rows:
+                    conn.executemany(_SQL_INSERT_MSG, rows)
+                
+                # Session'ları güncelle
+                conn.executemany(_SQL_UPDATE_SESSION_ACTIVITY, [
+                    (last_activity, count, session_id)
+                    for session_id, (last_activity, count) in session_updates.items()
+                ])
             
-            conn.commit()
-            conn.close()
+            for session_id in session_updates:
+                self._invalidate_session(session_id, messages_changed=True)
             
-            logger.info(f"Added message to session {session_id}")
-            return message_id
+            logger.info(f"Added {len(message_ids)} message(s) to {len(session_updates)} session(s)")
+            return message_ids
             
         except Exception as e:
             logger.error(f"Failed to add message: {e}")
-            return None
+            return []
     
     def get_session_messages(self, session_id: str, limit: int = 50) -> List[ChatMessage]:
         """Session'ın mesajlarını getir"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cacheable = limit <= self.messages_cache_max_limit
+            if cacheable:
+                cached = self._get_cached_messages(session_id, limit)
+                if cached is not None:
+                    return cached
             
-            cursor.execute('''
-                SELECT message_id, session_id, user_id, message_type, content, metadata, timestamp
-                FROM chat_messages 
-                WHERE session_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (session_id, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            version = self._current_version(self._message_versions, session_id)
+            rows = self._connect().execute(_SQL_SELECT_MESSAGES, (session_id, limit)).fetchall()
             
             messages = []
-            for row in reversed(rows):  # En eski mesajdan başla
+            for row in rows:
                 messages.append(ChatMessage(
                     id=row[0],
                     session_id=row[1],
                     user_id=row[2],
                     message_type=row[3],
                     content=row[4],
-                    metadata=json.loads(row[5] or '{}'),
+                    metadata=_load_json(row[5]),
                     timestamp=row[6]
                 ))
             
+            if cacheable:
+                self._cache_messages(session_id, limit, messages, version)
+            
             return messages
             
         except Exception as e:
@@ -233,20 +671,7 @@ class ConversationManager:
     def get_user_sessions(self, user_id: str, limit: int = 20) -> List[ChatSession]:
         """Kullanıcının session'larını getir"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT session_id, user_id, title, created_at, last_activity, 
-                       context, message_count, is_active
-                FROM chat_sessions 
-                WHERE user_id = ?
-                ORDER BY last_activity DESC
-                LIMIT ?
-            ''', (user_id, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            rows = self._connect().execute(_SQL_SELECT_USER_SESSIONS, (user_id, limit)).fetchall()
             
             sessions = []
             for row in rows:
@@ -256,7 +681,7 @@ class ConversationManager:
                     title=row[2],
                     created_at=row[3],
                     last_activity=row[4],
-                    context=json.loads(row[5] or '{}'),
+                    context=_load_json(row[5]),
                     message_count=row[6],
                     is_active=bool(row[7])
                 ))
@@ -279,17 +704,12 @@ class ConversationManager:
             updated_context = session.context.copy()
             updated_context.update(context_update)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE chat_sessions 
-                SET context = ?, last_activity = ?
-                WHERE session_id = ?
-            ''', (json.dumps(updated_context), datetime.now().isoformat(), session_id))
+            conn = self._connect()
+            with conn:
+                conn.execute(_SQL_UPDATE_SESSION_CONTEXT,
+                             (json.dumps(updated_context), _now_micros(), session_id))
             
-            conn.commit()
-            conn.close()
+            self._invalidate_session(session_id)
             
             return True
             
@@ -297,58 +717,350 @@ class ConversationManager:
             logger.error(f"Failed to update session context: {e}")
             return False
     
+    def _get_cached_session(self, session_id: str) -> Optional[ChatSession]:
+        """Cache'teki session'ı getir (süresi dolmuşsa None)"""
+        with self._cache_lock:
+            entry = self._session_cache.get(session_id)
+            if entry is None:
+                return None
+            
+            expires_at, session = entry
+            if expires_at < time.monotonic():
+                del self._session_cache[session_id]
+                return None
+            
+            self._session_cache.move_to_end(session_id)
+            return session
+    
+    def _current_version(self, versions: Dict[str, int], session_id: str) -> int:
+        """Session'ın güncel cache versiyonu (sorgudan önce okunur)"""
+        with self._cache_lock:
+            return versions.get(session_id, 0)
+    
+    def _cache_session(self, session: ChatSession, version: int):
+        """Session'ı cache'e ekle, limit aşılırsa en eskisini çıkar
+        
+        version sorgudan önce okunan değerdir; arada session geçersiz kılındıysa eklenmez.
+        """
+        with self._cache_lock:
+            if version != self._session_versions.get(session.session_id, 0):
+                return
+            self._session_cache[session.session_id] = (
+                time.monotonic() + self.session_cache_ttl, session
+            )
+            self._session_cache.move_to_end(session.session_id)
+            
+            while len(self._session_cache) > self.session_cache_size:
+                self._session_cache.popitem(last=False)
+    
+    def _get_cached_messages(self, session_id: str, limit: int) -> Optional[List[ChatMessage]]:
+        """Cache'teki kısa mesaj penceresini getir"""
+        key = (session_id, limit)
+        with self._cache_lock:
+            entry = self._messages_cache.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, version, messages = entry
+            if (expires_at < time.monotonic() or
+                    version != self._message_versions.get(session_id, 0)):
+                del self._messages_cache[key]
+                return None
+            
+            self._messages_cache.move_to_end(key)
+            return list(messages)
+    
+    def _cache_messages(self, session_id: str, limit: int, messages: List[ChatMessage], version: int):
+        """Kısa mesaj penceresini sorgudan önce okunan versiyonla cache'e ekle"""
+        key = (session_id, limit)
+        with self._cache_lock:
+            if version != self._message_versions.get(session_id, 0):
+                return
+            self._messages_cache[key] = (
+                time.monotonic() + self.session_cache_ttl,
+                version,
+                list(messages)
+            )
+            self._messages_cache.move_to_end(key)
+            
+            while len(self._messages_cache) > self.session_cache_size:
+                self._messages_cache.popitem(last=False)
+    
+    def _invalidate_session(self, session_id: str, messages_changed: bool = False):
+        """Session cache kaydını geçersiz kıl"""
+        with self._cache_lock:
+            self._session_cache.pop(session_id, None)
+            self._session_versions[session_id] = self._session_versions.get(session_id, 0) + 1
+            if messages_changed:
+                self._message_versions[session_id] = self._message_versions.get(session_id, 0) + 1
+    
+    def lookup_exact_answer(self, user_id: str, query: str, query_type: str = 'qa') -> Optional[Dict[str, Any]]:
+        """Birebir aynı sorunun cevabını getir (embedding gerektirmez)"""
+        try:
+            if not self._is_cacheable_query(query):
+                return None
+            
+            key = (user_id, query_type, _query_hash(query))
+            entry = self._get_exact_entry(key)
+            
+            if entry is None:
+                # Soğuk başlangıç: kalıcı cache'ten yükle
+                cutoff = self._semantic_cutoff()
+                
+                cursor = self._connect().cursor()
+                
+                cursor.execute('''
+                    SELECT query, answer, sources, created_at
+                    FROM chat_semantic_cache
+                    WHERE user_id = ? AND query_hash = ? AND query_type = ? AND created_at >= ?
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                ''', (user_id, key[2], query_type, cutoff))
+                
+                row = cursor.fetchone()
+                
+                if row is None:
+                    return None
+                
+                entry = {
+                    'query': row[0],
+                    'answer': row[1],
+                    'sources': json.loads(row[2] or '[]'),
+                    'created_at': row[3]
+                }
+                self._put_exact_entry(key, entry)
+            
+            logger.info(f"Exact cache hit for user {user_id}")
+            return {
+                'query': entry['query'],
+                'answer': entry['answer'],
+                'sources': entry['sources'],
+                'similarity': 1.0
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to lookup exact cache: {e}")
+            return None
+    
+    def lookup_cached_answer(self, user_id: str, query: str, query_embedding,
+                             query_type: str = 'qa', threshold: float = None) -> Optional[Dict[str, Any]]:
+        """Daha önce cevaplanmış benzer bir sorunun cevabını semantic cache'ten getir"""
+        try:
+            if not self._is_cacheable_query(query):
+                return None
+            
+            # Önce birebir eşleşme (hash lookup)
+            entry = self._get_exact_entry((user_id, query_type, _query_hash(query)))
+            if entry is not None:
+                return {
+                    'query': entry['query'],
+                    'answer': entry['answer'],
+                    'sources': entry['sources'],
+                    'similarity': 1.0
+                }
+            
+            if query_embedding is None:
+                return None
+            
+            if threshold is None:
+                threshold = self.semantic_cache_threshold
+            
+            query_vector = _normalize_vector(query_embedding)
+            cutoff = self._semantic_cutoff()
+            
+            bucket = self._get_user_semantic_cache(user_id).get(query_type)
+            if bucket is None:
+                return None
+            
+            best_index, best_score = bucket.best_match(query_vector, cutoff)
+            if best_index is None or best_score < threshold:
+                return None
+            
+            best_entry = bucket.entries[best_index]
+            
+            logger.info(f"Semantic cache hit for user {user_id} (similarity={best_score:.3f})")
+            return {
+                'query': best_entry['query'],
+                'answer': best_entry['answer'],
+                'sources': best_entry['sources'],
+                'similarity': best_score
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to lookup semantic cache: {e}")
+            return None
+    
+    def store_answer(self, user_id: str, query: str, query_embedding, answer: str,
+                     sources: List[Dict[str, Any]] = None, query_type: str = 'qa',
+                     session_scope: str = None) -> bool:
+        """RAG cevabını semantic cache'e kaydet"""
+        try:
+            if query_embedding is None or not self._is_cacheable_query(query):
+                return False
+            
+            sources = sources or []
+            query_hash = _query_hash(query)
+            query_vector = _normalize_vector(query_embedding)
+            now = _now_micros()
+            cutoff = now - self.semantic_cache_ttl * 1_000_000
+            
+            conn = self._connect()
+            with conn:
+                # Kullanıcının süresi dolan kayıtlarını temizle (idx_semantic_cache_user ile)
+                conn.execute('DELETE FROM chat_semantic_cache WHERE user_id = ? AND created_at < ?',
+                             (user_id, cutoff))
+                
+                conn.execute('''
+                    INSERT INTO chat_semantic_cache
+                    (user_id, session_scope, query_type, query, query_hash, embedding, answer, sources, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (user_id, session_scope, query_type, query, query_hash, _vector_to_blob(query_vector),
+                      answer, json.dumps(sources), now))
+            
+            entry = {
+                'query': query,
+                'query_type': query_type,
+                'embedding': query_vector,
+                'answer': answer,
+                'sources': sources,
+                'created_at': now
+            }
+            
+            self._put_exact_entry((user_id, query_type, query_hash), entry)
+            
+            with self._cache_lock:
+                buckets = self._semantic_cache.get(user_id)
+                if buckets is not None:
+                    bucket = buckets.get(query_type) or _SemanticCacheBucket([])
+                    buckets[query_type] = bucket.appended(
+                        entry, cutoff, self.semantic_cache_max_entries
+                    )
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store semantic cache entry: {e}")
+            return False
+    
+    def invalidate_answer_cache(self):
+        """Doküman yükleme, silme veya yeniden indexleme sonrası tüm cevap cache'ini temizle
+        
+        Cache'teki cevaplar o anki doküman kümesinden üretildiği için kullanıcıya
+        bakılmaksızın hepsi silinir (hem tablo hem bellekteki kopyalar).
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM chat_semantic_cache')
+        except Exception as e:
+            logger.error(f"Failed to clear semantic cache table: {e}")
+        
+        with self._cache_lock:
+            self._semantic_cache.clear()
+            self._exact_cache.clear()
+    
+    def _semantic_cutoff(self) -> int:
+        """Semantic cache TTL sınırı (epoch mikrosaniye)"""
+        return _now_micros() - self.semantic_cache_ttl * 1_000_000
+    
+    def _get_exact_entry(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Bellekteki exact-match kaydını getir (süresi dolmuşsa None)"""
+        cutoff = self._semantic_cutoff()
+        with self._cache_lock:
+            entry = self._exact_cache.get(key)
+            if entry is None:
+                return None
+            
+            if entry['created_at'] < cutoff:
+                del self._exact_cache[key]
+                return None
+            
+            self._exact_cache.move_to_end(key)
+            return entry
+    
+    def _put_exact_entry(self, key: tuple, entry: Dict[str, Any]):
+        """Exact-match kaydını LRU cache'e ekle"""
+        with self._cache_lock:
+            self._exact_cache[key] = entry
+            self._exact_cache.move_to_end(key)
+            
+            while len(self._exact_cache) > self.exact_cache_size:
+                self._exact_cache.popitem(last=False)
+    
+    def _is_cacheable_query(self, query: str) -> bool:
+        """Sayıya duyarlı sorgular önbelleğe alınmaz"""
+        return bool(query) and not _NUMERIC_QUERY_RE.search(query)
+    
+    def _get_user_semantic_cache(self, user_id: str) -> Dict[str, _SemanticCacheBucket]:
+        """Kullanıcının semantic cache bucket'larını getir (ilk kullanımda DB'den yükle)"""
+        with self._cache_lock:
+            buckets = self._semantic_cache.get(user_id)
+            if buckets is not None:
+                self._semantic_cache.move_to_end(user_id)
+        if buckets is not None:
+            return buckets
+        
+        cutoff = self._semantic_cutoff()
+        
+        cursor = self._connect().cursor()
+        
+        cursor.execute('''
+            SELECT query, query_type, embedding, answer, sources, created_at
+            FROM chat_semantic_cache
+            WHERE user_id = ? AND created_at >= ?
+            ORDER BY created_at DESC
+            LIMIT ?
+        ''', (user_id, cutoff, self.semantic_cache_max_entries))
+        
+        rows = cursor.fetchall()
+        
+        grouped = {}
+        for row in reversed(rows):
+            if NUMPY_AVAILABLE:
+                embedding = np.frombuffer(row[2], dtype=np.float32)
+            else:
+                embedding = array('f')
+                embedding.frombytes(row[2])
+                embedding = embedding.tolist()
+            
+            grouped.setdefault(row[1], []).append({
+                'query': row[0],
+                'query_type': row[1],
+                'embedding': embedding,
+                'answer': row[3],
+                'sources': json.loads(row[4] or '[]'),
+                'created_at': row[5]
+            })
+        
+        buckets = {query_type: _SemanticCacheBucket(entries) for query_type, entries in grouped.items()}
+        
+        with self._cache_lock:
+            buckets = self._semantic_cache.setdefault(user_id, buckets)
+            self._semantic_cache.move_to_end(user_id)
+            
+            while len(self._semantic_cache) > self.semantic_cache_max_users:
+                self._semantic_cache.popitem(last=False)
+            return buckets
+    
     def generate_follow_up_questions(self, session_id: str, last_response: str) -> List[str]:
         """Takip soruları üret"""
         try:
             # Son mesajları al
             messages = self.get_session_messages(session_id, limit=5)
             
-            # Context analizi
-            topics = []
-            for msg in messages:
-                if msg.message_type == 'user':
-                    # Anahtar kelime çıkarımı
-                    content_lower = msg.content.lower()
-                    if 'güvenlik' in content_lower:
-                        topics.append('güvenlik')
-                    if 'sistem' in content_lower:
-                        topics.append('sistem')
-                    if 'risk' in content_lower:
-                        topics.append('risk')
-                    if 'prosedür' in content_lower:
-                        topics.append('prosedür')
+            # Context analizi - anahtar kelime çıkarımı
+            user_content = '\n'.join(msg.content_lower for msg in messages if msg.message_type == 'user')
+            topics = {label for group, label in _match_keyword_tags(user_content) if group == 'follow_up'}
             
             # Takip soruları üret
             follow_ups = []
-            
-            if 'güvenlik' in topics:
-                follow_ups.extend([
-                    "Bu güvenlik prosedürü hangi durumlar için geçerli?",
-                    "Acil durum güvenlik protokolleri nelerdir?",
-                    "Güvenlik ihlali durumunda ne yapılmalı?"
-                ])
-            
-            if 'sistem' in topics:
-                follow_ups.extend([
-                    "Sistem gereksinimleri asgari mi yoksa önerilen mi?",
-                    "Hangi işletim sistemleri desteklenmektedir?",
-                    "Sistem performansı nasıl optimize edilir?"
-                ])
-            
-            if 'risk' in topics:
-                follow_ups.extend([
-                    "Risk seviyeleri nasıl belirlenir?",
-                    "Yüksek riskli durumlar için ek önlemler var mı?",
-                    "Risk azaltma stratejileri nelerdir?"
-                ])
+            for topic, templates in _FOLLOW_UP_TEMPLATES.items():
+                if topic in topics:
+                    follow_ups.extend(templates)
             
             # Genel takip soruları
             if not follow_ups:
-                follow_ups = [
-                    "Bu konu hakkında daha detaylı bilgi alabilir miyim?",
-                    "İlgili diğer belgeler nelerdir?",
-                    "Pratik uygulama örnekleri verebilir misiniz?"
-                ]
+                follow_ups = list(_GENERAL_FOLLOW_UPS)
             
             return follow_ups[:3]  # En fazla 3 soru
             
@@ -359,7 +1071,7 @@ class ConversationManager:
     def analyze_conversation_intent(self, session_id: str) -> Dict[str, Any]:
         """Konuşma intent analizi"""
         try:
-            messages = self.get_session_messages(session_id, limit=10)
+            user_contents = self._recent_user_contents(session_id, window=10)
             
             analysis = {
                 'main_topics': [],
@@ -369,37 +1081,31 @@ class ConversationManager:
                 'domain_focus': 'general'
             }
             
-            user_messages = [msg for msg in messages if msg.message_type == 'user']
-            
-            if not user_messages:
+            if not user_contents:
                 return analysis
             
             # Topic analizi
-            all_content = ' '.join([msg.content.lower() for msg in user_messages])
-            
-            defense_terms = ['güvenlik', 'savunma', 'askeri', 'operasyon', 'strateji']
-            technical_terms = ['sistem', 'yazılım', 'donanım', 'teknik', 'spesifikasyon']
-            process_terms = ['prosedür', 'süreç', 'adım', 'işlem', 'protokol']
+            all_content = '\n'.join(user_contents).lower()
+            tags = _match_keyword_tags(all_content)
             
-            if any(term in all_content for term in defense_terms):
+            if ('intent', 'defense') in tags:
                 analysis['domain_focus'] = 'defense'
                 analysis['main_topics'].append('Savunma Sanayi')
             
-            if any(term in all_content for term in technical_terms):
+            if ('intent', 'technical') in tags:
                 analysis['main_topics'].append('Teknik Konular')
             
-            if any(term in all_content for term in process_terms):
+            if ('intent', 'process') in tags:
                 analysis['main_topics'].append('İşleyiş ve Prosedürler')
             
             # Complexity analizi
-            if len(user_messages) > 5:
+            if len(user_contents) > 5:
                 analysis['complexity_level'] = 'advanced'
-            elif len(user_messages) > 2:
+            elif len(user_contents) > 2:
                 analysis['complexity_level'] = 'intermediate'
             
             # Intent analizi
-            question_words = ['nasıl', 'nedir', 'neler', 'hangi', 'ne zaman', 'nerede']
-            if any(word in all_content for word in question_words):
+            if ('intent', 'question') in tags:
                 analysis['user_intent'] = 'detailed_inquiry'
             
             return analysis
@@ -412,23 +1118,20 @@ class ConversationManager:
         """Konuşma özeti"""
         try:
             session = self.get_session(session_id)
-            messages = self.get_session_messages(session_id)
+            counts = self._message_counts(session_id)
             
-            if not session or not messages:
+            if not session or not counts:
                 return {}
             
-            user_messages = [msg for msg in messages if msg.message_type == 'user']
-            assistant_messages = [msg for msg in messages if msg.message_type == 'assistant']
-            
             summary = {
                 'session_id': session_id,
                 'title': session.title,
                 'duration': self._calculate_session_duration(session),
-                'total_messages': len(messages),
-                'user_messages': len(user_messages),
-                'assistant_responses': len(assistant_messages),
-                'topics_discussed': self._extract_topics(user_messages),
-                'last_activity': session.last_activity,
+                'total_messages': sum(counts.values()),
+                'user_messages': counts.get('user', 0),
+                'assistant_responses': counts.get('assistant', 0),
+                'topics_discussed': self._extract_topics(self._recent_user_contents(session_id, window=50)),
+                'last_activity': session.last_activity_iso,
                 'intent_analysis': self.analyze_conversation_intent(session_id)
             }
             
@@ -441,41 +1144,34 @@ class ConversationManager:
     def _calculate_session_duration(self, session: ChatSession) -> str:
         """Session süresi hesapla"""
         try:
-            created = datetime.fromisoformat(session.created_at)
-            last_activity = datetime.fromisoformat(session.last_activity)
-            duration = last_activity - created
-            
-            if duration.total_seconds() < 60:
-                return f"{int(duration.total_seconds())} saniye"
-            elif duration.total_seconds() < 3600:
-                return f"{int(duration.total_seconds() / 60)} dakika"
+            seconds = (session.last_activity - session.created_at) / 1_000_000
+            
+            if seconds < 60:
+                return f"{int(seconds)} saniye"
+            elif seconds < 3600:
+                return f"{int(seconds / 60)} dakika"
             else:
-                hours = int(duration.total_seconds() / 3600)
-                minutes = int((duration.total_seconds() % 3600) / 60)
+                hours = int(seconds / 3600)
+                minutes = int((seconds % 3600) / 60)
                 return f"{hours} saat {minutes} dakika"
                 
         except Exception:
             return "Bilinmiyor"
     
-    def _extract_topics(self, messages: List[ChatMessage]) -> List[str]:
-        """Mesajlardan topic'leri çıkar"""
-        topics = set()
-        
-        for msg in messages:
-            content = msg.content.lower()
-            
-            if any(word in content for word in ['güvenlik', 'emniyet', 'korunma']):
-                topics.add('Güvenlik')
-            if any(word in content for word in ['sistem', 'yazılım', 'donanım']):
-                topics.add('Sistem/Teknoloji')
-            if any(word in content for word in ['prosedür', 'işlem', 'adım']):
-                topics.add('Prosedürler')
-            if any(word in content for word in ['risk', 'tehlike', 'tehdit']):
-                topics.add('Risk Yönetimi')
-            if any(word in content for word in ['rapor', 'analiz', 'değerlendirme']):
-                topics.add('Raporlama')
+    def _message_counts(self, session_id: str) -> Dict[str, int]:
+        """Mesaj tipine göre mesaj sayıları"""
+        return dict(self._connect().execute(_SQL_MESSAGE_COUNTS, (session_id,)).fetchall())
+    
+    def _recent_user_contents(self, session_id: str, window: int) -> List[str]:
+        """Son `window` mesaj içindeki kullanıcı mesajlarının içerikleri"""
+        rows = self._connect().execute(_SQL_RECENT_USER_CONTENTS, (session_id, window)).fetchall()
+        return [row[0] for row in rows]
+    
+    def _extract_topics(self, contents: List[str]) -> List[str]:
+        """Mesaj içeriklerinden topic'leri çıkar"""
+        tags = _match_keyword_tags('\n'.join(contents).lower())
         
-        return list(topics)
+        return [label for group, label in _KEYWORD_GROUPS if group == 'topic' and (group, label) in tags]
 
 # Global conversation manager
 conversation_manager = ConversationManager()
\ No newline at end of file
@@ -3,24 +3,56 @@
 PDF Test Dokümanları Oluşturucu
 """
 
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
+import base64
 import os
+import sys
+from pathlib import Path
 
 
-def create_test_pdf():
-    """Test PDF'i oluştur"""
+def _is_up_to_date(path):
+    """Dosya bu betikten daha yeni mi? (yeniden üretmeye gerek yok)"""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(__file__)
+
+
+def create_test_pdf(force=False, regenerate=False):
+    """Test PDF'i oluştur (güncel dosya varsa force=True olmadıkça atlanır)
+    
+    İçerik sabit olduğu için PDF, modüle gömülü _PDF_BLOB'dan yazılır.
+    regenerate=True ReportLab ile baştan üretir; içerik değiştiğinde
+    _PDF_BLOB bu çıktıdan güncellenmelidir.
+    """
     
     pdf_path = "./test_docs/sirket_guvenlik_elkitabi.pdf"
     
-    # PDF dokümanı oluştur
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
+    if not force and not regenerate and _is_up_to_date(pdf_path):
+        return pdf_path
+    
+    if regenerate:
+        _render_test_pdf(pdf_path)
+    else:
+        Path(pdf_path).write_bytes(base64.b64decode(_PDF_BLOB))
+    
+    print(f"✅ Test PDF oluşturuldu: {pdf_path}")
+    return pdf_path
+
+
+def _render_test_pdf(pdf_path):
+    """PDF'i ReportLab ile oluştur"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    
+    # Bölümler arasında tekrar kullanılan boşluklar
+    small_spacer = Spacer(1, 0.1*inch)
+    section_spacer = Spacer(1, 0.2*inch)
+    
+    # PDF dokümanı oluştur (invariant: sabit tarih/ID, aynı içerik aynı byte'ları üretir)
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4, invariant=1)
     
     # Stil tanımlamaları
     styles = getSampleStyleSheet()
+    normal = styles['Normal']
     title_style = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
@@ -42,15 +74,15 @@ def create_test_pdf():
     
     # Başlık
     content.append(Paragraph("DeepSearch MVP - PDF Test Dokümanı", title_style))
-    content.append(Spacer(1, 0.2*inch))
+    content.append(section_spacer)
     
     content.append(Paragraph("Şirket Güvenlik El Kitabı", styles['Heading1']))
-    content.append(Spacer(1, 0.2*inch))
+    content.append(section_spacer)
     
     # Bölüm 1
     content.append(Paragraph("1. Acil Durum Prosedürleri", heading_style))
     
-    content.append(Paragraph("<b>Yangın Alarm Prosedürü:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Yangın Alarm Prosedürü:</b>", normal))
     yangın_steps = [
         "1. Yangın alarmı duyulduğunda derhal bölgeyi boşaltın",
         "2. En yakın yangın çıkışını kullanın", 
@@ -59,27 +91,25 @@ def create_test_pdf():
         "5. Güvenlik görevlisinin talimatlarını izleyin"
     ]
     
-    for step in yangın_steps:
-        content.append(Paragraph(step, styles['Normal']))
+    content.extend(Paragraph(step, normal) for step in yangın_steps)
     
-    content.append(Spacer(1, 0.1*inch))
+    content.append(small_spacer)
     
-    content.append(Paragraph("<b>Deprem Güvenlik Kuralları:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Deprem Güvenlik Kuralları:</b>", normal))
     deprem_rules = [
         "• Masa altına saklanın veya duvar kenarına çekilin",
         "• Cam ve ağır eşyalardan uzak durun", 
         "• Sarsıntı durduktan sonra dikkatlice tahliye edin"
     ]
     
-    for rule in deprem_rules:
-        content.append(Paragraph(rule, styles['Normal']))
+    content.extend(Paragraph(rule, normal) for rule in deprem_rules)
     
-    content.append(Spacer(1, 0.2*inch))
+    content.append(section_spacer)
     
     # Bölüm 2
     content.append(Paragraph("2. Laboratuvar Güvenlik Prosedürleri", heading_style))
     
-    content.append(Paragraph("<b>Kimyasal Güvenlik:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Kimyasal Güvenlik:</b>", normal))
     kimya_rules = [
         "• Tüm kimyasalları etiketli kaplarda saklayın",
         "• Güvenlik gözlüğü ve eldiven kullanın",
@@ -87,27 +117,25 @@ def create_test_pdf():
         "• MSDS (Material Safety Data Sheet) bilgilerini bilin"
     ]
     
-    for rule in kimya_rules:
-        content.append(Paragraph(rule, styles['Normal']))
+    content.extend(Paragraph(rule, normal) for rule in kimya_rules)
     
-    content.append(Spacer(1, 0.1*inch))
+    content.append(small_spacer)
     
-    content.append(Paragraph("<b>Ekipman Güvenliği:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Ekipman Güvenliği:</b>", normal))
     ekipman_rules = [
         "• Düzenli kalibrasyonları yapın",
         "• Arızalı ekipmanları derhal raporlayın", 
         "• Kullanım öncesi güvenlik kontrolü yapın"
     ]
     
-    for rule in ekipman_rules:
-        content.append(Paragraph(rule, styles['Normal']))
+    content.extend(Paragraph(rule, normal) for rule in ekipman_rules)
     
-    content.append(Spacer(1, 0.2*inch))
+    content.append(section_spacer)
     
     # Bölüm 3
     content.append(Paragraph("3. Veri Güvenliği", heading_style))
     
-    content.append(Paragraph("<b>Bilgi İşlem Güvenlik Kuralları:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Bilgi İşlem Güvenlik Kuralları:</b>", normal))
     bilgi_rules = [
         "• Güçlü parolalar kullanın (en az 8 karakter, büyük/küçük harf, rakam)",
         "• İki faktörlü doğrulama aktif edin",
@@ -115,40 +143,43 @@ def create_test_pdf():
         "• Şüpheli e-postalar açmayın"
     ]
     
-    for rule in bilgi_rules:
-        content.append(Paragraph(rule, styles['Normal']))
+    content.extend(Paragraph(rule, normal) for rule in bilgi_rules)
     
-    content.append(Spacer(1, 0.1*inch))
+    content.append(small_spacer)
     
-    content.append(Paragraph("<b>Fiziksel Güvenlik:</b>", styles['Normal']))
+    content.append(Paragraph("<b>Fiziksel Güvenlik:</b>", normal))
     fizik_rules = [
         "• Çalışma alanınızı kilitleyerek ayrılın",
         "• Misafir kartları daima görünür yerde taşıyın",
         "• Güvenlik kamerası alanlarını engellemeyedin"
     ]
     
-    for rule in fizik_rules:
-        content.append(Paragraph(rule, styles['Normal']))
+    content.extend(Paragraph(rule, normal) for rule in fizik_rules)
     
     content.append(Spacer(1, 0.3*inch))
     
     # Footer
-    content.append(Paragraph("---", styles['Normal']))
-    content.append(Paragraph("<b>Son Güncelleme:</b> 29 Eylül 2025", styles['Normal']))
-    content.append(Paragraph("<b>Doküman No:</b> SGB-2025-001", styles['Normal']))
-    content.append(Paragraph("<b>Hazırlayan:</b> Güvenlik Departmanı", styles['Normal']))
-    content.append(Spacer(1, 0.1*inch))
-    content.append(Paragraph("<i>Bu doküman PDF test amaçlı oluşturulmuştur.</i>", styles['Normal']))
+    footer_lines = [
+        "---",
+        "<b>Son Güncelleme:</b> 29 Eylül 2025",
+        "<b>Doküman No:</b> SGB-2025-001",
+        "<b>Hazırlayan:</b> Güvenlik Departmanı"
+    ]
+    content.extend(Paragraph(line, normal) for line in footer_lines)
+    content.append(small_spacer)
+    content.append(Paragraph("<i>Bu doküman PDF test amaçlı oluşturulmuştur.</i>", normal))
     
     # PDF'i oluştur
     doc.build(content)
-    
-    print(f"✅ Test PDF oluşturuldu: {pdf_path}")
-    return pdf_path
 
 
-def create_additional_test_files():
-    """Ek test dosyaları oluştur"""
+def create_additional_test_files(force=False):
+    """Ek test dosyaları oluştur (güncel dosya varsa force=True olmadıkça atlanır)"""
+    
+    txt_path = './test_docs/sirket_verileri.xlsx.txt'
+    
+    if not force and _is_up_to_date(txt_path):
+        return
     
     # Excel benzeri test dosyası
     excel_content = """Sheet: Personel Listesi
@@ -165,14 +196,92 @@ IT | 500000 | 350000 | 150000
 Güvenlik | 150000 | 120000 | 30000
 Muhasebe | 100000 | 95000 | 5000"""
     
-    with open('./test_docs/sirket_verileri.xlsx.txt', 'w', encoding='utf-8') as f:
+    with open(txt_path, 'w', encoding='utf-8') as f:
         f.write(excel_content)
     
-    print("✅ Excel benzeri test dosyası oluşturuldu: ./test_docs/sirket_verileri.xlsx.txt")
+    print(f"✅ Excel benzeri test dosyası oluşturuldu: {txt_path}")
+
+
+# create_test_pdf(regenerate=True) çıktısı (base64)
+_PDF_BLOB = (
+    b'JVBERi0xLjQKJZOMi54gUmVwb3J0TGFiIEdlbmVyYXRlZCBQREYgZG9jdW1lbnQgKG9wZW5zb3Vy'
+    b'Y2UpCjEgMCBvYmoKPDwKL0YxIDIgMCBSIC9GMiAzIDAgUiAvRjMgNCAwIFIgL0Y0IDYgMCBSCj4+'
+    b'CmVuZG9iagoyIDAgb2JqCjw8Ci9CYXNlRm9udCAvSGVsdmV0aWNhIC9FbmNvZGluZyAvV2luQW5z'
+    b'aUVuY29kaW5nIC9OYW1lIC9GMSAvU3VidHlwZSAvVHlwZTEgL1R5cGUgL0ZvbnQKPj4KZW5kb2Jq'
+    b'CjMgMCBvYmoKPDwKL0Jhc2VGb250IC9IZWx2ZXRpY2EtQm9sZCAvRW5jb2RpbmcgL1dpbkFuc2lF'
+    b'bmNvZGluZyAvTmFtZSAvRjIgL1N1YnR5cGUgL1R5cGUxIC9UeXBlIC9Gb250Cj4+CmVuZG9iago0'
+    b'IDAgb2JqCjw8Ci9CYXNlRm9udCAvWmFwZkRpbmdiYXRzIC9OYW1lIC9GMyAvU3VidHlwZSAvVHlw'
+    b'ZTEgL1R5cGUgL0ZvbnQKPj4KZW5kb2JqCjUgMCBvYmoKPDwKL0NvbnRlbnRzIDExIDAgUiAvTWVk'
+    b'aWFCb3ggWyAwIDAgNTk1LjI3NTYgODQxLjg4OTggXSAvUGFyZW50IDEwIDAgUiAvUmVzb3VyY2Vz'
+    b'IDw8Ci9Gb250IDEgMCBSIC9Qcm9jU2V0IFsgL1BERiAvVGV4dCAvSW1hZ2VCIC9JbWFnZUMgL0lt'
+    b'YWdlSSBdCj4+IC9Sb3RhdGUgMCAvVHJhbnMgPDwKCj4+IAogIC9UeXBlIC9QYWdlCj4+CmVuZG9i'
+    b'ago2IDAgb2JqCjw8Ci9CYXNlRm9udCAvSGVsdmV0aWNhLU9ibGlxdWUgL0VuY29kaW5nIC9XaW5B'
+    b'bnNpRW5jb2RpbmcgL05hbWUgL0Y0IC9TdWJ0eXBlIC9UeXBlMSAvVHlwZSAvRm9udAo+PgplbmRv'
+    b'YmoKNyAwIG9iago8PAovQ29udGVudHMgMTIgMCBSIC9NZWRpYUJveCBbIDAgMCA1OTUuMjc1NiA4'
+    b'NDEuODg5OCBdIC9QYXJlbnQgMTAgMCBSIC9SZXNvdXJjZXMgPDwKL0ZvbnQgMSAwIFIgL1Byb2NT'
+    b'ZXQgWyAvUERGIC9UZXh0IC9JbWFnZUIgL0ltYWdlQyAvSW1hZ2VJIF0KPj4gL1JvdGF0ZSAwIC9U'
+    b'cmFucyA8PAoKPj4gCiAgL1R5cGUgL1BhZ2UKPj4KZW5kb2JqCjggMCBvYmoKPDwKL1BhZ2VNb2Rl'
+    b'IC9Vc2VOb25lIC9QYWdlcyAxMCAwIFIgL1R5cGUgL0NhdGFsb2cKPj4KZW5kb2JqCjkgMCBvYmoK'
+    b'PDwKL0F1dGhvciAoXChhbm9ueW1vdXNcKSkgL0NyZWF0aW9uRGF0ZSAoRDoyMDAwMDEwMTAwMDAw'
+    b'MCswMCcwMCcpIC9DcmVhdG9yIChcKHVuc3BlY2lmaWVkXCkpIC9LZXl3b3JkcyAoKSAvTW9kRGF0'
+    b'ZSAoRDoyMDAwMDEwMTAwMDAwMCswMCcwMCcpIC9Qcm9kdWNlciAoUmVwb3J0TGFiIFBERiBMaWJy'
+    b'YXJ5IC0gXChvcGVuc291cmNlXCkpIAogIC9TdWJqZWN0IChcKHVuc3BlY2lmaWVkXCkpIC9UaXRs'
+    b'ZSAoXChhbm9ueW1vdXNcKSkgL1RyYXBwZWQgL0ZhbHNlCj4+CmVuZG9iagoxMCAwIG9iago8PAov'
+    b'Q291bnQgMiAvS2lkcyBbIDUgMCBSIDcgMCBSIF0gL1R5cGUgL1BhZ2VzCj4+CmVuZG9iagoxMSAw'
+    b'IG9iago8PAovRmlsdGVyIFsgL0FTQ0lJODVEZWNvZGUgL0ZsYXRlRGVjb2RlIF0gL0xlbmd0aCAx'
+    b'NzM0Cj4+CnN0cmVhbQpHYXUwRWdNWWIqJjpNbCtiW1w1Xz51Pmg/L1FudSdPQ2pXbDdZKGFAMTYu'
+    b'YGgubl1BMTs/Nk9ZNC1XWjZFXChBIztdJTIkZEgkaC5TWEgvZz1TLSVwcEhvIiQ0YmxnPyhiY29r'
+    b'TzIwUFUkaE5oKzFWYF9iSyJfKDsjVSswPzMiLi9YbUBYWF1Hak11NDcxW25zImVFR1BMXGBdI2tX'
+    b'ZylTWTdKIVdJR0VxS29DXCc7SDxBIz5jWy1NRnJVXktBSCFcOUNNXGYuSC1DQjc0cTEjZCNDJSh1'
+    b'dVw6Kjw1MCtJRlZJRy1CQzJnL1A5bU9lNUpCPUc3dV5qOlhoaC1naCQ3RmQ0Ml9oYWJCS28xLVY/'
+    b'YVZaODRJJStGKVtYIUpedV9WK2EsZkldYlJeNUtlWS9CLVx0ZyZbM3RuKi82KkdUUG1IXyFyXzhe'
+    b'SGUrPSdXUjxAMltnWkNGRWcjcG0rcDI5JTdCMkpXVV9BNVJcJGRdLGBSPFc8bGFWY1RXTTx1T1BC'
+    b'NGJiSkRXZUYydElJO2YlOW5wTXBELyFPQ2lzPT0lNklaOiNwLTtTWFYyUyRBOWs+NGQ2c1Fpal9L'
+    b'K1cxXjNucSpKN1c+NyRIZzRaXWZvKTlQTWVpJWdMSWBiVHUsSS9lczNkbSg2MD1ORDxccCVwNm9b'
+    b'IW4pSTs8MXUkTEpLWztnLiNuQFA0TmJQWUs4XE8lU1lWTGspJkpENWpUcF5zVCF0KTFQYCFVYDdx'
+    b'RVlBM000aVpaYmQyR08nW2VOYjBLNm1COFtSUWBVdCJXNmtSWmdjNFVLdVQ8PT5DNWxnZVs7RWZs'
+    b'NG4kQnVhTkppTWVEJi9aQnRAV1BkQWNlMj1sck07R0FJamktL3EtKjxhQVVyTjVUZmZAQ2hEcjdQ'
+    b'bihFbnVuRmw0Uz9wT2Q6UW0zST4rQDsqbkVUNGhrWURCVTBCOz5baldOIkBPQWhQMjVILFElIzM2'
+    b'KjRtQG1XRV1dODVvMDNYKzswUm49TD4jWkUtMShtQFpuZnJwViRTWU9YQlBwJXJOImJdbyEuWiZY'
+    b'UWFLbmouUD02SGk/QWYlYDNQTFpOaV5bLnVTWm85ImViKihHQ0dmdHNXNSpsJkFZdV0xQSQ7O14j'
+    b'K19ATzlUSmhsTFBhcWksU2ZGL0NlRitpQz1gck1NRTloZEdzK2VjciQnXlY/QGBvRVxwLFlIYGNX'
+    b'PCFnTjVBKkw6bXBQN1srUSNIckVzJTtFbG5RVmAzZy1rSFpfbW4ocnIzZid1Vjw4Jl1FQTlHRVVZ'
+    b'N1h1M0chUC04WlNxcmdkOyZabF1XaHVNRDRKJ1pqRjgqTWEqRzA3O2xsN2g6YykqOiE+aSRYcztN'
+    b'JFo7TDYnIUdAIz4tKUNyTFwpcF0qcjFUN2tNSDw5VipvQnVVSjhaJGkhT1NBPHU1UjNoVyYvQ2xZ'
+    b'aTJyYDhhXmwpTVNFLXVGTFhAIWJuQy5vUytNOixPYVY4Qm1mO0lgSiNFO2I2cmlPSWksLlVBSE5o'
+    b'aj1SJm5fX29nYFxyLFw4Lzg5YG9yYEUkMzt0cjNcaSRDbyI+bTZYJW0xWXNAPFpOLEI1KydGUlZn'
+    b'cUIsXSkmXkpfUUIzI0IhYEVCc2RjOmEwQSJiZyYsLCM0LkQ6WFJmXz1kZ2pcXTxyTyQ1aDM3O0Mr'
+    b'bT8pbUdTP1RdNVJjYlRaWHV0R0U9WDFuQ21XOzcpWS9MMzpRWjMqTjBwZmJFOSMqckZnQ3EpXnJl'
+    b'YHFaXlNUS1xfQCJpUjgnOE9fUEpyO2AtL0dvPUJzUzBdIUtSQXMqZGtGZE05SVRPPCUzc1AzaDdF'
+    b'OE8jR0Nvai4pbElVSzE+VmRQaDc3Sik8KWxtRDc5RGZyIUJEWEIxcFZpTTFPXShOZ2pwTllnYDZT'
+    b'Ui5TSzQ4KGInYkhjPWJCJ2YiVUNkYWZiaT9KR289QDVMdDFAMmxfSEZoKFUpUE0nWjoyNjElPSlQ'
+    b'cTE2dSldLmFYYU49JHM4b3REbUxMWTJeMj84VCZZX2pPbE4zNVJlMlFCYFpSVDZJYkEmN2wtTiNm'
+    b'ZnA6Jmg3PSNfLm9DK2hSJDFuKzpDc29EMmA6JHFLPz9PaF1xTTRNV0gyPklVVlRlPEI5ZihEZUhC'
+    b'SDE6O19OYm5VSlw1PWVyLVE7a0E9Ij8tKTA6a2lHdDZ0OUsoQjFmKHNnTzFWYjxFQlEtbyNqXDlM'
+    b'PG82UHRwPzpnT2JIJHI8bXMoJCU2YmVAREVbLicyaFlzJjBCKEgkYl4lY0E5SUBBSCUlZjJEW0hE'
+    b'aWxyUUgtMypaLk09TlltRWREY1MnZT9NNTsobVIoVFNIMzs/fj5lbmRzdHJlYW0KZW5kb2JqCjEy'
+    b'IDAgb2JqCjw8Ci9GaWx0ZXIgWyAvQVNDSUk4NURlY29kZSAvRmxhdGVEZWNvZGUgXSAvTGVuZ3Ro'
+    b'IDE5Ngo+PgpzdHJlYW0KR2F0JVw0VV0rXCY7S3JXTUtgJFRRdG1xJ0NYR2xlJDVwR2leSGR0dUNc'
+    b'JU09TCpHaF4/Rlx0TkhfMDElTUYyWlwiJk0iWkNCPjVpMmlzPURtWFZ0YTAxIidgWXFSLFtlbyEm'
+    b'UT5jOm05R0pQaFlGWSFnImRORmZUYEArbmgkKChZRVBYXkc6X2Y4YSY/SmM/M0JVX209XlAkcWY8'
+    b'O281P1svUC0/cEx0QlNkdVxzRWMsZVxNZWJGazQjTj5qWDRAXlh+PmVuZHN0cmVhbQplbmRvYmoK'
+    b'eHJlZgowIDEzCjAwMDAwMDAwMDAgNjU1MzUgZiAKMDAwMDAwMDA2MSAwMDAwMCBuIAowMDAwMDAw'
+    b'MTIyIDAwMDAwIG4gCjAwMDAwMDAyMjkgMDAwMDAgbiAKMDAwMDAwMDM0MSAwMDAwMCBuIAowMDAw'
+    b'MDAwNDI0IDAwMDAwIG4gCjAwMDAwMDA2MjkgMDAwMDAgbiAKMDAwMDAwMDc0NCAwMDAwMCBuIAow'
+    b'MDAwMDAwOTQ5IDAwMDAwIG4gCjAwMDAwMDEwMTggMDAwMDAgbiAKMDAwMDAwMTI5OCAwMDAwMCBu'
+    b'IAowMDAwMDAxMzY0IDAwMDAwIG4gCjAwMDAwMDMxOTAgMDAwMDAgbiAKdHJhaWxlcgo8PAovSUQg'
+    b'Cls8OTNmNzc5ZWNkMWYyOTI0YTc1YjJjZDU2ZTQzODNjZmE+PDkzZjc3OWVjZDFmMjkyNGE3NWIy'
+    b'Y2Q1NmU0MzgzY2ZhPl0KJSBSZXBvcnRMYWIgZ2VuZXJhdGVkIFBERiBkb2N1bWVudCAtLSBkaWdl'
+    b'c3QgKG9wZW5zb3VyY2UpCgovSW5mbyA5IDAgUgovUm9vdCA4IDAgUgovU2l6ZSAxMwo+PgpzdGFy'
+    b'dHhyZWYKMzQ3NwolJUVPRgo='
+)
 
 
 if __name__ == '__main__':
+    force = '--force' in sys.argv
+    regenerate = '--regenerate' in sys.argv
+    
     print("📄 PDF Test Dosyaları Oluşturuluyor...")
-    create_test_pdf()
-    create_additional_test_files()
+    create_test_pdf(force=force, regenerate=regenerate)
+    create_additional_test_files(force=force)
     print("🎉 Tüm test dosyaları hazır!")
\ No newline at end of file
@@ -4,68 +4,205 @@ Provides database indexing, query optimization, and connection pooling
 """
 
 import sqlite3
+import re
 import threading
+import queue
 import time
+import functools
+from array import array
 from contextlib import contextmanager
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import logging
+from pathlib import Path
+
+# Slow query threshold (100ms)
+SLOW_QUERY_NS = 100_000_000
+
+# Interval of the scheduled incremental_optimize() for the shared optimizer (6h)
+INCREMENTAL_OPTIMIZE_INTERVAL_S = 6 * 3600
+
+# Per-connection tuning
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode = WAL;         -- Write-Ahead Logging
+    PRAGMA synchronous = NORMAL;       -- Faster writes
+    PRAGMA cache_size = -65536;        -- 64MB cache (negative = KB)
+    PRAGMA temp_store = MEMORY;        -- Memory temp tables
+    PRAGMA mmap_size = 268435456;      -- 256MB memory mapped
+    PRAGMA busy_timeout = 5000;        -- Wait on locks instead of SQLITE_BUSY
+    PRAGMA wal_autocheckpoint = 1000;  -- Bound WAL growth
+    PRAGMA threads = 4;                -- Worker threads for the sorter
+    PRAGMA foreign_keys = ON;
+"""
+
+# Statements that can run on a read-only connection
+_READ_QUERY_RE = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+# A WITH prefix may belong to INSERT/UPDATE/DELETE; any such keyword sends it to the writer
+_WRITE_KEYWORD_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+def _is_read_query(query: str) -> bool:
+    """True for plain SELECTs and for CTEs that contain no write statement"""
+    match = _READ_QUERY_RE.match(query)
+    if match is None:
+        return False
+    return match.group(1).upper() == 'SELECT' or not _WRITE_KEYWORD_RE.search(query)
+
+# Covered by the composite indexes that start with the same column
+REDUNDANT_INDEXES = (
+    'idx_documents_user_id',            # idx_documents_user_date(user_id, upload_date)
+    'idx_search_logs_user_id',          # idx_search_logs_user_time(user_id, timestamp)
+    'idx_security_events_event_type',   # idx_security_events_type_time(event_type, timestamp)
+)
+
+# Target table of a CREATE INDEX statement
+_INDEX_TABLE_RE = re.compile(r'\bON\s+(\w+)\s*\(')
+
+# Text columns served by FTS5 instead of LIKE '%term%' scans
+FTS_TABLES = (
+    ('search_logs', 'query'),
+    ('documents', 'filename'),
+)
+
+_FTS_SCHEMA_TEMPLATE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({column}, content='{table}', content_rowid='id');
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+    END;
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {column} ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+        INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column});
+    END;
+"""
+
+def fts_match_expression(search_term: str) -> str:
+    """Quote a free-text term as an FTS5 prefix query (all words must match)"""
+    words = search_term.split()
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+# Counter slots in DatabaseOptimizer._stats
+_QUERIES, _TOTAL_NS, _SLOW, _RECENT_NS = 0, 1, 2, 3
+
+# Recent average is an EMA with alpha = 1/128, kept in integer ns via shifts
+_EMA_SHIFT = 7
+
+# Slow queries are logged from one background thread per process, off the query path
+_slow_queries = queue.Queue(maxsize=1024)
+_slow_drainer: Optional[threading.Thread] = None
+_slow_drainer_lock = threading.Lock()
+
+def _drain_slow_queries():
+    """Log slow queries queued by DatabaseOptimizer._record_query"""
+    while True:
+        elapsed_ns, query = _slow_queries.get()
+        logging.warning(f"Slow query detected: {elapsed_ns / 1e9:.3f}s - {query}...")
+
+def _start_slow_query_drainer():
+    """Start the shared drainer thread on first use"""
+    global _slow_drainer
+    with _slow_drainer_lock:
+        if _slow_drainer is None:
+            _slow_drainer = threading.Thread(target=_drain_slow_queries, name='slow-query-log', daemon=True)
+            _slow_drainer.start()
 
 class DatabaseOptimizer:
     """Database performance optimization and management"""
     
-    def __init__(self, db_path: str = 'search_system.db', pool_size: int = 10):
+    def __init__(self, db_path: str = 'search_system.db', pool_size: int = 10,
+                 maintenance_interval: Optional[float] = None):
         self.db_path = db_path
         self.pool_size = pool_size
-        self.connection_pool = []
-        self.pool_lock = threading.Lock()
-        self.stats = {
-            'queries_executed': 0,
-            'avg_query_time': 0,
-            'slow_queries': 0,
-            'cache_hits': 0,
-            'cache_misses': 0
-        }
+        # WAL single-writer model: one write connection, the rest read-only
+        self._writer = None
+        self.writer_lock = threading.RLock()
+        self._readers = queue.SimpleQueue()  # Idle readers (lock-free put/get)
+        self._legacy = queue.SimpleQueue()   # Idle get_connection() connections
+        self._closed = False
+        # Integer counters: queries executed, total time (ns), slow queries,
+        # recent (exponential moving) average time (ns)
+        self._stats = array('Q', [0, 0, 0, 0])
+        self._stats_lock = threading.Lock()
+        _start_slow_query_drainer()
         self._initialize_pool()
         self._create_indexes()
         
+        # Optional background incremental_optimize() every maintenance_interval seconds
+        self._maintenance_stop = threading.Event()
+        if maintenance_interval:
+            threading.Thread(target=self._maintenance_loop, args=(maintenance_interval,),
+                             name='db-maintenance', daemon=True).start()
+        
     def _initialize_pool(self):
         """Initialize connection pool"""
-        with self.pool_lock:
-            for _ in range(self.pool_size):
-                conn = sqlite3.connect(self.db_path, check_same_thread=False)
-                conn.row_factory = sqlite3.Row
-                
-                # Performance optimizations
-                conn.execute('PRAGMA journal_mode = WAL')  # Write-Ahead Logging
-                conn.execute('PRAGMA synchronous = NORMAL')  # Faster writes
-                conn.execute('PRAGMA cache_size = 10000')   # 10MB cache
-                conn.execute('PRAGMA temp_store = MEMORY')  # Memory temp tables
-                conn.execute('PRAGMA mmap_size = 268435456') # 256MB memory mapped
-                
-                self.connection_pool.append(conn)
+        # Writer first: it creates the file and switches it to WAL
+        self._writer = self._new_connection()
+        for _ in range(max(1, self.pool_size - 1)):
+            self._readers.put(self._new_connection(read_only=True))
+    
+    def _new_connection(self, read_only: bool = False, autocommit: bool = True) -> sqlite3.Connection:
+        """Open a tuned connection"""
+        if read_only:
+            target, uri = Path(self.db_path).resolve().as_uri() + '?mode=ro', True
+        else:
+            target, uri = self.db_path, False
+        
+        # Autocommit mode; explicit transactions are opened where batching matters
+        conn = sqlite3.connect(target, uri=uri, check_same_thread=False, cached_statements=256,
+                               isolation_level=None if autocommit else '')
+        conn.row_factory = sqlite3.Row
+        
+        # Performance optimizations, applied in a single script
+        conn.executescript(CONNECTION_PRAGMAS)
+        
+        return conn
+    
+    @contextmanager
+    def get_writer(self):
+        """Get the single write connection"""
+        with self.writer_lock:
+            yield self._writer
     
     @contextmanager
     def get_connection(self):
-        """Get connection from pool"""
-        conn = None
+        """Get a read-write connection from pool
+        
+        Kept for existing callers: implicit transactions, the caller commits.
+        New code should use get_reader()/get_writer().
+        """
+        try:
+            conn = self._legacy.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection(autocommit=False)
+        
+        try:
+            yield conn
+        finally:
+            if not self._closed and self._legacy.qsize() < self.pool_size:
+                self._legacy.put_nowait(conn)
+            else:
+                conn.close()
+    
+    @contextmanager
+    def get_reader(self):
+        """Get a read-only connection from pool (returned to the idle queue on exit)"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            # If pool empty, create temporary connection
+            conn = self._new_connection(read_only=True)
+        
         try:
-            with self.pool_lock:
-                if self.connection_pool:
-                    conn = self.connection_pool.pop()
-                else:
-                    # If pool empty, create temporary connection
-                    conn = sqlite3.connect(self.db_path)
-                    conn.row_factory = sqlite3.Row
-            
             yield conn
-            
         finally:
-            if conn:
-                with self.pool_lock:
-                    if len(self.connection_pool) < self.pool_size:
-                        self.connection_pool.append(conn)
-                    else:
-                        conn.close()
+            if not self._closed and self._readers.qsize() < self.pool_size:
+                self._readers.put_nowait(conn)
+            else:
+                conn.close()
+    
+    def _connection_for(self, query: str):
+        """Route reads to the reader pool and everything else to the writer"""
+        return self.get_reader() if _is_read_query(query) else self.get_writer()
     
     def _create_indexes(self):
         """Create performance indexes"""
@@ -76,20 +213,17 @@ class DatabaseOptimizer:
             "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)",
             
             # Documents table
-            "CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents(user_id)",
             "CREATE INDEX IF NOT EXISTS idx_documents_file_type ON documents(file_type)",
             "CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents(upload_date)",
             "CREATE INDEX IF NOT EXISTS idx_documents_is_processed ON documents(is_processed)",
             
             # Search logs
-            "CREATE INDEX IF NOT EXISTS idx_search_logs_user_id ON search_logs(user_id)",
             "CREATE INDEX IF NOT EXISTS idx_search_logs_timestamp ON search_logs(timestamp)",
             "CREATE INDEX IF NOT EXISTS idx_search_logs_query ON search_logs(query)",
             
             # Security events
             "CREATE INDEX IF NOT EXISTS idx_security_events_timestamp ON security_events(timestamp)",
             "CREATE INDEX IF NOT EXISTS idx_security_events_severity ON security_events(severity)",
-            "CREATE INDEX IF NOT EXISTS idx_security_events_event_type ON security_events(event_type)",
             "CREATE INDEX IF NOT EXISTS idx_security_events_ip ON security_events(ip_address)",
             
             # User sessions
@@ -120,49 +254,77 @@ class DatabaseOptimizer:
             "CREATE INDEX IF NOT EXISTS idx_security_events_type_time ON security_events(event_type, timestamp)",
         ]
         
-        with self.get_connection() as conn:
-            for index_sql in indexes:
+        with self.get_writer() as conn:
+            # Tables might not exist yet; only index the ones that do
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            indexes = [sql for sql in indexes if _INDEX_TABLE_RE.search(sql).group(1) in tables]
+            if indexes:
                 try:
-                    conn.execute(index_sql)
+                    conn.executescript(';\n'.join(indexes) + ';')
                 except sqlite3.Error as e:
-                    # Only log if it's not a "no such table" error since tables might not exist yet
-                    if "no such table" not in str(e).lower():
-                        logging.warning(f"Index creation failed: {e}")
-            conn.commit()
+                    logging.warning(f"Index creation failed: {e}")
+            
+            # Drop single-column indexes that duplicate a composite index prefix
+            try:
+                conn.executescript(''.join(f'DROP INDEX IF EXISTS {name};' for name in REDUNDANT_INDEXES))
+            except sqlite3.Error as e:
+                logging.warning(f"Dropping redundant indexes failed: {e}")
+            
+            self._create_fts_tables(conn, tables)
+    
+    def _create_fts_tables(self, conn: sqlite3.Connection, tables: set):
+        """Create FTS5 indexes (kept in sync by triggers) for text search columns"""
+        for table, column in FTS_TABLES:
+            if table not in tables:
+                continue
+            
+            fts_table = f'{table}_fts'
+            try:
+                conn.executescript(_FTS_SCHEMA_TEMPLATE.format(table=table, column=column))
+                if fts_table not in tables:
+                    # Newly created: index the rows that already exist
+                    conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            except sqlite3.Error as e:
+                logging.warning(f"FTS index creation failed for {table}: {e}")
     
     def execute_query(self, query: str, params: tuple = (), fetch_one: bool = False, 
-                     fetch_all: bool = True) -> Optional[List[Dict]]:
-        """Execute query with performance monitoring"""
-        start_time = time.time()
+                     fetch_all: bool = True, fetch_mode: str = 'rows') -> Any:
+        """Execute query with performance monitoring
+        
+        For SELECT/WITH statements fetch_mode='rows' returns a list of sqlite3.Row
+        objects (mapping access via row['col']); fetch_mode='dict_list' returns a
+        list of dicts for callers that need JSON serialization. Other statements
+        return the rowcount. fetch_one returns a single dict. On a database error
+        the result is None.
+        """
+        is_read = _is_read_query(query)
+        start_ns = time.perf_counter_ns()
         
         try:
-            with self.get_connection() as conn:
+            with self._connection_for(query) as conn:
                 cursor = conn.cursor()
+                if fetch_all and not fetch_one and fetch_mode != 'rows':
+                    # Plain tuples are built in C; zip them with the column names
+                    # instead of converting each sqlite3.Row through its mapping API
+                    cursor.row_factory = None
+                changes_before = conn.total_changes
                 cursor.execute(query, params)
                 
                 if fetch_one:
                     result = cursor.fetchone()
                     result = dict(result) if result else None
-                elif fetch_all:
-                    result = [dict(row) for row in cursor.fetchall()]
+                elif fetch_all and is_read and fetch_mode == 'rows':
+                    result = cursor.fetchall()
+                elif fetch_all and is_read:
+                    columns = [col[0] for col in cursor.description or ()]
+                    result = [dict(zip(columns, row)) for row in cursor]
                 else:
-                    result = cursor.rowcount
+                    # sqlite3 reports -1 for CTE-prefixed writes; count them from total_changes
+                    result = cursor.rowcount if cursor.rowcount >= 0 else conn.total_changes - changes_before
                 
                 conn.commit()
                 
-                # Performance tracking
-                execution_time = time.time() - start_time
-                self.stats['queries_executed'] += 1
-                
-                # Update average query time
-                current_avg = self.stats['avg_query_time']
-                total_queries = self.stats['queries_executed']
-                self.stats['avg_query_time'] = (current_avg * (total_queries - 1) + execution_time) / total_queries
-                
-                # Track slow queries (>100ms)
-                if execution_time > 0.1:
-                    self.stats['slow_queries'] += 1
-                    logging.warning(f"Slow query detected: {execution_time:.3f}s - {query[:100]}...")
+                self._record_query(query, time.perf_counter_ns() - start_ns)
                 
                 return result
                 
@@ -170,9 +332,27 @@ class DatabaseOptimizer:
             logging.error(f"Database query failed: {e}")
             return None
     
+    def _record_query(self, query: str, elapsed_ns: int):
+        """Update performance counters"""
+        slow = elapsed_ns > SLOW_QUERY_NS
+        stats = self._stats
+        with self._stats_lock:
+            stats[_QUERIES] += 1
+            stats[_TOTAL_NS] += elapsed_ns
+            recent = stats[_RECENT_NS]
+            stats[_RECENT_NS] = recent - (recent >> _EMA_SHIFT) + (elapsed_ns >> _EMA_SHIFT)
+            if slow:
+                stats[_SLOW] += 1
+        
+        if slow:
+            try:
+                _slow_queries.put_nowait((elapsed_ns, query[:100]))
+            except queue.Full:
+                pass
+    
     def get_performance_stats(self) -> Dict[str, Any]:
         """Get database performance statistics"""
-        with self.get_connection() as conn:
+        with self.get_reader() as conn:
             cursor = conn.cursor()
             
             # Database size
@@ -190,27 +370,49 @@ class DatabaseOptimizer:
             cursor.execute("PRAGMA journal_mode")
             journal_mode = cursor.fetchone()[0]
             
+            with self._stats_lock:
+                queries, total_ns, slow_queries, recent_ns = self._stats
+            
             return {
                 'database_size_mb': round(db_size_mb, 2),
                 'cache_size_pages': cache_size,
                 'journal_mode': journal_mode,
-                'connection_pool_size': len(self.connection_pool),
-                'queries_executed': self.stats['queries_executed'],
-                'avg_query_time_ms': round(self.stats['avg_query_time'] * 1000, 2),
-                'slow_queries': self.stats['slow_queries'],
-                'slow_query_percentage': round((self.stats['slow_queries'] / max(1, self.stats['queries_executed'])) * 100, 2)
+                'connection_pool_size': self._readers.qsize(),
+                'queries_executed': queries,
+                'avg_query_time_ms': round(total_ns / max(1, queries) / 1e6, 2),
+                'recent_avg_query_time_ms': round(recent_ns / 1e6, 2),
+                'slow_queries': slow_queries,
+                'slow_query_percentage': round((slow_queries / max(1, queries)) * 100, 2)
             }
     
-    def optimize_database(self):
-        """Run database optimization commands"""
-        optimization_commands = [
-            "PRAGMA optimize",           # Query planner optimization
+    def incremental_optimize(self):
+        """Cheap routine maintenance; safe to run on a schedule"""
+        self._run_maintenance([
+            "PRAGMA optimize",                  # ANALYZE only where statistics are stale
+            "PRAGMA wal_checkpoint(TRUNCATE)"   # Fold the WAL back and reset it
+        ])
+    
+    def full_vacuum(self):
+        """Rebuild the database file; holds an exclusive lock, use in maintenance windows"""
+        self._run_maintenance([
             "VACUUM",                   # Rebuild database file
             "REINDEX",                  # Rebuild all indexes
             "ANALYZE"                   # Update query planner statistics
-        ]
-        
-        with self.get_connection() as conn:
+        ])
+    
+    def optimize_database(self):
+        """Run database optimization commands (full rebuild; routine maintenance: incremental_optimize)"""
+        self._run_maintenance(["PRAGMA optimize"])   # Query planner optimization
+        self.full_vacuum()
+    
+    def _maintenance_loop(self, interval: float):
+        """Run incremental_optimize every interval seconds until close_pool"""
+        while not self._maintenance_stop.wait(interval):
+            self.incremental_optimize()
+    
+    def _run_maintenance(self, optimization_commands: List[str]):
+        """Run database optimization commands on the writer"""
+        with self.get_writer() as conn:
             for command in optimization_commands:
                 try:
                     logging.info(f"Running database optimization: {command}")
@@ -220,51 +422,109 @@ class DatabaseOptimizer:
     
     def cleanup_old_data(self, days_to_keep: int = 90):
         """Clean up old data to maintain performance"""
+        # Constant SQL text with bound intervals so statements hit the cache across calls
+        keep = f'-{days_to_keep} days'
         cleanup_queries = [
             # Clean old search logs
-            f"DELETE FROM search_logs WHERE timestamp < datetime('now', '-{days_to_keep} days')",
+            ("DELETE FROM search_logs WHERE timestamp < datetime('now', ?)", (keep,)),
             
             # Clean old security events (keep high severity longer)
-            f"DELETE FROM security_events WHERE timestamp < datetime('now', '-{days_to_keep} days') AND severity != 'high'",
-            f"DELETE FROM security_events WHERE timestamp < datetime('now', '-{days_to_keep * 2} days')",
+            ("DELETE FROM security_events WHERE timestamp < datetime('now', ?) AND severity != 'high'", (keep,)),
+            ("DELETE FROM security_events WHERE timestamp < datetime('now', ?)", (f'-{days_to_keep * 2} days',)),
             
             # Clean old rate limit entries
-            f"DELETE FROM rate_limits WHERE window_start < datetime('now', '-1 day')",
+            ("DELETE FROM rate_limits WHERE window_start < datetime('now', '-1 day')", ()),
             
             # Clean old login attempts
-            f"DELETE FROM login_attempts WHERE attempt_time < datetime('now', '-{days_to_keep} days')",
+            ("DELETE FROM login_attempts WHERE attempt_time < datetime('now', ?)", (keep,)),
             
             # Clean expired sessions
-            "DELETE FROM user_sessions WHERE expires_at < CURRENT_TIMESTAMP OR is_active = FALSE"
+            ("DELETE FROM user_sessions WHERE expires_at < CURRENT_TIMESTAMP OR is_active = FALSE", ())
         ]
         
         deleted_rows = 0
-        with self.get_connection() as conn:
-            for query in cleanup_queries:
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute(query)
-                    deleted_rows += cursor.rowcount
-                    logging.info(f"Cleanup query executed: {cursor.rowcount} rows deleted")
-                except sqlite3.Error as e:
-                    logging.error(f"Cleanup failed: {e}")
-            
-            conn.commit()
+        with self.get_writer() as conn:
+            # Single write transaction so the WAL is synced once for all deletes
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for query, params in cleanup_queries:
+                    try:
+                        cursor = conn.execute(query, params)
+                        deleted_rows += cursor.rowcount
+                        logging.info(f"Cleanup query executed: {cursor.rowcount} rows deleted")
+                    except sqlite3.Error as e:
+                        logging.error(f"Cleanup failed: {e}")
+                
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
         
         return deleted_rows
     
     def close_pool(self):
-        """Close all connections in pool"""
-        with self.pool_lock:
-            for conn in self.connection_pool:
-                conn.close()
-            self.connection_pool.clear()
+        """Close all connections in pool (readers still checked out close on return)"""
+        self._closed = True
+        self._maintenance_stop.set()
+        for idle in (self._readers, self._legacy):
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        
+        with self.writer_lock:
+            if self._writer is not None:
+                try:
+                    # Runs only the ANALYZE steps needed since the last call
+                    self._writer.execute('PRAGMA optimize')
+                except sqlite3.Error as e:
+                    logging.warning(f"PRAGMA optimize on close failed: {e}")
+                self._writer.close()
+                self._writer = None
+
+# Search history: page query and total count are separate constant statements,
+# so the page query can stop after LIMIT rows instead of materializing all of them
+_SEARCH_TERM_FILTER = "AND sl.id IN (SELECT rowid FROM search_logs_fts WHERE search_logs_fts MATCH ?)"
+
+# Keyset ("seek") pagination: continue after the previous page's last
+# (timestamp, id) instead of skipping OFFSET rows. Indexes on rowid tables
+# already end in the rowid, so idx_search_logs_user_time serves this order.
+_SEARCH_SEEK_FILTER = "AND (sl.timestamp, sl.id) < (?, ?)"
+
+_SEARCH_HISTORY_PAGE_TEMPLATE = """
+    SELECT sl.*
+    FROM search_logs sl
+    WHERE sl.user_id = ? {term_filter} {seek_filter}
+    ORDER BY sl.timestamp DESC, sl.id DESC
+    {page_clause}
+"""
+
+_SEARCH_HISTORY_COUNT_TEMPLATE = """
+    SELECT COUNT(*) AS total
+    FROM search_logs sl
+    WHERE sl.user_id = ? {term_filter}
+"""
+
+# Keyed by (has search term, has seek cursor)
+_SEARCH_HISTORY_PAGES = {
+    (term, seek): _SEARCH_HISTORY_PAGE_TEMPLATE.format(
+        term_filter=_SEARCH_TERM_FILTER if term else '',
+        seek_filter=_SEARCH_SEEK_FILTER if seek else '',
+        page_clause='LIMIT ?' if seek else 'LIMIT ? OFFSET ?'
+    )
+    for term in (False, True) for seek in (False, True)
+}
+_SEARCH_HISTORY_COUNT = _SEARCH_HISTORY_COUNT_TEMPLATE.format(term_filter='')
+_SEARCH_HISTORY_COUNT_TERM = _SEARCH_HISTORY_COUNT_TEMPLATE.format(term_filter=_SEARCH_TERM_FILTER)
 
 # Query optimization helpers
 class QueryOptimizer:
     """SQL query optimization utilities"""
     
+    # SQL assembly is memoized; functools.lru_cache is thread-safe in CPython
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def paginate_query(base_query: str, page: int = 1, per_page: int = 20) -> str:
         """Add pagination to query"""
         offset = (page - 1) * per_page
@@ -273,12 +533,39 @@ class QueryOptimizer:
     @staticmethod
     def add_search_conditions(base_query: str, search_term: str = None, 
                             date_from: str = None, date_to: str = None,
-                            additional_filters: Dict[str, Any] = None) -> tuple:
-        """Add search conditions to query"""
+                            additional_filters: Dict[str, Any] = None,
+                            fts_table: str = None, fts_column: str = None) -> tuple:
+        """Add search conditions to query
+        
+        search_term is a LIKE substring match on query/file_name. When the base
+        query reads a table with an FTS index (see FTS_TABLES), pass its FTS table
+        (e.g. 'search_logs_fts') and optionally the column: matching then becomes
+        FTS token-prefix matching ("rep" finds "report", "port" does not).
+        """
+        # Item tuples keep the caller's filter order (conditions and params follow it)
+        key = (base_query, search_term, date_from, date_to,
+               tuple(additional_filters.items()) if additional_filters else (), fts_table, fts_column)
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable filter value (list, dict, ...): build without the cache
+            return QueryOptimizer._build_search_conditions.__wrapped__(*key)
+        return QueryOptimizer._build_search_conditions(*key)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _build_search_conditions(base_query: str, search_term: Optional[str], date_from: Optional[str],
+                                 date_to: Optional[str], filters: Tuple[Tuple[str, Any], ...],
+                                 fts_table: Optional[str] = None, fts_column: Optional[str] = None) -> tuple:
+        """Memoized body of add_search_conditions (filters as item tuples)"""
         conditions = []
         params = []
         
-        if search_term:
+        if search_term and fts_table:
+            if search_term.strip():
+                conditions.append(f"rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_column or fts_table} MATCH ?)")
+                params.append(fts_match_expression(search_term))
+        elif search_term:
             conditions.append("(query LIKE ? OR file_name LIKE ?)")
             params.extend([f"%{search_term}%", f"%{search_term}%"])
         
@@ -290,10 +577,9 @@ class QueryOptimizer:
             conditions.append("timestamp <= ?")
             params.append(date_to)
         
-        if additional_filters:
-            for field, value in additional_filters.items():
-                conditions.append(f"{field} = ?")
-                params.append(value)
+        for field, value in filters:
+            conditions.append(f"{field} = ?")
+            params.append(value)
         
         if conditions:
             where_clause = "WHERE " + " AND ".join(conditions)
@@ -305,49 +591,81 @@ class QueryOptimizer:
     
     @staticmethod
     def get_optimized_search_history_query(user_id: int, page: int = 1, 
-                                         per_page: int = 20, search_term: str = None) -> tuple:
-        """Get optimized search history query"""
-        base_query = """
-            SELECT sl.*, COUNT(*) OVER() as total_count
-            FROM search_logs sl
+                                         per_page: int = 20, search_term: str = None,
+                                         cursor_timestamp: str = None, cursor_id: int = None) -> tuple:
+        """Get optimized search history query (total count: get_search_history_total)
+        
+        Pass the previous page's next_page_cursor() as cursor_timestamp/cursor_id
+        to seek past it; page is then ignored.
         """
+        has_term = bool(search_term and search_term.strip())
+        seek = cursor_timestamp is not None and cursor_id is not None
+        query = _SEARCH_HISTORY_PAGES[(has_term, seek)]
         
-        # Add search conditions
-        conditions = ["sl.user_id = ?"]
         params = [user_id]
+        if has_term:
+            params.append(fts_match_expression(search_term))
         
-        if search_term:
-            conditions.append("sl.query LIKE ?")
-            params.append(f"%{search_term}%")
-        
-        where_clause = "WHERE " + " AND ".join(conditions)
-        
-        # Add ordering and pagination
-        query = f"""
-            {base_query}
-            {where_clause}
-            ORDER BY sl.timestamp DESC
-            LIMIT ? OFFSET ?
-        """
-        
-        offset = (page - 1) * per_page
-        params.extend([per_page, offset])
+        if seek:
+            params.extend([cursor_timestamp, cursor_id, per_page])
+        else:
+            params.extend([per_page, (page - 1) * per_page])
         
         return query, tuple(params)
 
 # Global optimizer instance with correct database path
 import os
 db_path = os.path.join(os.path.dirname(__file__), 'config', 'users.db')
-db_optimizer = DatabaseOptimizer(db_path=db_path)
+_db_optimizer: Optional[DatabaseOptimizer] = None
+_db_optimizer_lock = threading.Lock()
+
+def get_db_optimizer() -> DatabaseOptimizer:
+    """Return the shared optimizer, opening the pool on first use"""
+    global _db_optimizer
+    if _db_optimizer is None:
+        with _db_optimizer_lock:
+            if _db_optimizer is None:
+                _db_optimizer = DatabaseOptimizer(db_path=db_path,
+                                                  maintenance_interval=INCREMENTAL_OPTIMIZE_INTERVAL_S)
+    return _db_optimizer
 
 # Usage examples and helper functions
+def next_page_cursor(rows: List[sqlite3.Row], per_page: int, time_column: str = 'timestamp') -> Optional[tuple]:
+    """Seek cursor (time value, id) for the page after rows, or None on the last page"""
+    if len(rows) < per_page:
+        return None
+    last = rows[-1]
+    return last[time_column], last['id']
+
+def get_search_history_total(user_id: int, search_term: str = None) -> int:
+    """Count search history rows for pagination metadata"""
+    if search_term and search_term.strip():
+        query, params = _SEARCH_HISTORY_COUNT_TERM, (user_id, fts_match_expression(search_term))
+    else:
+        query, params = _SEARCH_HISTORY_COUNT, (user_id,)
+    
+    row = get_db_optimizer().execute_query(query, params, fetch_one=True)
+    
+    return row['total'] if row else 0
+
 def get_optimized_user_documents(user_id: int, page: int = 1, per_page: int = 20, 
-                               file_type: str = None) -> List[Dict]:
-    """Get user documents with optimization"""
+                               file_type: str = None, search_term: str = None,
+                               cursor_upload_date: str = None, cursor_id: int = None) -> List[Dict]:
+    """Get user documents with optimization
+    
+    Pass next_page_cursor(rows, per_page, 'upload_date') from the previous page as
+    cursor_upload_date/cursor_id for keyset pagination; page is then ignored.
+    """
+    # Insight columns come from correlated subqueries, evaluated only for the
+    # rows that survive ORDER BY/LIMIT instead of joining every document first.
+    # Both use the same total order, so they read the same (latest) insight row.
     base_query = """
-        SELECT d.*, di.business_category, di.sentiment_score
+        SELECT d.*,
+            (SELECT business_category FROM document_insights WHERE document_id = d.id
+             ORDER BY processed_at DESC, id DESC LIMIT 1) AS business_category,
+            (SELECT sentiment_score FROM document_insights WHERE document_id = d.id
+             ORDER BY processed_at DESC, id DESC LIMIT 1) AS sentiment_score
         FROM documents d
-        LEFT JOIN document_insights di ON d.id = di.document_id
     """
     
     conditions = ["d.user_id = ?"]
@@ -357,51 +675,73 @@ def get_optimized_user_documents(user_id: int, page: int = 1, per_page: int = 20
         conditions.append("d.file_type = ?")
         params.append(file_type)
     
+    if search_term and search_term.strip():
+        conditions.append("d.id IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?)")
+        params.append(fts_match_expression(search_term))
+    
+    seek = cursor_upload_date is not None and cursor_id is not None
+    if seek:
+        conditions.append("(d.upload_date, d.id) < (?, ?)")
+        params.extend([cursor_upload_date, cursor_id])
+    
     where_clause = "WHERE " + " AND ".join(conditions)
     
     query = f"""
         {base_query}
         {where_clause}
-        ORDER BY d.upload_date DESC
-        LIMIT ? OFFSET ?
+        ORDER BY d.upload_date DESC, d.id DESC
+        {'LIMIT ?' if seek else 'LIMIT ? OFFSET ?'}
     """
     
-    offset = (page - 1) * per_page
-    params.extend([per_page, offset])
+    params.append(per_page)
+    if not seek:
+        params.append((page - 1) * per_page)
     
-    return db_optimizer.execute_query(query, tuple(params))
+    # Dicts, not sqlite3.Row: the result is passed straight to jsonify
+    return get_db_optimizer().execute_query(query, tuple(params), fetch_mode='dict_list')
+
+# Analytics CTE; the user filter is spliced in once at import time so each
+# variant is a constant SQL text and the planner can seek on the user indexes
+_ANALYTICS_QUERY_TEMPLATE = """
+    WITH document_stats AS (
+        SELECT 
+            COUNT(*) as total_documents,
+            COUNT(DISTINCT file_type) as file_types,
+            AVG(CASE WHEN is_processed THEN 1 ELSE 0 END) as processing_rate
+        FROM documents 
+        WHERE {user_filter}
+    ),
+    search_stats AS (
+        SELECT 
+            COUNT(*) as total_searches,
+            COUNT(DISTINCT query) as unique_queries,
+            AVG(results_count) as avg_results
+        FROM search_logs 
+        WHERE {user_filter} 
+            AND timestamp >= datetime('now', ?)
+    ),
+    recent_activity AS (
+        SELECT COUNT(*) as recent_documents
+        FROM documents 
+        WHERE {user_filter}
+            AND upload_date >= datetime('now', ?)
+    )
+    SELECT * FROM document_stats, search_stats, recent_activity
+"""
+_ANALYTICS_QUERY_USER = _ANALYTICS_QUERY_TEMPLATE.format(user_filter='user_id = ?')
+_ANALYTICS_QUERY_ALL = _ANALYTICS_QUERY_TEMPLATE.format(user_filter='1')
 
 def get_dashboard_analytics_optimized(user_id: int = None, days: int = 30) -> Dict[str, Any]:
     """Get dashboard analytics with optimized queries"""
-    # Use single query for multiple metrics
-    analytics_query = """
-        WITH document_stats AS (
-            SELECT 
-                COUNT(*) as total_documents,
-                COUNT(DISTINCT file_type) as file_types,
-                AVG(CASE WHEN is_processed THEN 1 ELSE 0 END) as processing_rate
-            FROM documents 
-            WHERE user_id = ? OR ? IS NULL
-        ),
-        search_stats AS (
-            SELECT 
-                COUNT(*) as total_searches,
-                COUNT(DISTINCT query) as unique_queries,
-                AVG(results_count) as avg_results
-            FROM search_logs 
-            WHERE (user_id = ? OR ? IS NULL) 
-                AND timestamp >= datetime('now', '-{} days')
-        ),
-        recent_activity AS (
-            SELECT COUNT(*) as recent_documents
-            FROM documents 
-            WHERE (user_id = ? OR ? IS NULL)
-                AND upload_date >= datetime('now', '-{} days')
-        )
-        SELECT * FROM document_stats, search_stats, recent_activity
-    """.format(days, days)
-    
-    params = [user_id, user_id, user_id, user_id, user_id, user_id]
-    result = db_optimizer.execute_query(analytics_query, tuple(params), fetch_one=True)
-    
-    return result or {}
\ No newline at end of file
+    # Interval is bound, so the SQL text stays constant for the statement cache
+    since = f'-{days} days'
+    if user_id is None:
+        analytics_query = _ANALYTICS_QUERY_ALL
+        params = (since, since)
+    else:
+        analytics_query = _ANALYTICS_QUERY_USER
+        params = (user_id, user_id, since, user_id, since)
+    
+    row = get_db_optimizer().execute_query(analytics_query, params, fetch_one=True)
+    
+    return dict(row) if row else {}
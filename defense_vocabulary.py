@@ -3,21 +3,114 @@ Savunma Sanayi Terminolojisi ve Domain-Specific Vocabulary
 """
 
 import json
+import os
 import re
-from typing import Dict, List, Set
+import functools
+import threading
+from typing import Dict, List, Optional, Set, Tuple
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Kritik güvenlik terimleri (terim içinde geçmesi yeterli, ör. "güvenlik123")
+_CRITICAL_TERMS = frozenset(("güvenlik", "tehdit", "risk", "kritik", "gizli", "alarm"))
+_CRITICAL_RE = re.compile("|".join(map(re.escape, sorted(_CRITICAL_TERMS))))
+
 class DefenseVocabulary:
     """Savunma sanayi domain-specific vocabulary ve term mapping sistemi"""
     
+    # Sözlüklerden türetilen arama tabloları (ilk erişimde hesaplanır)
+    _LOOKUP_TABLES = ('_cat_terms_folded', '_folded_to_cat', '_syn_keys_folded', '_reverse_syn',
+                      '_abbr_upper', '_abbr_folded', '_syn_folded')
+    
     def __init__(self):
-        self.defense_terms = self._load_defense_terms()
-        self.synonyms = self._load_synonyms()
-        self.abbreviations = self._load_abbreviations()
-        self.technical_terms = self._load_technical_terms()
+        # Saf sorgu fonksiyonları için örnek başına önbellek (tekrarlayan sorgular)
+        self.expand_query = functools.lru_cache(maxsize=4096)(self.expand_query)
+        self.is_defense_term = functools.lru_cache(maxsize=4096)(self.is_defense_term)
+        self.get_related_terms = functools.lru_cache(maxsize=4096)(self.get_related_terms)
+    
+    # Sözlükler ilk erişimde yüklenir; load_vocabulary_from_file örnek özniteliği olarak üzerine yazar
+    @functools.cached_property
+    def defense_terms(self) -> Dict[str, List[str]]:
+        return self._load_defense_terms()
+    
+    @functools.cached_property
+    def synonyms(self) -> Dict[str, List[str]]:
+        return self._load_synonyms()
+    
+    @functools.cached_property
+    def abbreviations(self) -> Dict[str, str]:
+        return self._load_abbreviations()
+    
+    @functools.cached_property
+    def technical_terms(self) -> Dict[str, str]:
+        return self._load_technical_terms()
+    
+    def _clear_caches(self):
+        """Vocabulary değiştiğinde önbellekleri temizle"""
+        self.expand_query.cache_clear()
+        self.is_defense_term.cache_clear()
+        self.get_related_terms.cache_clear()
+    
+    def _invalidate_lookup_tables(self):
+        """Türetilmiş arama tablolarını düşür; bir sonraki erişimde yeniden hesaplanır
         
+        Sözlükler değiştiğinde çağrılmalıdır.
+        """
+        for name in self._LOOKUP_TABLES:
+            self.__dict__.pop(name, None)
+    
+    # casefold() edilmiş arama tabloları (O(1) üyelik kontrolü);
+    # casefold() Türkçe 'İ' gibi harflerde lower()'dan daha tutarlıdır
+    @functools.cached_property
+    def _cat_terms_folded(self) -> Dict[str, Tuple[Tuple[str, str], ...]]:
+        """Kategori -> (orijinal, casefold) çiftleri"""
+        return {cat: tuple((t, t.casefold()) for t in terms)
+                for cat, terms in self.defense_terms.items()}
+    
+    @functools.cached_property
+    def _folded_to_cat(self) -> Dict[str, str]:
+        """Terim -> kategori (terim birden fazla kategoride olabilir; ilk kategori geçerli)"""
+        folded_to_cat = {}
+        for cat, terms in self._cat_terms_folded.items():
+            for _, folded in terms:
+                folded_to_cat.setdefault(folded, cat)
+        return folded_to_cat
+    
+    @functools.cached_property
+    def _syn_keys_folded(self) -> frozenset:
+        return frozenset(k.casefold() for k in self.synonyms)
+    
+    @functools.cached_property
+    def _reverse_syn(self) -> Dict[str, List[str]]:
+        """Eş anlamlı -> ait olduğu anahtar(lar)"""
+        reverse_syn = {}
+        for key, syns in self.synonyms.items():
+            for syn in syns:
+                keys = reverse_syn.setdefault(syn.casefold(), [])
+                if key not in keys:
+                    keys.append(key)
+        return reverse_syn
+    
+    @functools.cached_property
+    def _abbr_upper(self) -> frozenset:
+        return frozenset(self.abbreviations)
+    
+    # expand_query için önceden casefold edilmiş anahtarlar (sözlük sırasıyla)
+    @functools.cached_property
+    def _abbr_folded(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple((abbr.casefold(), full_form) for abbr, full_form in self.abbreviations.items())
+    
+    @functools.cached_property
+    def _syn_folded(self) -> Tuple[Tuple[str, List[str]], ...]:
+        return tuple((term.casefold(), synonyms) for term, synonyms in self.synonyms.items())
+    
     def _load_defense_terms(self) -> Dict[str, List[str]]:
         """Savunma sanayi temel terimleri"""
         return {
@@ -114,16 +207,16 @@ class DefenseVocabulary:
     def expand_query(self, query: str) -> str:
         """Query'yi domain-specific terimlerle genişlet"""
         expanded_terms = []
-        query_lower = query.lower()
+        q = query.casefold()
         
         # Kısaltmaları açıklamalarla değiştir
-        for abbr, full_form in self.abbreviations.items():
-            if abbr.lower() in query_lower:
+        for abbr_folded, full_form in self._abbr_folded:
+            if abbr_folded in q:
                 expanded_terms.append(full_form)
         
         # Eş anlamlıları ekle
-        for term, synonyms in self.synonyms.items():
-            if term.lower() in query_lower:
+        for term_folded, synonyms in self._syn_folded:
+            if term_folded in q:
                 expanded_terms.extend(synonyms)
         
         # Orijinal query + genişletilmiş terimler
@@ -132,59 +225,48 @@ class DefenseVocabulary:
         
         return query
     
-    def get_related_terms(self, term: str) -> List[str]:
-        """Bir terimle ilgili terimleri getir"""
-        term_lower = term.lower()
-        related = []
+    def get_related_terms(self, term: str) -> Tuple[str, ...]:
+        """Bir terimle ilgili terimleri getir (sıralı, tekrarsız, en fazla 10)"""
+        q = term.casefold()
         
-        # Aynı kategorideki terimleri bul
-        for category, terms in self.defense_terms.items():
-            if term_lower in [t.lower() for t in terms]:
-                related.extend([t for t in terms if t.lower() != term_lower])
-                break
+        # Aynı kategorideki terimler, eş anlamlılar ve tersine eş anlamlı arama
+        category = self._folded_to_cat.get(q)
+        sources = (
+            (t for t, folded in self._cat_terms_folded[category] if folded != q) if category is not None else (),
+            self.synonyms.get(term, ()),
+            self._reverse_syn.get(q, ()),
+        )
         
-        # Eş anlamlıları ekle
-        if term in self.synonyms:
-            related.extend(self.synonyms[term])
-        
-        # Tersine eş anlamlı arama
-        for key, synonyms in self.synonyms.items():
-            if term_lower in [s.lower() for s in synonyms] and key not in related:
-                related.append(key)
+        # Tek geçişte tekrarları ele ve 10 terime ulaşınca dur
+        seen = {}
+        for source in sources:
+            for t in source:
+                seen.setdefault(t, None)
+                if len(seen) == 10:
+                    return tuple(seen)
         
-        return list(set(related))[:10]  # En fazla 10 ilgili terim
+        return tuple(seen)
     
     def is_defense_term(self, term: str) -> bool:
         """Terimin savunma sanayi terimi olup olmadığını kontrol et"""
-        term_lower = term.lower()
-        
-        # Ana kategorilerde ara
-        for category, terms in self.defense_terms.items():
-            if term_lower in [t.lower() for t in terms]:
-                return True
+        q = term.casefold()
         
-        # Kısaltmalarda ara
-        if term.upper() in self.abbreviations:
-            return True
-        
-        # Eş anlamlılarda ara
-        for key, synonyms in self.synonyms.items():
-            if term_lower == key.lower() or term_lower in [s.lower() for s in synonyms]:
-                return True
-        
-        return False
+        # Ana kategoriler, kısaltmalar ve eş anlamlılar
+        return (q in self._folded_to_cat
+                or term.upper() in self._abbr_upper
+                or q in self._syn_keys_folded
+                or q in self._reverse_syn)
     
     def get_term_importance_weight(self, term: str) -> float:
         """Terimin önem ağırlığını hesapla"""
-        term_lower = term.lower()
+        q = term.casefold()
         
         # Kritik güvenlik terimleri
-        critical_terms = ["güvenlik", "tehdit", "risk", "kritik", "gizli", "alarm"]
-        if any(ct in term_lower for ct in critical_terms):
+        if q in _CRITICAL_TERMS or _CRITICAL_RE.search(q):
             return 2.0
         
         # Teknik terimler
-        if term in self.technical_terms or term.upper() in self.abbreviations:
+        if term in self.technical_terms or term.upper() in self._abbr_upper:
             return 1.5
         
         # Genel savunma terimleri
@@ -203,8 +285,17 @@ class DefenseVocabulary:
         }
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(vocab_data, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                blob = orjson.dumps(vocab_data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+            else:
+                blob = json.dumps(vocab_data, ensure_ascii=False, indent=2).encode('utf-8')
+            
+            # Atomik yazım: geçici dosya + os.replace
+            tmp_path = filepath + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, filepath)
+            
             logger.info(f"Vocabulary saved to {filepath}")
         except Exception as e:
             logger.error(f"Error saving vocabulary: {e}")
@@ -219,15 +310,30 @@ class DefenseVocabulary:
             self.synonyms = vocab_data.get("synonyms", {})
             self.abbreviations = vocab_data.get("abbreviations", {})
             self.technical_terms = vocab_data.get("technical_terms", {})
+            self._invalidate_lookup_tables()
+            self._clear_caches()
             
             logger.info(f"Vocabulary loaded from {filepath}")
         except Exception as e:
             logger.error(f"Error loading vocabulary: {e}")
 
+# Süreç genelinde paylaşılan örnek (sözlükler ve sorgu önbellekleri tek kez kurulur)
+_default_vocab: Optional[DefenseVocabulary] = None
+_default_vocab_lock = threading.Lock()
+
+def get_default_vocabulary() -> DefenseVocabulary:
+    """Paylaşılan DefenseVocabulary örneğini döndür, ilk çağrıda oluştur"""
+    global _default_vocab
+    if _default_vocab is None:
+        with _default_vocab_lock:
+            if _default_vocab is None:
+                _default_vocab = DefenseVocabulary()
+    return _default_vocab
+
 # Test fonksiyonu
 def test_defense_vocabulary():
     """Defense vocabulary sistemini test et"""
-    vocab = DefenseVocabulary()
+    vocab = get_default_vocabulary()
     
     print("=== Defense Vocabulary Test ===")
     
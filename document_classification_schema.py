@@ -5,216 +5,247 @@ Enhanced database schema for professional categorization and security levels
 
 import sqlite3
 import os
+import json
 from datetime import datetime
 
-def create_classification_tables():
+# Tables created by _SCHEMA_SQL, in creation order
+CLASSIFICATION_TABLES = (
+    'professional_categories',
+    'security_levels',
+    'user_permissions',
+    'document_classifications',
+    'access_audit_log',
+    'classification_rules',
+)
+
+# Classification schema, executed as a single script
+_SCHEMA_SQL = """
+    -- 1. Professional Categories (Meslek Grupları)
+    CREATE TABLE IF NOT EXISTS professional_categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        color_code TEXT DEFAULT '#667eea',
+        icon TEXT DEFAULT 'folder',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        created_by INTEGER,
+        is_active BOOLEAN DEFAULT 1,
+        FOREIGN KEY (created_by) REFERENCES users (id)
+    );
+
+    -- 2. Security Levels (Gizlilik Seviyeleri)
+    CREATE TABLE IF NOT EXISTS security_levels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        level_number INTEGER UNIQUE NOT NULL,
+        description TEXT,
+        color_code TEXT DEFAULT '#10b981',
+        requirements TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1
+    );
+
+    -- 3. User Permissions (Kullanıcı Yetkileri)
+    CREATE TABLE IF NOT EXISTS user_permissions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER,
+        security_level_id INTEGER,
+        permission_type TEXT DEFAULT 'read',
+        granted_by INTEGER NOT NULL,
+        granted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        expires_at DATETIME,
+        is_active BOOLEAN DEFAULT 1,
+        notes TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (category_id) REFERENCES professional_categories (id),
+        FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
+        FOREIGN KEY (granted_by) REFERENCES users (id),
+        UNIQUE(user_id, category_id, security_level_id)
+    );
+
+    -- 4. Document Classifications (Belge Sınıflandırma)
+    CREATE TABLE IF NOT EXISTS document_classifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        security_level_id INTEGER NOT NULL,
+        classification_method TEXT DEFAULT 'manual',
+        confidence_score REAL DEFAULT 1.0,
+        classified_by INTEGER NOT NULL,
+        classified_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        review_required BOOLEAN DEFAULT 0,
+        review_date DATETIME,
+        reviewed_by INTEGER,
+        notes TEXT,
+        FOREIGN KEY (document_id) REFERENCES documents (id),
+        FOREIGN KEY (category_id) REFERENCES professional_categories (id),
+        FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
+        FOREIGN KEY (classified_by) REFERENCES users (id),
+        FOREIGN KEY (reviewed_by) REFERENCES users (id),
+        UNIQUE(document_id)
+    );
+
+    -- 5. Access Audit Log (Erişim Denetim Kaydı)
+    CREATE TABLE IF NOT EXISTS access_audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        access_granted BOOLEAN NOT NULL,
+        reason TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        session_id TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (document_id) REFERENCES documents (id)
+    );
+
+    -- 6. Classification Rules (Otomatik Sınıflandırma Kuralları)
+    CREATE TABLE IF NOT EXISTS classification_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        keywords TEXT NOT NULL CHECK(json_valid(keywords)),  -- JSON array
+        category_id INTEGER NOT NULL,
+        security_level_id INTEGER NOT NULL,
+        confidence_threshold REAL DEFAULT 0.8,
+        is_active BOOLEAN DEFAULT 1,
+        created_by INTEGER NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES professional_categories (id),
+        FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
+        FOREIGN KEY (created_by) REFERENCES users (id)
+    );
+
+    -- Hot lookup paths for audit and classification queries
+    CREATE INDEX IF NOT EXISTS idx_audit_user_time ON access_audit_log(user_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_docclass_doc ON document_classifications(document_id);
+    CREATE INDEX IF NOT EXISTS idx_userperms_user ON user_permissions(user_id, is_active);
+"""
+
+def keywords_to_json(keywords: str) -> str:
+    """Serialize a comma-separated keyword string as a JSON array"""
+    return json.dumps([kw.strip() for kw in keywords.split(',')], ensure_ascii=False)
+
+def create_classification_tables(db_path: str = None):
     """Create tables for document classification and user permissions"""
     
     # Database path
-    db_path = os.path.join(os.path.dirname(__file__), 'config', 'users.db')
-    
-    # Connect to existing database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    print("🏗️ Creating document classification tables...")
-    
-    # 1. Professional Categories (Meslek Grupları)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS professional_categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            description TEXT,
-            color_code TEXT DEFAULT '#667eea',
-            icon TEXT DEFAULT 'folder',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            created_by INTEGER,
-            is_active BOOLEAN DEFAULT 1,
-            FOREIGN KEY (created_by) REFERENCES users (id)
-        )
-    ''')
-    
-    # 2. Security Levels (Gizlilik Seviyeleri)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS security_levels (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            level_number INTEGER UNIQUE NOT NULL,
-            description TEXT,
-            color_code TEXT DEFAULT '#10b981',
-            requirements TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
-    
-    # 3. User Permissions (Kullanıcı Yetkileri)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_permissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            category_id INTEGER,
-            security_level_id INTEGER,
-            permission_type TEXT DEFAULT 'read',
-            granted_by INTEGER NOT NULL,
-            granted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            expires_at DATETIME,
-            is_active BOOLEAN DEFAULT 1,
-            notes TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (category_id) REFERENCES professional_categories (id),
-            FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
-            FOREIGN KEY (granted_by) REFERENCES users (id),
-            UNIQUE(user_id, category_id, security_level_id)
-        )
-    ''')
-    
-    # 4. Document Classifications (Belge Sınıflandırma)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS document_classifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            document_id INTEGER NOT NULL,
-            category_id INTEGER NOT NULL,
-            security_level_id INTEGER NOT NULL,
-            classification_method TEXT DEFAULT 'manual',
-            confidence_score REAL DEFAULT 1.0,
-            classified_by INTEGER NOT NULL,
-            classified_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            review_required BOOLEAN DEFAULT 0,
-            review_date DATETIME,
-            reviewed_by INTEGER,
-            notes TEXT,
-            FOREIGN KEY (document_id) REFERENCES documents (id),
-            FOREIGN KEY (category_id) REFERENCES professional_categories (id),
-            FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
-            FOREIGN KEY (classified_by) REFERENCES users (id),
-            FOREIGN KEY (reviewed_by) REFERENCES users (id),
-            UNIQUE(document_id)
-        )
-    ''')
-    
-    # 5. Access Audit Log (Erişim Denetim Kaydı)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS access_audit_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            document_id INTEGER NOT NULL,
-            action TEXT NOT NULL,
-            access_granted BOOLEAN NOT NULL,
-            reason TEXT,
-            ip_address TEXT,
-            user_agent TEXT,
-            session_id TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (document_id) REFERENCES documents (id)
-        )
-    ''')
-    
-    # 6. Classification Rules (Otomatik Sınıflandırma Kuralları)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS classification_rules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            keywords TEXT NOT NULL,
-            category_id INTEGER NOT NULL,
-            security_level_id INTEGER NOT NULL,
-            confidence_threshold REAL DEFAULT 0.8,
-            is_active BOOLEAN DEFAULT 1,
-            created_by INTEGER NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (category_id) REFERENCES professional_categories (id),
-            FOREIGN KEY (security_level_id) REFERENCES security_levels (id),
-            FOREIGN KEY (created_by) REFERENCES users (id)
-        )
-    ''')
-    
-    print("✅ Classification tables created successfully!")
-    
-    # Insert default professional categories
-    default_categories = [
-        ('Yönetim/İdari', 'Yönetim kurulu, strateji, planlama belgeleri', '#667eea', 'briefcase'),
-        ('Mühendislik', 'Teknik çizimler, tasarım, test raporları', '#06b6d4', 'cog'),
-        ('Güvenlik', 'Güvenlik protokolleri, siber güvenlik', '#ef4444', 'shield'),
-        ('Finans', 'Mali raporlar, bütçe, muhasebe belgeleri', '#10b981', 'dollar-sign'),
-        ('Hukuk', 'Sözleşmeler, yasal düzenlemeler, anlaşmalar', '#f59e0b', 'scale'),
-        ('İnsan Kaynakları', 'Personel dosyaları, eğitim, özlük işleri', '#8b5cf6', 'users'),
-        ('Araştırma & Geliştirme', 'AR-GE projeleri, inovasyon, patent', '#ec4899', 'lightbulb'),
-        ('Üretim', 'Üretim süreçleri, kalite kontrol, lojistik', '#84cc16', 'factory')
-    ]
-    
-    for name, desc, color, icon in default_categories:
-        cursor.execute('''
-            INSERT OR IGNORE INTO professional_categories (name, description, color_code, icon) 
-            VALUES (?, ?, ?, ?)
-        ''', (name, desc, color, icon))
-    
-    # Insert default security levels
-    default_security_levels = [
-        ('Açık', 1, 'Herkese açık belgeler', '#10b981', 'Tüm çalışanlar erişebilir'),
-        ('Sınırlı', 2, 'Departman içi belgeler', '#f59e0b', 'Sadece ilgili departman çalışanları'),
-        ('Gizli', 3, 'Hassas şirket bilgileri', '#ef4444', 'Üst düzey yönetim ve yetkili personel'),
-        ('Çok Gizli', 4, 'En üst seviye gizli belgeler', '#7c3aed', 'Sadece C-level yöneticiler'),
-        ('Askeri Gizli', 5, 'Askeri savunma belgeleri', '#1f2937', 'Özel güvenlik izni gerekli')
-    ]
-    
-    for name, level, desc, color, req in default_security_levels:
-        cursor.execute('''
-            INSERT OR IGNORE INTO security_levels (name, level_number, description, color_code, requirements) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (name, level, desc, color, req))
-    
-    # Insert default classification rules
-    default_rules = [
-        ('Finansal Belgeler', 'finansal,rapor,bütçe,gelir,gider,kar,zarar,bilanço,mali', 4, 2),  # Finans, Sınırlı
-        ('Güvenlik Protokolleri', 'güvenlik,protocol,siber,şifre,erişim,koruma,firewall', 3, 3),  # Güvenlik, Gizli
-        ('Teknik Dokümantasyon', 'roket,motor,mühendislik,tasarım,teknik,şema,çizim', 2, 2),      # Mühendislik, Sınırlı
-        ('Yönetim Belgeleri', 'strateji,yönetim,planlama,hedef,vizyon,misyon,kurul', 1, 3),       # Yönetim, Gizli
-        ('Hukuki Belgeler', 'sözleşme,anlaşma,yasal,hukuk,mahkeme,dava,avukat', 5, 3),           # Hukuk, Gizli
-        ('İK Belgeleri', 'personel,çalışan,maaş,özlük,eğitim,performans,işe alım', 6, 2),        # İK, Sınırlı
-        ('AR-GE Projeleri', 'araştırma,geliştirme,inovasyon,patent,prototip,deneyim', 7, 4),     # AR-GE, Çok Gizli
-        ('Üretim Süreçleri', 'üretim,kalite,kontrol,süreç,prosedür,imalat,fabrika', 8, 2)        # Üretim, Sınırlı
-    ]
-    
-    for name, keywords, cat_id, sec_id in default_rules:
-        cursor.execute('''
-            INSERT OR IGNORE INTO classification_rules (name, keywords, category_id, security_level_id, created_by) 
-            VALUES (?, ?, ?, ?, 1)
-        ''', (name, keywords, cat_id, sec_id))
-    
-    # Grant admin user full permissions
-    cursor.execute('SELECT id FROM users WHERE role = "admin" LIMIT 1')
-    admin_user = cursor.fetchone()
-    
-    if admin_user:
-        admin_id = admin_user[0]
-        # Grant access to all categories and security levels
-        for cat_id in range(1, 9):  # 8 categories
-            for sec_id in range(1, 6):  # 5 security levels
-                cursor.execute('''
+    if db_path is None:
+        db_path = os.path.join(os.path.dirname(__file__), 'config', 'users.db')
+    
+    # Connect to existing database (autocommit mode; the explicit BEGIN IMMEDIATE
+    # below makes schema + default rows one atomic transaction)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        with conn:
+            cursor = conn.cursor()
+            
+            print("🏗️ Creating document classification tables...")
+            
+            # executescript would commit a pending transaction, so BEGIN is part of the script
+            cursor.executescript('BEGIN IMMEDIATE;' + _SCHEMA_SQL)
+            
+            print("✅ Classification tables created successfully!")
+            
+            # Convert legacy comma-separated rule keywords to JSON arrays
+            legacy_rules = cursor.execute(
+                'SELECT id, keywords FROM classification_rules WHERE NOT json_valid(keywords)'
+            ).fetchall()
+            cursor.executemany('UPDATE classification_rules SET keywords = ? WHERE id = ?',
+                               [(keywords_to_json(keywords), rule_id) for rule_id, keywords in legacy_rules])
+            
+            # Insert default professional categories
+            default_categories = [
+                ('Yönetim/İdari', 'Yönetim kurulu, strateji, planlama belgeleri', '#667eea', 'briefcase'),
+                ('Mühendislik', 'Teknik çizimler, tasarım, test raporları', '#06b6d4', 'cog'),
+                ('Güvenlik', 'Güvenlik protokolleri, siber güvenlik', '#ef4444', 'shield'),
+                ('Finans', 'Mali raporlar, bütçe, muhasebe belgeleri', '#10b981', 'dollar-sign'),
+                ('Hukuk', 'Sözleşmeler, yasal düzenlemeler, anlaşmalar', '#f59e0b', 'scale'),
+                ('İnsan Kaynakları', 'Personel dosyaları, eğitim, özlük işleri', '#8b5cf6', 'users'),
+                ('Araştırma & Geliştirme', 'AR-GE projeleri, inovasyon, patent', '#ec4899', 'lightbulb'),
+                ('Üretim', 'Üretim süreçleri, kalite kontrol, lojistik', '#84cc16', 'factory')
+            ]
+            
+            cursor.executemany('''
+                INSERT OR IGNORE INTO professional_categories (name, description, color_code, icon) 
+                VALUES (?, ?, ?, ?)
+            ''', default_categories)
+            
+            # Insert default security levels
+            default_security_levels = [
+                ('Açık', 1, 'Herkese açık belgeler', '#10b981', 'Tüm çalışanlar erişebilir'),
+                ('Sınırlı', 2, 'Departman içi belgeler', '#f59e0b', 'Sadece ilgili departman çalışanları'),
+                ('Gizli', 3, 'Hassas şirket bilgileri', '#ef4444', 'Üst düzey yönetim ve yetkili personel'),
+                ('Çok Gizli', 4, 'En üst seviye gizli belgeler', '#7c3aed', 'Sadece C-level yöneticiler'),
+                ('Askeri Gizli', 5, 'Askeri savunma belgeleri', '#1f2937', 'Özel güvenlik izni gerekli')
+            ]
+            
+            cursor.executemany('''
+                INSERT OR IGNORE INTO security_levels (name, level_number, description, color_code, requirements) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', default_security_levels)
+            
+            # Insert default classification rules
+            default_rules = [
+                ('Finansal Belgeler', 'finansal,rapor,bütçe,gelir,gider,kar,zarar,bilanço,mali', 4, 2),  # Finans, Sınırlı
+                ('Güvenlik Protokolleri', 'güvenlik,protocol,siber,şifre,erişim,koruma,firewall', 3, 3),  # Güvenlik, Gizli
+                ('Teknik Dokümantasyon', 'roket,motor,mühendislik,tasarım,teknik,şema,çizim', 2, 2),      # Mühendislik, Sınırlı
+                ('Yönetim Belgeleri', 'strateji,yönetim,planlama,hedef,vizyon,misyon,kurul', 1, 3),       # Yönetim, Gizli
+                ('Hukuki Belgeler', 'sözleşme,anlaşma,yasal,hukuk,mahkeme,dava,avukat', 5, 3),           # Hukuk, Gizli
+                ('İK Belgeleri', 'personel,çalışan,maaş,özlük,eğitim,performans,işe alım', 6, 2),        # İK, Sınırlı
+                ('AR-GE Projeleri', 'araştırma,geliştirme,inovasyon,patent,prototip,deneyim', 7, 4),     # AR-GE, Çok Gizli
+                ('Üretim Süreçleri', 'üretim,kalite,kontrol,süreç,prosedür,imalat,fabrika', 8, 2)        # Üretim, Sınırlı
+            ]
+            
+            # classification_rules has no UNIQUE key, so skip rules that already exist by name
+            cursor.executemany('''
+                INSERT INTO classification_rules (name, keywords, category_id, security_level_id, created_by) 
+                SELECT ?1, ?2, ?3, ?4, 1
+                WHERE NOT EXISTS (SELECT 1 FROM classification_rules WHERE name = ?1)
+            ''', [(name, keywords_to_json(keywords), category_id, security_level_id)
+                  for name, keywords, category_id, security_level_id in default_rules])
+            
+            # Grant admin user full permissions
+            cursor.execute('SELECT id FROM users WHERE role = "admin" LIMIT 1')
+            admin_user = cursor.fetchone()
+            
+            if admin_user:
+                admin_id = admin_user[0]
+                # Grant access to the active default categories and security levels
+                # (cross join inside SQLite); user-added rows are granted explicitly
+                category_names = [category[0] for category in default_categories]
+                level_names = [level[0] for level in default_security_levels]
+                cursor.execute(f'''
                     INSERT OR IGNORE INTO user_permissions (user_id, category_id, security_level_id, permission_type, granted_by) 
-                    VALUES (?, ?, ?, 'admin', ?)
-                ''', (admin_id, cat_id, sec_id, admin_id))
-    
-    # Commit changes
-    conn.commit()
-    
-    print("📊 Default categories inserted:")
-    print("   • Yönetim/İdari, Mühendislik, Güvenlik, Finans")
-    print("   • Hukuk, İnsan Kaynakları, AR-GE, Üretim")
-    
-    print("🔒 Default security levels inserted:")
-    print("   • Açık (1), Sınırlı (2), Gizli (3), Çok Gizli (4), Askeri Gizli (5)")
-    
-    print("🤖 Default classification rules inserted")
-    print("👤 Admin user granted full permissions")
-    
-    # Display table info
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '%classif%' OR name LIKE '%permission%' OR name LIKE '%security%' OR name LIKE '%professional%' OR name LIKE '%access%'")
-    new_tables = cursor.fetchall()
-    print(f"🗄️ New tables created: {[t[0] for t in new_tables]}")
+                    SELECT ?, pc.id, sl.id, 'admin', ?
+                    FROM professional_categories pc CROSS JOIN security_levels sl
+                    WHERE pc.is_active = 1 AND sl.is_active = 1
+                      AND pc.name IN ({', '.join('?' * len(category_names))})
+                      AND sl.name IN ({', '.join('?' * len(level_names))})
+                    ORDER BY pc.id, sl.id
+                ''', (admin_id, admin_id, *category_names, *level_names))
+            
+            # Commit schema and default rows together
+            conn.execute('COMMIT')
+            
+            print("📊 Default categories inserted:")
+            print("   • Yönetim/İdari, Mühendislik, Güvenlik, Finans")
+            print("   • Hukuk, İnsan Kaynakları, AR-GE, Üretim")
+            
+            print("🔒 Default security levels inserted:")
+            print("   • Açık (1), Sınırlı (2), Gizli (3), Çok Gizli (4), Askeri Gizli (5)")
+            
+            print("🤖 Default classification rules inserted")
+            print("👤 Admin user granted full permissions")
+            
+            # Display table info (names are known constants, no sqlite_master scan needed)
+            print(f"🗄️ New tables created: {list(CLASSIFICATION_TABLES)}")
+    
+    finally:
+        conn.close()
     
-    conn.close()
     return True
 
 if __name__ == "__main__":
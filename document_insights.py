@@ -7,52 +7,301 @@ Provides automated insights, trends, and recommendations for KOBİ businesses
 import sqlite3
 import json
 import re
+import hashlib
+import heapq
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import os
-from typing import List, Dict, Any, Tuple
-import numpy as np
+import atexit
+import threading
+from typing import List, Dict, Any, Tuple, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Tokenizer shared by every analysis step (words of 3+ letters)
+_WORD_RE = re.compile(r'\b[a-zA-ZğüşıöçĞÜŞIÖÇ]{3,}\b')
+
+def _is_word_char(ch: str) -> bool:
+    """Same notion of a word character as the regex \\b boundary"""
+    return ch.isalnum() or ch == '_'
+
+class _KeywordCounter:
+    """Count whole-word keyword occurrences for labelled keyword lists
+    
+    Equivalent to summing len(re.findall(r'\\b' + re.escape(keyword) + r'\\b', text))
+    over every keyword of a label. Single-word keywords are read from the document's
+    token counts; only multi-word phrases ('işe alım') need a scan of the text.
+    """
+    
+    def __init__(self, groups: Dict[str, List[str]]):
+        # keyword -> labels (a keyword may belong to several labels)
+        self.labels = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                self.labels.setdefault(keyword, []).append(label)
+        
+        # A keyword that is exactly one token is counted from the token Counter
+        self._word_labels = [(k, labels) for k, labels in self.labels.items() if _WORD_RE.fullmatch(k)]
+        self._phrases = [k for k in self.labels if not _WORD_RE.fullmatch(k)]
+        
+        # Distinct keyword lengths, for substring lookups in labels_within()
+        self._lengths = sorted({len(k) for k in self.labels})
+        
+        if not self._phrases:
+            return
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for phrase in self._phrases:
+                self._automaton.add_word(phrase, phrase)
+            self._automaton.make_automaton()
+        else:
+            # One match per word start (longest phrase first); shorter phrases that are a
+            # whole-word prefix of the match are added back below
+            alternation = '|'.join(re.escape(k) for k in sorted(self._phrases, key=len, reverse=True))
+            self._pattern = re.compile(r'\b(?=(' + alternation + r')\b)')
+            self._prefixes = {
+                longer: [k for k in self._phrases
+                         if len(k) < len(longer) and longer.startswith(k) and not _is_word_char(longer[len(k)])]
+                for longer in self._phrases
+            }
+    
+    def count(self, text: str, token_counts: Counter) -> Counter:
+        """Occurrences per label in lowercased text, given its token Counter"""
+        counts = Counter()
+        for keyword, labels in self._word_labels:
+            occurrences = token_counts.get(keyword)
+            if occurrences:
+                for label in labels:
+                    counts[label] += occurrences
+        if self._phrases:
+            for phrase in self._iter_phrase_matches(text):
+                for label in self.labels[phrase]:
+                    counts[label] += 1
+        return counts
+    
+    def labels_within(self, word: str) -> set:
+        """Labels having a keyword that occurs anywhere inside word
+        
+        Same as any(keyword in word for keyword in keywords) per label, but each
+        substring of a keyword's length is looked up once in the keyword table.
+        """
+        found = set()
+        for size in self._lengths:
+            if size > len(word):
+                break
+            for start in range(len(word) - size + 1):
+                labels = self.labels.get(word[start:start + size])
+                if labels:
+                    found.update(labels)
+        return found
+    
+    def _iter_phrase_matches(self, text: str):
+        if AHOCORASICK_AVAILABLE:
+            last = len(text) - 1
+            for end, phrase in self._automaton.iter(text):
+                start = end - len(phrase) + 1
+                if (start == 0 or not _is_word_char(text[start - 1])) and \
+                        (end == last or not _is_word_char(text[end + 1])):
+                    yield phrase
+        else:
+            for match in self._pattern.finditer(text):
+                phrase = match.group(1)
+                yield phrase
+                yield from self._prefixes[phrase]
+
+# Words never reported as key topics
+_STOP_WORDS = frozenset({
+    'için', 'olan', 'olarak', 'veya', 'ancak', 'fakat', 'çünkü',
+    'eğer', 'hangi', 'nerede', 'nasıl', 'neden', 'böyle', 'şöyle',
+    'her', 'bir', 'iki', 'üç', 'birkaç', 'çok', 'az', 'fazla'
+})
+
+# Sentiment lexicon for Turkish content
+_SENTIMENT_WORDS = {
+    'positive': frozenset({
+        'başarı', 'iyi', 'mükemmel', 'harika', 'olumlu', 'artış', 'büyüme',
+        'gelişim', 'kazanç', 'verimli', 'etkili', 'kaliteli', 'güvenli'
+    }),
+    'negative': frozenset({
+        'başarısız', 'kötü', 'olumsuz', 'problem', 'sorun', 'hata', 'kayıp',
+        'düşüş', 'gerileme', 'risk', 'tehlike', 'yetersiz', 'eksik'
+    }),
+    'neutral': frozenset({
+        'normal', 'standart', 'ortalama', 'rutin', 'düzenli', 'sabit'
+    })
+}
+
+# Document type patterns
+_DOCUMENT_TYPE_PATTERNS = {
+    'contract': frozenset({'sözleşme', 'kontrat', 'anlaşma'}),
+    'report': frozenset({'rapor', 'analiz', 'değerlendirme'}),
+    'invoice': frozenset({'fatura', 'invoice', 'makbuz'}),
+    'policy': frozenset({'politika', 'prosedür', 'kural'}),
+    'presentation': frozenset({'sunum', 'presentation', 'slide'}),
+    'manual': frozenset({'kılavuz', 'manual', 'rehber'}),
+    'letter': frozenset({'mektup', 'yazı', 'resmi yazı'}),
+    'memo': frozenset({'not', 'memo', 'hatırlatma'})
+}
+
+_SENTIMENT_COUNTER = _KeywordCounter(_SENTIMENT_WORDS)
+_DOCUMENT_TYPE_COUNTER = _KeywordCounter(_DOCUMENT_TYPE_PATTERNS)
+
+# Precompiled patterns (compiled once at import instead of per call)
+_SENT_SPLIT_RE = re.compile(r'[.!?]+')
+
+_ACTION_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(yapılması gereken[^.!?]*[.!?])',
+    r'(planlanmaktadır[^.!?]*[.!?])',
+    r'(uygulanacak[^.!?]*[.!?])',
+    r'(gereklidir[^.!?]*[.!?])',
+    r'(önerilir[^.!?]*[.!?])',
+    r'(karar verilmiştir[^.!?]*[.!?])'
+)]
+
+# One pattern per entity kind, so each kind is a single pass over the content
+_DATE_RE = re.compile(
+    r'\d{1,2}[./]\d{1,2}[./]\d{4}'
+    r'|\d{4}[./]\d{1,2}[./]\d{1,2}'
+    r'|\d{1,2}\s+(?:Ocak|Şubat|Mart|Nisan|Mayıs|Haziran|Temmuz|Ağustos|Eylül|Ekim|Kasım|Aralık)\s+\d{4}'
+)
+_AMOUNT_RE = re.compile(r'\d+(?:[.,]\d+)?\s*(?:TL|₺|USD|\$|EUR|€|lira|dolar|euro)')
+_PCT_RE = re.compile(r'\%\d+(?:[.,]\d+)?|\d+(?:[.,]\d+)?\s*\%')
+_NAME_RE = re.compile(r'\b[A-ZĞÜŞIÖÇ][a-zğüşıöç]+\s+[A-ZĞÜŞIÖÇ][a-zğüşıöç]+\b')
+
+_URGENCY_KEYWORDS = (
+    'acil', 'ivedi', 'derhal', 'hemen', 'çabuk', 'hızlı',
+    'kritik', 'önemli', 'son tarih', 'deadline', 'asap'
+)
+# Plain substring semantics like the old `in` checks; the lookahead also
+# catches keywords that overlap each other ("son tarihemen")
+_URGENCY_RE = re.compile('(?=(' + '|'.join(map(re.escape, _URGENCY_KEYWORDS)) + '))')
+
+# strftime('%w') numbering: 0 is Sunday
+_WEEKDAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+# Per-thread SQLite connections of the insights engines, see get_db_connection().
+# A thread's connections are released with its thread-local storage when it exits.
+_thread_connections = threading.local()
+
+def _close_thread_connections():
+    """Close the calling thread's insights connections"""
+    connections = _thread_connections.__dict__.pop('by_key', {})
+    for conn in connections.values():
+        conn.close()
+
+atexit.register(_close_thread_connections)
+
+_SQL_CREATE_DOCUMENT_ANALYSIS = '''
+    CREATE TABLE IF NOT EXISTS document_analysis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_path TEXT UNIQUE,
+        analysis_data TEXT,
+        content_hash TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def _content_hash(content: str) -> str:
+    """Fingerprint of document content, used to skip re-analysis of unchanged files"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_hexdigest(content)
+    return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=8).hexdigest()
+
+def _dump_analysis(analysis: Dict[str, Any]) -> str:
+    """Serialize an analysis dict to JSON text (orjson when available)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(analysis, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(analysis, ensure_ascii=False)
+
+def _load_analysis(value: str) -> Dict[str, Any]:
+    """Parse a stored analysis JSON column"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(value)
+    return json.loads(value)
+
+def _first_unique_matches(pattern: re.Pattern, content: str, limit: int = 5) -> List[str]:
+    """First `limit` distinct matches in document order; stops scanning once found"""
+    seen = {}
+    for match in pattern.finditer(content):
+        seen.setdefault(match.group(0), None)
+        if len(seen) >= limit:
+            break
+    return list(seen)
 
 class DocumentInsightsEngine:
+    # Database paths whose document_analysis table is known to exist
+    _schema_ready = set()
+    
+    # Keyword tables are shared, read-only frozensets
+    # Turkish business keywords and categories
+    business_categories = {
+        'finance': frozenset({'bütçe', 'gelir', 'gider', 'kar', 'zarar', 'muhasebe', 'fatura', 'ödeme', 'kredi', 'yatırım'}),
+        'hr': frozenset({'personel', 'çalışan', 'işe alım', 'maaş', 'izin', 'performans', 'eğitim', 'departman'}),
+        'operations': frozenset({'süreç', 'prosedür', 'operasyon', 'üretim', 'kalite', 'tedarik', 'envanter', 'lojistik'}),
+        'sales': frozenset({'satış', 'müşteri', 'pazarlama', 'kampanya', 'hedef', 'gelir', 'sipariş', 'teklif'}),
+        'legal': frozenset({'sözleşme', 'hukuk', 'yasal', 'mevzuat', 'compliance', 'denetim', 'lisans', 'patent'}),
+        'strategy': frozenset({'strateji', 'planlama', 'hedef', 'vizon', 'misyon', 'analiz', 'rakip', 'pazar'})
+    }
+    
+    # Document importance keywords
+    importance_keywords = {
+        'high': frozenset({'kritik', 'acil', 'önemli', 'strateji', 'karar', 'yönetim', 'ceo', 'müdür'}),
+        'medium': frozenset({'proje', 'plan', 'rapor', 'analiz', 'değerlendirme', 'sunum'}),
+        'low': frozenset({'bilgi', 'not', 'taslak', 'geçici', 'test', 'deneme'})
+    }
+    
+    # Trend detection patterns
+    trend_patterns = {
+        'growth': frozenset({'artış', 'büyüme', 'yükseliş', 'gelişim', 'iyileşme', 'pozitif'}),
+        'decline': frozenset({'düşüş', 'azalış', 'gerileme', 'olumsuz', 'negatif', 'kötüleşme'}),
+        'stable': frozenset({'stabil', 'sabit', 'değişmez', 'düzenli', 'normal', 'standart'})
+    }
+    
+    # Action-oriented keywords
+    action_keywords = {
+        'planning': frozenset({'plan', 'hazırlık', 'tasarım', 'strateji', 'hedef'}),
+        'execution': frozenset({'uygulama', 'gerçekleştirme', 'başlatma', 'devreye alma'}),
+        'monitoring': frozenset({'takip', 'izleme', 'kontrol', 'denetim', 'ölçüm'}),
+        'improvement': frozenset({'iyileştirme', 'geliştirme', 'optimizasyon', 'verimlilik'})
+    }
+    
+    # Single-pass matchers over the keyword tables above
+    _category_counter = _KeywordCounter(business_categories)
+    _importance_counter = _KeywordCounter(importance_keywords)
+    
     def __init__(self, db_path='config/users.db', data_dir='data'):
         self.db_path = db_path
         self.data_dir = data_dir
         
-        # Turkish business keywords and categories
-        self.business_categories = {
-            'finance': ['bütçe', 'gelir', 'gider', 'kar', 'zarar', 'muhasebe', 'fatura', 'ödeme', 'kredi', 'yatırım'],
-            'hr': ['personel', 'çalışan', 'işe alım', 'maaş', 'izin', 'performans', 'eğitim', 'departman'],
-            'operations': ['süreç', 'prosedür', 'operasyon', 'üretim', 'kalite', 'tedarik', 'envanter', 'lojistik'],
-            'sales': ['satış', 'müşteri', 'pazarlama', 'kampanya', 'hedef', 'gelir', 'sipariş', 'teklif'],
-            'legal': ['sözleşme', 'hukuk', 'yasal', 'mevzuat', 'compliance', 'denetim', 'lisans', 'patent'],
-            'strategy': ['strateji', 'planlama', 'hedef', 'vizon', 'misyon', 'analiz', 'rakip', 'pazar']
-        }
-        
-        # Document importance keywords
-        self.importance_keywords = {
-            'high': ['kritik', 'acil', 'önemli', 'strateji', 'karar', 'yönetim', 'ceo', 'müdür'],
-            'medium': ['proje', 'plan', 'rapor', 'analiz', 'değerlendirme', 'sunum'],
-            'low': ['bilgi', 'not', 'taslak', 'geçici', 'test', 'deneme']
-        }
-        
-        # Trend detection patterns
-        self.trend_patterns = {
-            'growth': ['artış', 'büyüme', 'yükseliş', 'gelişim', 'iyileşme', 'pozitif'],
-            'decline': ['düşüş', 'azalış', 'gerileme', 'olumsuz', 'negatif', 'kötüleşme'],
-            'stable': ['stabil', 'sabit', 'değişmez', 'düzenli', 'normal', 'standart']
-        }
-        
-        # Action-oriented keywords
-        self.action_keywords = {
-            'planning': ['plan', 'hazırlık', 'tasarım', 'strateji', 'hedef'],
-            'execution': ['uygulama', 'gerçekleştirme', 'başlatma', 'devreye alma'],
-            'monitoring': ['takip', 'izleme', 'kontrol', 'denetim', 'ölçüm'],
-            'improvement': ['iyileştirme', 'geliştirme', 'optimizasyon', 'verimlilik']
-        }
-        
     def get_db_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Long-lived connection for the calling thread; callers must not close it"""
+        # Keyed by pid as well, so forked batch workers never reuse the parent's handle
+        key = (os.getpid(), self.db_path)
+        connections = _thread_connections.__dict__.setdefault('by_key', {})
+        conn = connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            connections[key] = conn
         return conn
         
     def analyze_document_content(self, file_path: str, content: str) -> Dict[str, Any]:
@@ -60,196 +309,115 @@ class DocumentInsightsEngine:
         Comprehensive document content analysis
         Returns detailed insights about document content and business relevance
         """
+        # Lowercase and tokenize once; every keyword-based step reads from the same data
+        content_lower = content.lower()
+        word_count = len(content.split())
+        token_counts = Counter(_WORD_RE.findall(content_lower))
+        
         analysis = {
             'file_path': file_path,
             'content_length': len(content),
-            'word_count': len(content.split()),
+            'word_count': word_count,
             'analysis_timestamp': datetime.now().isoformat(),
-            'business_categories': self._categorize_content(content),
-            'importance_level': self._assess_importance(content),
-            'key_topics': self._extract_key_topics(content),
-            'sentiment_indicators': self._analyze_sentiment(content),
+            'business_categories': self._categorize_content(content_lower, token_counts, word_count),
+            'importance_level': self._assess_importance(content_lower, token_counts),
+            'key_topics': self._extract_key_topics(token_counts),
+            'sentiment_indicators': self._analyze_sentiment(content_lower, token_counts),
             'action_items': self._extract_action_items(content),
             'business_entities': self._extract_business_entities(content),
-            'document_type': self._classify_document_type(file_path, content),
-            'readability_score': self._calculate_readability(content),
-            'urgency_indicators': self._detect_urgency(content)
+            'document_type': self._classify_document_type(file_path, content_lower, token_counts),
+            'readability_score': self._calculate_readability(content, word_count),
+            'urgency_indicators': self._detect_urgency(content_lower),
+            'content_hash': _content_hash(content)
         }
         
         return analysis
         
-    def _categorize_content(self, content: str) -> Dict[str, float]:
+    def _categorize_content(self, content_lower: str, token_counts: Counter, word_count: int) -> Dict[str, float]:
         """Categorize content into business areas"""
-        content_lower = content.lower()
         categories = {}
         
-        for category, keywords in self.business_categories.items():
-            score = 0
-            for keyword in keywords:
-                # Count keyword occurrences with weight
-                occurrences = len(re.findall(r'\b' + re.escape(keyword) + r'\b', content_lower))
-                score += occurrences
-            
+        # Count keyword occurrences per category
+        scores = self._category_counter.count(content_lower, token_counts)
+        for category in self.business_categories:
             # Normalize score based on content length
-            categories[category] = min(score / max(len(content.split()) / 100, 1), 10.0)
+            categories[category] = min(scores[category] / max(word_count / 100, 1), 10.0)
             
         return categories
         
-    def _assess_importance(self, content: str) -> str:
+    def _assess_importance(self, content_lower: str, token_counts: Counter) -> str:
         """Assess document importance level"""
-        content_lower = content.lower()
-        importance_scores = {'high': 0, 'medium': 0, 'low': 0}
-        
-        for level, keywords in self.importance_keywords.items():
-            for keyword in keywords:
-                occurrences = len(re.findall(r'\b' + re.escape(keyword) + r'\b', content_lower))
-                importance_scores[level] += occurrences
+        counts = self._importance_counter.count(content_lower, token_counts)
+        importance_scores = {level: counts[level] for level in ('high', 'medium', 'low')}
                 
         # Determine highest scoring category
         max_level = max(importance_scores, key=importance_scores.get)
         return max_level if importance_scores[max_level] > 0 else 'medium'
         
-    def _extract_key_topics(self, content: str) -> List[str]:
+    def _extract_key_topics(self, token_counts: Counter) -> List[str]:
         """Extract key topics and themes from content"""
-        # Simple keyword extraction based on frequency
-        words = re.findall(r'\b[a-zA-ZğüşıöçĞÜŞIÖÇ]{3,}\b', content.lower())
-        
-        # Remove common stop words
-        stop_words = {
-            'için', 'olan', 'olarak', 'olan', 'veya', 'ancak', 'fakat', 'çünkü',
-            'eğer', 'hangi', 'nerede', 'nasıl', 'neden', 'böyle', 'şöyle',
-            'her', 'bir', 'iki', 'üç', 'birkaç', 'çok', 'az', 'fazla'
-        }
-        
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 3]
-        
-        # Get most frequent words
-        word_freq = Counter(filtered_words)
-        key_topics = [word for word, freq in word_freq.most_common(10) if freq > 1]
+        # Simple keyword extraction based on frequency, skipping common stop words
+        # (nlargest keeps first-occurrence order for ties, like most_common)
+        candidates = ((word, freq) for word, freq in token_counts.items()
+                      if len(word) > 3 and word not in _STOP_WORDS)
+        key_topics = [word for word, freq in heapq.nlargest(10, candidates, key=lambda x: x[1]) if freq > 1]
         
         return key_topics
         
-    def _analyze_sentiment(self, content: str) -> Dict[str, int]:
+    def _analyze_sentiment(self, content_lower: str, token_counts: Counter) -> Dict[str, int]:
         """Basic sentiment analysis for Turkish content"""
-        content_lower = content.lower()
-        
-        positive_words = [
-            'başarı', 'iyi', 'mükemmel', 'harika', 'olumlu', 'artış', 'büyüme',
-            'gelişim', 'kazanç', 'verimli', 'etkili', 'kaliteli', 'güvenli'
-        ]
-        
-        negative_words = [
-            'başarısız', 'kötü', 'olumsuz', 'problem', 'sorun', 'hata', 'kayıp',
-            'düşüş', 'gerileme', 'risk', 'tehlike', 'yetersiz', 'eksik'
-        ]
-        
-        neutral_words = [
-            'normal', 'standart', 'ortalama', 'rutin', 'düzenli', 'sabit'
-        ]
+        counts = _SENTIMENT_COUNTER.count(content_lower, token_counts)
         
         sentiment_scores = {
-            'positive': sum(len(re.findall(r'\b' + re.escape(word) + r'\b', content_lower)) for word in positive_words),
-            'negative': sum(len(re.findall(r'\b' + re.escape(word) + r'\b', content_lower)) for word in negative_words),
-            'neutral': sum(len(re.findall(r'\b' + re.escape(word) + r'\b', content_lower)) for word in neutral_words)
+            'positive': counts['positive'],
+            'negative': counts['negative'],
+            'neutral': counts['neutral']
         }
         
         return sentiment_scores
         
     def _extract_action_items(self, content: str) -> List[str]:
         """Extract potential action items from content"""
-        action_patterns = [
-            r'(yapılması gereken[^.!?]*[.!?])',
-            r'(planlanmaktadır[^.!?]*[.!?])',
-            r'(uygulanacak[^.!?]*[.!?])',
-            r'(gereklidir[^.!?]*[.!?])',
-            r'(önerilir[^.!?]*[.!?])',
-            r'(karar verilmiştir[^.!?]*[.!?])'
-        ]
-        
         action_items = []
-        for pattern in action_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
+        for pattern in _ACTION_PATTERNS:
+            matches = pattern.findall(content)
             action_items.extend(matches)
             
         return action_items[:5]  # Limit to top 5 action items
         
     def _extract_business_entities(self, content: str) -> Dict[str, List[str]]:
-        """Extract business entities like dates, numbers, names"""
+        """Extract business entities like dates, numbers, names (up to 5 unique each)"""
         entities = {
-            'dates': [],
-            'amounts': [],
-            'percentages': [],
-            'names': []
+            'dates': _first_unique_matches(_DATE_RE, content),
+            'amounts': _first_unique_matches(_AMOUNT_RE, content),
+            'percentages': _first_unique_matches(_PCT_RE, content),
+            # Potential names (capitalized words)
+            'names': _first_unique_matches(_NAME_RE, content)
         }
         
-        # Extract dates
-        date_patterns = [
-            r'\d{1,2}[./]\d{1,2}[./]\d{4}',
-            r'\d{4}[./]\d{1,2}[./]\d{1,2}',
-            r'\d{1,2}\s+(Ocak|Şubat|Mart|Nisan|Mayıs|Haziran|Temmuz|Ağustos|Eylül|Ekim|Kasım|Aralık)\s+\d{4}'
-        ]
-        
-        for pattern in date_patterns:
-            entities['dates'].extend(re.findall(pattern, content))
-            
-        # Extract monetary amounts
-        amount_patterns = [
-            r'\d+(?:[.,]\d+)?\s*(?:TL|₺|USD|\$|EUR|€)',
-            r'\d+(?:[.,]\d+)?\s*(?:lira|dolar|euro)'
-        ]
-        
-        for pattern in amount_patterns:
-            entities['amounts'].extend(re.findall(pattern, content))
-            
-        # Extract percentages
-        percentage_pattern = r'\%\d+(?:[.,]\d+)?|\d+(?:[.,]\d+)?\s*\%'
-        entities['percentages'] = re.findall(percentage_pattern, content)
-        
-        # Extract potential names (capitalized words)
-        name_pattern = r'\b[A-ZĞÜŞIÖÇ][a-zğüşıöç]+\s+[A-ZĞÜŞIÖÇ][a-zğüşıöç]+\b'
-        entities['names'] = re.findall(name_pattern, content)
-        
-        # Limit results
-        for key in entities:
-            entities[key] = list(set(entities[key]))[:5]
-            
         return entities
         
-    def _classify_document_type(self, file_path: str, content: str) -> str:
+    def _classify_document_type(self, file_path: str, content_lower: str, token_counts: Counter) -> str:
         """Classify document type based on filename and content"""
         filename = os.path.basename(file_path).lower()
-        content_lower = content.lower()
-        
-        # Document type patterns
-        type_patterns = {
-            'contract': ['sözleşme', 'kontrat', 'anlaşma'],
-            'report': ['rapor', 'analiz', 'değerlendirme'],
-            'invoice': ['fatura', 'invoice', 'makbuz'],
-            'policy': ['politika', 'prosedür', 'kural'],
-            'presentation': ['sunum', 'presentation', 'slide'],
-            'manual': ['kılavuz', 'manual', 'rehber'],
-            'letter': ['mektup', 'yazı', 'resmi yazı'],
-            'memo': ['not', 'memo', 'hatırlatma']
-        }
         
         # Check filename first
-        for doc_type, keywords in type_patterns.items():
+        for doc_type, keywords in _DOCUMENT_TYPE_PATTERNS.items():
             if any(keyword in filename for keyword in keywords):
                 return doc_type
                 
         # Check content
-        type_scores = {}
-        for doc_type, keywords in type_patterns.items():
-            score = sum(len(re.findall(r'\b' + re.escape(keyword) + r'\b', content_lower)) for keyword in keywords)
-            if score > 0:
-                type_scores[doc_type] = score
+        counts = _DOCUMENT_TYPE_COUNTER.count(content_lower, token_counts)
+        type_scores = {doc_type: counts[doc_type] for doc_type in _DOCUMENT_TYPE_PATTERNS if counts[doc_type] > 0}
                 
         return max(type_scores, key=type_scores.get) if type_scores else 'general'
         
-    def _calculate_readability(self, content: str) -> float:
+    def _calculate_readability(self, content: str, word_count: int) -> float:
         """Calculate simple readability score"""
-        sentences = len(re.split(r'[.!?]+', content))
-        words = len(content.split())
+        # Same count as len(re.split(...)): one piece more than there are
+        # terminator runs, without building the list of pieces
+        sentences = sum(1 for _ in _SENT_SPLIT_RE.finditer(content)) + 1
+        words = word_count
         
         if sentences == 0:
             return 0.0
@@ -265,100 +433,109 @@ class DocumentInsightsEngine:
         else:
             return 4.0  # Hard
             
-    def _detect_urgency(self, content: str) -> List[str]:
+    def _detect_urgency(self, content_lower: str) -> List[str]:
         """Detect urgency indicators in content"""
-        urgency_keywords = [
-            'acil', 'ivedi', 'derhal', 'hemen', 'çabuk', 'hızlı',
-            'kritik', 'önemli', 'son tarih', 'deadline', 'asap'
-        ]
+        found = set(_URGENCY_RE.findall(content_lower))
+        return [keyword for keyword in _URGENCY_KEYWORDS if keyword in found]
         
-        content_lower = content.lower()
-        found_urgency = []
-        
-        for keyword in urgency_keywords:
-            if keyword in content_lower:
-                found_urgency.append(keyword)
-                
-        return found_urgency
+    def analyze_documents_batch(self, items: List[Tuple[str, str]],
+                                max_workers: int = None) -> Iterator[Dict[str, Any]]:
+        """Analyze many (file_path, content) pairs across worker processes
         
+        Yields analyses in input order. Each worker builds its own engine once,
+        so the keyword matchers are never pickled per document.
+        """
+        items = list(items)
+        workers = min(max_workers or os.cpu_count() or 1, len(items))
+        if workers <= 1:
+            for file_path, content in items:
+                yield self.analyze_document_content(file_path, content)
+            return
+            
+        # A few chunks per worker keeps IPC overhead low while balancing the load
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.db_path,)) as executor:
+            yield from executor.map(_analyze_one, items, chunksize=chunksize)
+            
     def generate_content_trends(self, days_back: int = 30) -> Dict[str, Any]:
         """Analyze content trends over time"""
         conn = self.get_db_connection()
         cursor = conn.cursor()
         
         # Get recent search queries to understand content interest
+        since = datetime.now() - timedelta(days=days_back)
         cursor.execute('''
-            SELECT query, timestamp, results_count
+            SELECT query, results_count
             FROM search_logs 
             WHERE timestamp > ?
             ORDER BY timestamp DESC
-        ''', (datetime.now() - timedelta(days=days_back),))
+        ''', (since,))
         
-        searches = cursor.fetchall()
-        conn.close()
-        
-        trends = {
-            'topic_trends': self._analyze_topic_trends(searches),
-            'search_patterns': self._analyze_search_patterns(searches),
-            'content_demand': self._analyze_content_demand(searches),
-            'time_patterns': self._analyze_time_patterns(searches)
-        }
+        trends = self._compute_all_trends(cursor)
+        trends['time_patterns'] = self._analyze_time_patterns(cursor, since)
         
         return trends
         
-    def _analyze_topic_trends(self, searches: List) -> Dict[str, Any]:
-        """Analyze trending topics from search queries"""
-        all_queries = [search['query'].lower() for search in searches if search['query']]
-        
-        # Extract words from all queries
-        all_words = []
-        for query in all_queries:
-            words = re.findall(r'\b[a-zA-ZğüşıöçĞÜŞIÖÇ]{3,}\b', query)
-            all_words.extend(words)
+    def _compute_all_trends(self, cursor: sqlite3.Cursor) -> Dict[str, Any]:
+        """Build topic, search and demand trends in a single pass over the search rows"""
+        word_freq = Counter()
+        query_groups = defaultdict(int)
+        searches = results_total = zero_results = high_results = 0
+        queries = query_words = 0
+        
+        # Rows are consumed as they stream from the cursor, newest first
+        for query, results_count in cursor:
+            searches += 1
+            results_total += results_count
+            if results_count == 0:
+                zero_results += 1
+            elif results_count > 10:
+                high_results += 1
+                
+            if not query:
+                continue
+            queries += 1
+            query_words += len(query.split())
             
-        # Count word frequencies
-        word_freq = Counter(all_words)
-        
-        # Categorize trending words
-        trending_topics = {}
-        for category, keywords in self.business_categories.items():
-            category_words = []
-            for word, freq in word_freq.most_common(50):
-                if word in keywords or any(keyword in word for keyword in keywords):
-                    category_words.append({'word': word, 'frequency': freq})
-            trending_topics[category] = category_words[:5]
+            words = _WORD_RE.findall(query.lower())
+            word_freq.update(words)
             
-        return trending_topics
-        
-    def _analyze_search_patterns(self, searches: List) -> Dict[str, Any]:
-        """Analyze search behavior patterns"""
-        patterns = {
-            'avg_results_per_search': np.mean([s['results_count'] for s in searches]) if searches else 0,
-            'zero_result_queries': len([s for s in searches if s['results_count'] == 0]),
-            'high_result_queries': len([s for s in searches if s['results_count'] > 10]),
-            'query_length_avg': np.mean([len(s['query'].split()) for s in searches if s['query']]) if searches else 0
+            # Queries with zero results indicate content gaps; group similar ones
+            # (simple similarity) by their first 3 sorted keywords
+            if results_count == 0 and words:
+                query_groups[' '.join(sorted(words)[:3])] += 1
+                
+        return {
+            'topic_trends': self._analyze_topic_trends(word_freq),
+            'search_patterns': {
+                'avg_results_per_search': results_total / searches if searches else 0,
+                'zero_result_queries': zero_results,
+                'high_result_queries': high_results,
+                'query_length_avg': query_words / queries if queries else 0
+            },
+            'content_demand': self._analyze_content_demand(query_groups)
         }
         
-        return patterns
-        
-    def _analyze_content_demand(self, searches: List) -> List[Dict[str, Any]]:
-        """Identify content gaps and high-demand topics"""
-        # Queries with zero results indicate content gaps
-        zero_result_queries = [s['query'] for s in searches if s['results_count'] == 0 and s['query']]
+    def _analyze_topic_trends(self, word_freq: Counter) -> Dict[str, Any]:
+        """Analyze trending topics from search query word frequencies"""
+        # Categorize trending words, resolving each word's categories once
+        trending_topics = {category: [] for category in self.business_categories}
+        for word, freq in word_freq.most_common(50):
+            for category in self._category_counter.labels_within(word):
+                trending_topics[category].append({'word': word, 'frequency': freq})
+                
+        for category, category_words in trending_topics.items():
+            trending_topics[category] = category_words[:5]
+            
+        return trending_topics
         
-        # Count similar queries
+    def _analyze_content_demand(self, query_groups: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Identify content gaps and high-demand topics from zero-result query groups"""
         demand_analysis = []
-        query_groups = defaultdict(int)
         
-        for query in zero_result_queries:
-            # Group similar queries (simple similarity)
-            key_words = sorted(re.findall(r'\b[a-zA-ZğüşıöçĞÜŞIÖÇ]{3,}\b', query.lower()))
-            if key_words:
-                group_key = ' '.join(key_words[:3])  # Use first 3 keywords as group
-                query_groups[group_key] += 1
-                
         # Convert to list with recommendations
-        for topic, frequency in sorted(query_groups.items(), key=lambda x: x[1], reverse=True)[:10]:
+        for topic, frequency in heapq.nlargest(10, query_groups.items(), key=lambda x: x[1]):
             demand_analysis.append({
                 'topic': topic,
                 'demand_frequency': frequency,
@@ -367,27 +544,41 @@ class DocumentInsightsEngine:
             
         return demand_analysis
         
-    def _analyze_time_patterns(self, searches: List) -> Dict[str, Any]:
+    def _analyze_time_patterns(self, cursor: sqlite3.Cursor, since: datetime) -> Dict[str, Any]:
         """Analyze temporal patterns in content access"""
-        if not searches:
+        # Let SQLite bucket the timestamps; MAX(timestamp) breaks count ties
+        # newest-first, matching the order the rows used to be scanned in.
+        # Hour and date are read from the text as written (wall-clock time):
+        # strftime() on the full value would shift '+03:00' / 'Z' timestamps to UTC
+        cursor.execute('''
+            SELECT CAST(substr(timestamp, 12, 2) AS INTEGER) AS bucket,
+                   COUNT(*) AS searches, MAX(timestamp) AS latest
+            FROM search_logs
+            WHERE timestamp > ?
+            GROUP BY bucket
+        ''', (since,))
+        hourly_patterns = cursor.fetchall()
+        
+        if not hourly_patterns:
             return {}
             
-        # Group by hour
-        hourly_patterns = defaultdict(int)
-        daily_patterns = defaultdict(int)
-        
-        for search in searches:
-            timestamp = datetime.fromisoformat(search['timestamp'].replace('Z', '+00:00'))
-            hour = timestamp.hour
-            day = timestamp.strftime('%A')
-            
-            hourly_patterns[hour] += 1
-            daily_patterns[day] += 1
+        cursor.execute('''
+            SELECT CAST(strftime('%w', substr(timestamp, 1, 10)) AS INTEGER) AS bucket,
+                   COUNT(*) AS searches, MAX(timestamp) AS latest
+            FROM search_logs
+            WHERE timestamp > ?
+            GROUP BY bucket
+        ''', (since,))
+        daily_patterns = cursor.fetchall()
+        
+        def busiest(buckets):
+            ranked = heapq.nlargest(3, buckets, key=lambda b: (b['searches'], b['latest']))
+            return [(b['bucket'], b['searches']) for b in ranked]
             
         return {
-            'peak_hours': sorted(hourly_patterns.items(), key=lambda x: x[1], reverse=True)[:3],
-            'busy_days': sorted(daily_patterns.items(), key=lambda x: x[1], reverse=True)[:3],
-            'total_searches': len(searches)
+            'peak_hours': busiest(hourly_patterns),
+            'busy_days': [(_WEEKDAY_NAMES[day], count) for day, count in busiest(daily_patterns)],
+            'total_searches': sum(b['searches'] for b in hourly_patterns)
         }
         
     def generate_business_recommendations(self, analysis_data: Dict[str, Any]) -> List[Dict[str, str]]:
@@ -452,41 +643,76 @@ class DocumentInsightsEngine:
                 
         return recommendations
         
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        """Create the document_analysis table once per database path"""
+        if self.db_path in DocumentInsightsEngine._schema_ready:
+            return
+        conn.execute(_SQL_CREATE_DOCUMENT_ANALYSIS)
+        # Tables created before content hashing lack the column
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(document_analysis)')}
+        if 'content_hash' not in columns:
+            conn.execute('ALTER TABLE document_analysis ADD COLUMN content_hash TEXT')
+        DocumentInsightsEngine._schema_ready.add(self.db_path)
+        
+    def analyze_and_save(self, file_path: str, content: str) -> Dict[str, Any]:
+        """Analyze a document and persist the result, reusing the stored analysis for unchanged content"""
+        cached = self._get_cached_analysis(file_path, _content_hash(content))
+        if cached:
+            return cached
+            
+        analysis = self.analyze_document_content(file_path, content)
+        self.save_analysis_to_db(analysis)
+        return analysis
+        
     def save_analysis_to_db(self, analysis: Dict[str, Any]):
         """Save document analysis results to database"""
+        self.save_analyses_to_db([analysis])
+        
+    def save_analyses_to_db(self, analyses: List[Dict[str, Any]]):
+        """Save many analysis results in a single commit"""
+        if not analyses:
+            return
+            
         conn = self.get_db_connection()
-        cursor = conn.cursor()
         
         try:
-            # Create document_analysis table if not exists
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS document_analysis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_path TEXT UNIQUE,
-                    analysis_data TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            self._ensure_schema(conn)
             
-            # Insert or update analysis
-            cursor.execute('''
+            # Insert or update analyses
+            now = datetime.now()
+            conn.executemany('''
                 INSERT OR REPLACE INTO document_analysis 
-                (file_path, analysis_data, updated_at)
-                VALUES (?, ?, ?)
-            ''', (
-                analysis['file_path'],
-                json.dumps(analysis, ensure_ascii=False),
-                datetime.now()
-            ))
+                (file_path, analysis_data, content_hash, updated_at)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (analysis['file_path'], _dump_analysis(analysis), analysis.get('content_hash'), now)
+                for analysis in analyses
+            ])
             
             conn.commit()
             
         except Exception as e:
+            conn.rollback()
             print(f"Analysis save error: {e}")
-        finally:
-            conn.close()
             
+    def _get_cached_analysis(self, file_path: str, content_hash: str) -> Dict[str, Any]:
+        """Stored analysis for file_path if it was computed from the same content"""
+        conn = self.get_db_connection()
+        
+        try:
+            self._ensure_schema(conn)
+            result = conn.execute('''
+                SELECT analysis_data FROM document_analysis 
+                WHERE file_path = ? AND content_hash = ?
+            ''', (file_path, content_hash)).fetchone()
+            if result:
+                return _load_analysis(result['analysis_data'])
+                
+        except Exception as e:
+            print(f"Analysis cache error: {e}")
+            
+        return {}
+        
     def get_analysis_from_db(self, file_path: str) -> Dict[str, Any]:
         """Retrieve document analysis from database"""
         conn = self.get_db_connection()
@@ -500,14 +726,23 @@ class DocumentInsightsEngine:
             
             result = cursor.fetchone()
             if result:
-                return json.loads(result['analysis_data'])
+                return _load_analysis(result['analysis_data'])
                 
         except Exception as e:
             print(f"Analysis retrieve error: {e}")
-        finally:
-            conn.close()
             
         return {}
 
+# Engine of the current worker process in analyze_documents_batch
+_worker_engine = None
+
+def _init_worker(db_path: str):
+    global _worker_engine
+    _worker_engine = DocumentInsightsEngine(db_path=db_path)
+
+def _analyze_one(item: Tuple[str, str]) -> Dict[str, Any]:
+    file_path, content = item
+    return _worker_engine.analyze_document_content(file_path, content)
+
 # Global insights engine instance
 insights_engine = DocumentInsightsEngine()
\ No newline at end of file
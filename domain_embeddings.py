@@ -4,34 +4,101 @@ Savunma Sanayi için özelleştirilmiş embedding sistemi
 """
 
 import numpy as np
+import hashlib
+import math
 import pickle
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable
 import os
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
 
-from defense_vocabulary import DefenseVocabulary
+from defense_vocabulary import get_default_vocabulary
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+def select_device() -> str:
+    """Embedding modelleri için cihaz: CUDA varsa 'cuda', yoksa 'cpu'"""
+    try:
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+class _TermMatcher:
+    """Sorguda geçen terimleri tek geçişte bul (Aho-Corasick, yoksa `in` taraması)
+    
+    Her girdi (küçük harfli terim, etiket) çiftidir; find() metinde alt dize olarak
+    geçen terimlerin etiketlerini ekleme sırasıyla döndürür.
+    """
+    
+    def __init__(self, entries: Iterable[Tuple[str, Any]]):
+        # terim -> [(ekleme sırası, etiket), ...]
+        self._labels = {}
+        for order, (term, label) in enumerate(entries):
+            self._labels.setdefault(term, []).append((order, label))
+        
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self._labels:
+            self._automaton = ahocorasick.Automaton()
+            for term in self._labels:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+    
+    def find(self, text: str) -> List[Any]:
+        """text içinde geçen terimlerin etiketleri"""
+        if self._automaton is not None:
+            terms = {term for _, term in self._automaton.iter(text)}
+            if '' in self._labels:
+                terms.add('')
+        else:
+            terms = [term for term in self._labels if term in text]
+        
+        hits = sorted(hit for term in terms for hit in self._labels[term])
+        return [label for _, label in hits]
+
 class DefenseEmbeddingSystem:
     """Savunma sanayi için optimize edilmiş embedding sistemi"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", term_cache_dir: str = "./data"):
         self.model_name = model_name
+        self.term_cache_dir = term_cache_dir
+        self.device = None
         self.base_model = None
-        self.vocab = DefenseVocabulary()
+        self.vocab = get_default_vocabulary()
         self.term_embeddings = {}
         self.boost_factors = {}
         self.turkish_optimization = True
+        self._term_matcher = _TermMatcher(())
+        self._term_index = {}
+        self._term_matrix = np.zeros((0, 0), dtype=np.float32)
+        self._term_weights = np.zeros(0, dtype=np.float32)
         
     def initialize(self):
         """Embedding sistemini başlat"""
         try:
             logger.info(f"Loading embedding model: {self.model_name}")
-            self.base_model = SentenceTransformer(self.model_name)
+            device = self.device = select_device()
+            self.base_model = SentenceTransformer(self.model_name, device=device)
+            if device == 'cuda':
+                # GPU'da FP16 encode: yaklaşık 2x hız, yarı VRAM
+                self.base_model.half()
             
             # Savunma sanayi terimlerinin embeddinglerini önceden hesapla
             self._precompute_defense_embeddings()
@@ -70,9 +137,14 @@ class DefenseEmbeddingSystem:
         # Tekrarlananları kaldır
         unique_terms = list(set(all_terms))
         
-        # Embeddingleri hesapla
+        # Embeddingleri hesapla (aynı model + terim kümesi için diskten)
         try:
-            embeddings = self.base_model.encode(unique_terms)
+            cached = self._load_term_cache(unique_terms)
+            if cached is not None:
+                unique_terms, embeddings = cached
+            else:
+                embeddings = self.base_model.encode(unique_terms)
+                self._save_term_cache(unique_terms, embeddings)
             
             # Term embeddinglerini sakla
             for term, embedding in zip(unique_terms, embeddings):
@@ -82,6 +154,65 @@ class DefenseEmbeddingSystem:
             
         except Exception as e:
             logger.error(f"Error precomputing embeddings: {e}")
+        
+        self._build_term_index()
+    
+    def _term_cache_path(self, terms: List[str]) -> str:
+        """Model adı, cihaz (cuda'da FP16 encode) ve sıralı terim kümesine bağlı önbellek dosyası"""
+        key_source = f"{self.model_name}|{self.device}|" + '\n'.join(sorted(terms))
+        key = hashlib.md5(key_source.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.term_cache_dir, f"term_emb_{key}.npz")
+    
+    def _load_term_cache(self, terms: List[str]) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Önceden kaydedilmiş (terimler, embeddingler); yoksa None"""
+        cache_path = self._term_cache_path(terms)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with np.load(cache_path) as data:
+                cached_terms, embeddings = data['terms'].tolist(), data['embs']
+            logger.info(f"Loaded defense term embeddings from {cache_path}")
+            return cached_terms, embeddings
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable term embedding cache {cache_path}: {e}")
+            return None
+    
+    def _save_term_cache(self, terms: List[str], embeddings: np.ndarray):
+        """Term embeddinglerini npz olarak kaydet (atomik yazım)"""
+        cache_path = self._term_cache_path(terms)
+        try:
+            os.makedirs(self.term_cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, terms=np.array(terms), embs=np.asarray(embeddings, dtype=np.float32))
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Could not save term embedding cache {cache_path}: {e}")
+    
+    def _build_term_index(self):
+        """Savunma, teknik terim ve kısaltmalar için ortak eşleştiriciyi kur"""
+        # Term embeddingleri tek bir (N, D) matriste; ağırlıklar paralel dizide
+        terms = list(self.term_embeddings)
+        self._term_index = {term: i for i, term in enumerate(terms)}
+        if terms:
+            self._term_matrix = np.stack([self.term_embeddings[term] for term in terms]).astype(np.float32, copy=False)
+        else:
+            self._term_matrix = np.zeros((0, 0), dtype=np.float32)
+        self._term_weights = np.array(
+            [self.vocab.get_term_importance_weight(term) for term in terms], dtype=np.float32
+        )
+        
+        entries = [(term, ("defense", term)) for term in self.term_embeddings]
+        entries.extend((term.lower(), ("technical", term)) for term in self.vocab.technical_terms)
+        entries.extend((abbr.lower(), ("abbreviation", abbr)) for abbr in self.vocab.abbreviations)
+        self._term_matcher = _TermMatcher(entries)
+    
+    def _detect_terms(self, query_lower: str) -> Dict[str, List[str]]:
+        """Sorgudaki terimleri kategoriye göre grupla (eski tarama sırasıyla)"""
+        detected = {"defense": [], "technical": [], "abbreviation": []}
+        for category, term in self._term_matcher.find(query_lower):
+            detected[category].append(term)
+        return detected
     
     def _setup_boost_factors(self):
         """Domain-specific boost faktörlerini ayarla"""
@@ -123,6 +254,34 @@ class DefenseEmbeddingSystem:
             logger.error(f"Error encoding query: {e}")
             return np.zeros(384)  # Default dimension for MiniLM
     
+    def encode_queries(self, queries: List[str], enhance_domain_terms: bool = True,
+                       batch_size: int = 64) -> np.ndarray:
+        """Birden fazla query'yi tek encode çağrısıyla domain-aware vektorize et"""
+        try:
+            if not self.base_model:
+                raise Exception("Embedding model not initialized")
+            
+            if enhance_domain_terms:
+                texts = [self.vocab.expand_query(query) for query in queries]
+            else:
+                texts = list(queries)
+            
+            # Tek batch encode (tokenizer + model overhead'i paylaşılır)
+            base_embeddings = self.base_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            
+            if enhance_domain_terms:
+                return np.stack([
+                    self._enhance_embedding_with_domain_knowledge(embedding, query)
+                    for embedding, query in zip(base_embeddings, queries)
+                ])
+            
+            return base_embeddings
+            
+        except Exception as e:
+            # Sıfır vektör döndürülmez; çağıran taraf (cache, arama) hatayı görmeli
+            logger.error(f"Error encoding queries: {e}")
+            raise
+    
     def _enhance_embedding_with_domain_knowledge(self, base_embedding: np.ndarray, query: str) -> np.ndarray:
         """Embedding'i domain knowledge ile güçlendir"""
         try:
@@ -130,25 +289,17 @@ class DefenseEmbeddingSystem:
             query_lower = query.lower()
             
             # Query'deki savunma terimlerini bul
-            detected_terms = []
-            for term in self.term_embeddings.keys():
-                if term in query_lower:
-                    detected_terms.append(term)
+            detected_terms = self._detect_terms(query_lower)["defense"]
             
             if detected_terms:
-                # Domain term embeddinglerini weighted olarak ekle
-                domain_boost = np.zeros_like(base_embedding)
-                total_weight = 0
-                
-                for term in detected_terms:
-                    term_embedding = self.term_embeddings[term]
-                    weight = self.vocab.get_term_importance_weight(term)
-                    
-                    domain_boost += term_embedding * weight
-                    total_weight += weight
+                # Domain term embeddinglerini weighted olarak ekle (tek gather + GEMV)
+                idx = np.fromiter((self._term_index[term] for term in detected_terms),
+                                  dtype=np.intp, count=len(detected_terms))
+                weights = self._term_weights[idx]
+                total_weight = weights.sum()
                 
                 if total_weight > 0:
-                    domain_boost = domain_boost / total_weight
+                    domain_boost = (weights @ self._term_matrix[idx]) / total_weight
                     
                     # Base embedding ile domain boost'u birleştir
                     alpha = 0.7  # Base embedding ağırlığı
@@ -157,7 +308,8 @@ class DefenseEmbeddingSystem:
                     enhanced_embedding = alpha * base_embedding + beta * domain_boost
                     
                     # Normalize et
-                    enhanced_embedding = enhanced_embedding / np.linalg.norm(enhanced_embedding)
+                    norm = math.sqrt(float(np.vdot(enhanced_embedding, enhanced_embedding)))
+                    enhanced_embedding = enhanced_embedding * (1.0 / (norm + 1e-12))
             
             return enhanced_embedding
             
@@ -165,14 +317,15 @@ class DefenseEmbeddingSystem:
             logger.error(f"Error enhancing embedding: {e}")
             return base_embedding
     
-    def encode_documents(self, documents: List[str]) -> np.ndarray:
-        """Dokümanları encode et"""
+    def encode_documents(self, documents: List[str], normalize_embeddings: bool = False) -> np.ndarray:
+        """Dokümanları encode et (normalize_embeddings=True ise L2 normlu)"""
         try:
             if not self.base_model:
                 raise Exception("Embedding model not initialized")
             
             # Batch encoding for efficiency
-            embeddings = self.base_model.encode(documents, show_progress_bar=True)
+            embeddings = self.base_model.encode(documents, show_progress_bar=True, convert_to_numpy=True,
+                                                normalize_embeddings=normalize_embeddings)
             return embeddings
             
         except Exception as e:
@@ -182,8 +335,28 @@ class DefenseEmbeddingSystem:
     def compute_similarity(self, query_embedding: np.ndarray, doc_embeddings: np.ndarray) -> np.ndarray:
         """Query ve doküman embeddingler arasında similarity hesapla"""
         try:
-            # Cosine similarity hesapla
-            similarities = cosine_similarity([query_embedding], doc_embeddings)[0]
+            # Cosine similarity: normalize query ile tek matris-vektör çarpımı,
+            # doküman normlarına bölerek (normalize kopya matris oluşturmadan)
+            doc_embeddings = np.asarray(doc_embeddings)
+            query_embedding = np.asarray(query_embedding, dtype=doc_embeddings.dtype)
+            
+            query_norm = math.sqrt(float(np.vdot(query_embedding, query_embedding)))
+            
+            # SimSIMD: CPU'nun SIMD komut setine göre seçilen cosine çekirdeği
+            if (SIMSIMD_AVAILABLE and query_norm > 0 and len(doc_embeddings)
+                    and doc_embeddings.dtype in (np.float32, np.float64)):
+                distances = simsimd.cdist(
+                    np.ascontiguousarray(query_embedding[np.newaxis]),
+                    np.ascontiguousarray(doc_embeddings),
+                    metric='cosine'
+                )
+                return (1 - np.asarray(distances)[0]).astype(doc_embeddings.dtype, copy=False)
+            
+            doc_norms = np.linalg.norm(doc_embeddings, axis=1)
+            # Sıfır vektörler 0 benzerlik alır (sklearn ile aynı)
+            doc_norms[doc_norms == 0] = 1
+            
+            similarities = (doc_embeddings @ (query_embedding / (query_norm or 1))) / doc_norms
             
             return similarities
             
@@ -203,22 +376,11 @@ class DefenseEmbeddingSystem:
             "domain_relevance": 0
         }
         
-        query_lower = query.lower()
-        
-        # Savunma terimlerini tespit et
-        for term in self.term_embeddings.keys():
-            if term in query_lower:
-                analysis["defense_terms"].append(term)
-        
-        # Teknik terimleri tespit et
-        for tech_term in self.vocab.technical_terms.keys():
-            if tech_term.lower() in query_lower:
-                analysis["technical_terms"].append(tech_term)
-        
-        # Kısaltmaları tespit et
-        for abbr in self.vocab.abbreviations.keys():
-            if abbr.lower() in query_lower:
-                analysis["abbreviations"].append(abbr)
+        # Savunma terimleri, teknik terimler ve kısaltmalar tek taramada
+        detected = self._detect_terms(query.lower())
+        analysis["defense_terms"] = detected["defense"]
+        analysis["technical_terms"] = detected["technical"]
+        analysis["abbreviations"] = detected["abbreviation"]
         
         # Complexity score hesapla
         word_count = len(query.split())
@@ -257,14 +419,86 @@ class DefenseEmbeddingSystem:
             self.term_embeddings = state.get("term_embeddings", {})
             self.boost_factors = state.get("boost_factors", {})
             self.turkish_optimization = state.get("turkish_optimization", True)
+            self._build_term_index()
             
             logger.info(f"Embedding system state loaded from {filepath}")
         except Exception as e:
             logger.error(f"Error loading system state: {e}")
 
+class EmbeddingBatcher:
+    """Eşzamanlı tekil embedding isteklerini tek bir batch encode çağrısında birleştir
+    
+    İstekler max_wait_ms penceresi dolana ya da max_batch_size'a ulaşana kadar
+    biriktirilir, ardından arka plan thread'i encode_batch'i bir kez çağırır.
+    Sonuç timeout_s içinde gelmezse embed TimeoutError fırlatır.
+    """
+    
+    def __init__(self, encode_batch: Callable[[List[str]], Any],
+                 max_batch_size: int = 64, max_wait_ms: float = 20,
+                 timeout_s: float = 30):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout_s
+        self._pending = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+    
+    def embed(self, text: str) -> np.ndarray:
+        """Tek metnin embedding'i (bir sonraki batch tamamlanınca döner)"""
+        future = Future()
+        self._ensure_worker()
+        self._pending.put((text, future))
+        return future.result(timeout=self.timeout)
+    
+    def _ensure_worker(self):
+        """Batch thread'ini ilk kullanımda başlat"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="EmbeddingBatcher", daemon=True
+                )
+                self._worker.start()
+    
+    def _run(self):
+        """Bekleyen istekleri toplayıp batch halinde encode et"""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            self._flush(batch)
+    
+    def _flush(self, batch: List[Tuple[str, Future]]):
+        """Batch'i encode et ve sonuçları bekleyenlere dağıt"""
+        try:
+            embeddings = self.encode_batch([text for text, _ in batch])
+            if len(embeddings) != len(batch):
+                raise ValueError(
+                    f"encode_batch returned {len(embeddings)} rows for {len(batch)} inputs"
+                )
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+        except Exception as e:
+            logger.error(f"Error encoding embedding batch: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
 class TurkishDefenseEmbedding(DefenseEmbeddingSystem):
     """Türkçe savunma sanayi için optimize edilmiş embedding sistemi"""
     
+    # Türkçe karakter -> ASCII karşılığı (str.translate tablosu)
+    _TR_TABLE = str.maketrans('ığüşöçİĞÜŞÖÇ', 'igusocIGUSOC')
+    
     def __init__(self):
         # Türkçe destekli model kullan
         super().__init__(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
@@ -282,17 +516,8 @@ class TurkishDefenseEmbedding(DefenseEmbeddingSystem):
     
     def _preprocess_turkish_text(self, text: str) -> str:
         """Türkçe text preprocessing"""
-        # Türkçe karakterleri normalize et
-        turkish_chars = {
-            'ı': 'i', 'ğ': 'g', 'ü': 'u', 'ş': 's', 'ö': 'o', 'ç': 'c',
-            'İ': 'I', 'Ğ': 'G', 'Ü': 'U', 'Ş': 'S', 'Ö': 'O', 'Ç': 'C'
-        }
-        
-        normalized = text
-        for tr_char, en_char in turkish_chars.items():
-            normalized = normalized.replace(tr_char, en_char)
-        
-        return normalized.lower().strip()
+        # Türkçe karakterleri tek geçişte normalize et
+        return text.translate(self._TR_TABLE).lower().strip()
 
 def test_defense_embedding_system():
     """Defense embedding sistemini test et"""
@@ -335,7 +560,7 @@ def test_defense_embedding_system():
     print(f"Query: {query}")
     print(f"Normal embedding shape: {normal_embedding.shape}")
     print(f"Enhanced embedding shape: {enhanced_embedding.shape}")
-    print(f"Similarity between normal and enhanced: {cosine_similarity([normal_embedding], [enhanced_embedding])[0][0]:.3f}")
+    print(f"Similarity between normal and enhanced: {embedding_system.compute_similarity(enhanced_embedding, [normal_embedding])[0]:.3f}")
 
 if __name__ == "__main__":
     test_defense_embedding_system()
\ No newline at end of file
@@ -1,21 +1,55 @@
 import argparse
+import functools
+import hashlib
 import json
 import os
 import pickle
 import logging
-from typing import List, Dict, Any
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
 import numpy as np
 from tqdm import tqdm
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 from faiss_optimizer import faiss_optimizer
 
 # Domain-specific embedding sistemi
-from domain_embeddings import TurkishDefenseEmbedding
+from domain_embeddings import TurkishDefenseEmbedding, EmbeddingBatcher, select_device
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
 
+# Süreç genelinde paylaşılan domain embedding sistemi (model ve term embeddingleri tek kez yüklenir)
+_domain_system: Optional[TurkishDefenseEmbedding] = None
+_domain_system_lock = threading.Lock()
+
+
+def _get_domain_system() -> Optional[TurkishDefenseEmbedding]:
+    """Başlatılmış paylaşılan sistemi döndür; başlatma başarısızsa None (sonraki çağrı yeniden dener)"""
+    global _domain_system
+    if _domain_system is None:
+        with _domain_system_lock:
+            if _domain_system is None:
+                embedding_system = TurkishDefenseEmbedding()
+                if embedding_system.initialize():
+                    _domain_system = embedding_system
+    return _domain_system
+
+
 def _import_faiss():
     try:
         import faiss
@@ -32,49 +66,240 @@ def _import_sentence_transformer():
         raise ImportError("sentence-transformers is required for embeddings: " + str(e))
 
 
-def build_index(chunks_path: str, index_path: str, meta_path: str, model_name: str = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2', batch_size: int = 64, use_domain_embedding: bool = True):
+def _loads_chunk(line: bytes) -> Dict[str, Any]:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass  # ör. eşi olmayan surrogate kaçışları; stdlib json kabul ediyor
+    return json.loads(line)
+
+
+def _load_chunks(chunks_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """JSONL chunk dosyasını tek okumada ayrıştır: (metinler, metadata)"""
+    with open(chunks_path, 'rb') as f:
+        rows = [_loads_chunk(line) for line in f.read().splitlines() if line.strip()]
+    texts = [j.get('text', '') for j in rows]
+    metas = [{'file_path': j.get('file_path'), 'meta': j.get('meta', {})} for j in rows]
+    return texts, metas
+
+
+def _dumps_meta(meta: Dict[str, Any]) -> str:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(meta).decode('utf-8')
+    return json.dumps(meta, ensure_ascii=False)
+
+
+def columnar_meta_path(meta_path: str) -> str:
+    """Pickle metadata'nın yanındaki Parquet kopyasının yolu"""
+    return meta_path + '.parquet'
+
+
+def _write_columnar_meta(path: str, metas: List[Dict[str, Any]], common: Dict[str, Any]):
+    """file_path / meta_json kolonları; tüm satırlarda aynı olan alanlar şema metadata'sında"""
+    table = pa.table({
+        'file_path': pa.array([m['file_path'] for m in metas], type=pa.string()),
+        'meta_json': pa.array([_dumps_meta(m['meta']) for m in metas], type=pa.string()),
+    })
+    table = table.replace_schema_metadata({'common': json.dumps(common)})
+    pq.write_table(table, path)
+
+
+class ColumnarMetadata:
+    """Parquet metadata tablosu üzerinde liste gibi davranan salt-okunur görünüm
+
+    metas[i] sadece istenen satırı dict'e çevirir; load sırasında tüm liste Python
+    nesnelerine açılmaz ve tablo memory-map ile okunur.
+    """
+
+    def __init__(self, path: str):
+        table = pq.read_table(path, memory_map=True)
+        self._file_paths = table.column('file_path')
+        self._meta_json = table.column('meta_json')
+        self._common = json.loads((table.schema.metadata or {}).get(b'common', b'{}'))
+
+    def __len__(self) -> int:
+        return len(self._file_paths)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            # Liste dilimi gibi: satırlar dict listesi olarak döner
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = int(idx)
+        return {
+            'file_path': self._file_paths[idx].as_py(),
+            'meta': _loads_chunk(self._meta_json[idx].as_py()),
+            **self._common
+        }
+
+
+class EmbeddingCache:
+    """Chunk embedding'lerini metin hash'ine göre SQLite'ta saklar
+
+    Yeniden index kurulurken sadece değişen/yeni chunk'lar encode edilir. Model
+    değişirse (meta satırı) önbellek temizlenir; build sonunda index'te olmayan
+    hash'ler retain ile silinir.
+    """
+
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, path: str, model_key: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS emb_cache (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS emb_cache_meta (key TEXT PRIMARY KEY, value TEXT)')
+        row = self.conn.execute("SELECT value FROM emb_cache_meta WHERE key = 'model'").fetchone()
+        if row is None or row[0] != model_key:
+            self.conn.execute('DELETE FROM emb_cache')
+            self.conn.execute("INSERT OR REPLACE INTO emb_cache_meta (key, value) VALUES ('model', ?)", (model_key,))
+        self.conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def get_many(self, hashes: Iterable[bytes]) -> Iterator[Tuple[bytes, np.ndarray]]:
+        """Önbellekte bulunan (hash, float32 vektör) çiftleri"""
+        hashes = list(hashes)
+        for i in range(0, len(hashes), self.LOOKUP_CHUNK):
+            chunk = hashes[i:i + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for h, vec in self.conn.execute(f'SELECT hash, vec FROM emb_cache WHERE hash IN ({placeholders})', chunk):
+                yield h, np.frombuffer(vec, dtype=np.float32)
+
+    def put_many(self, items: Iterable[Tuple[bytes, np.ndarray]]):
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO emb_cache (hash, vec) VALUES (?, ?)',
+            [(h, np.asarray(vec, dtype=np.float32).tobytes()) for h, vec in items]
+        )
+        self.conn.commit()
+
+    def retain(self, hashes: Iterable[bytes]):
+        """Verilen hash'ler dışındaki kayıtları sil (korpustan çıkan chunk'lar)"""
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS emb_keep (hash BLOB PRIMARY KEY)')
+        self.conn.execute('DELETE FROM emb_keep')
+        self.conn.executemany('INSERT OR IGNORE INTO emb_keep (hash) VALUES (?)', ((h,) for h in hashes))
+        self.conn.execute('DELETE FROM emb_cache WHERE hash NOT IN (SELECT hash FROM emb_keep)')
+        self.conn.execute('DELETE FROM emb_keep')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivfpq')
+
+
+def _create_index(faiss, embeddings: np.ndarray, index_type: str = 'flat'):
+    """Inner-product (cosine) index: exact flat, HNSW graph or PQ-compressed IVF
+
+    Search parameters (efSearch / nprobe) are set here; faiss stores them in the
+    index file, so load_index restores them with the index.
+    """
+    n, dim = embeddings.shape
+
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        return index
+
+    if index_type == 'ivfpq':
+        # sqrt heuristic for the list count; PQ needs 256 training points per sub-quantizer
+        nlist = min(4096, max(1, int(4 * n ** 0.5)))
+        if n < max(256, nlist):
+            logging.warning(f"IVFPQ needs at least {max(256, nlist)} vectors, got {n}; using flat index")
+            return faiss.IndexFlatIP(dim)
+        m = next(m for m in (16, 12, 8, 6, 4, 3, 2, 1) if dim % m == 0)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        # Train on a sample of at most 64k vectors
+        sample = embeddings
+        if n > 65536:
+            sample = embeddings[np.random.default_rng(0).choice(n, 65536, replace=False)]
+        index.train(sample)
+        index.nprobe = min(nlist, 16)
+        return index
+
+    return faiss.IndexFlatIP(dim)
+
+
+def build_index(chunks_path: str, index_path: str, meta_path: str, model_name: str = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2', batch_size: int = 64, use_domain_embedding: bool = True, cache_path: Optional[str] = None, index_type: str = 'flat'):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
     os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
     os.makedirs(os.path.dirname(meta_path) or '.', exist_ok=True)
 
     # Domain-specific embedding sistemi kullan
     if use_domain_embedding:
         logging.info("Using Turkish Defense Domain-Specific Embedding System")
-        embedding_system = TurkishDefenseEmbedding()
-        if not embedding_system.initialize():
+        embedding_system = _get_domain_system()
+        if embedding_system is None:
             logging.error("Failed to initialize domain embedding system, falling back to base model")
             use_domain_embedding = False
     
     if not use_domain_embedding:
         logging.info(f"Using base embedding model: {model_name}")
         SentenceTransformer = _import_sentence_transformer()
-        model = SentenceTransformer(model_name)
+        device = select_device()
+        model = SentenceTransformer(model_name, device=device)
+        if device == 'cuda':
+            model.half()
 
-    texts = []
-    metas = []
-    with open(chunks_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            j = json.loads(line)
-            texts.append(j.get('text', ''))
-            metas.append({'file_path': j.get('file_path'), 'meta': j.get('meta', {})})
+    texts, metas = _load_chunks(chunks_path)
 
     if not texts:
         print('No chunks found in', chunks_path)
         return
 
-    embeds = []
-    for i in tqdm(range(0, len(texts), batch_size), desc='Embedding'):
-        batch = texts[i:i + batch_size]
-        
-        if use_domain_embedding:
-            # Domain-specific embedding kullan
-            emb = embedding_system.encode_documents(batch)
-        else:
-            # Base model kullan
-            emb = model.encode(batch, show_progress_bar=False, convert_to_numpy=True)
-        
-        embeds.append(emb)
-    
-    embeddings = np.vstack(embeds).astype('float32')
+    # Metin hash'i -> chunk satırları (aynı metin tek kez encode edilir)
+    rows_by_hash = {}
+    for row, text in enumerate(texts):
+        rows_by_hash.setdefault(EmbeddingCache.text_hash(text), []).append(row)
+    corpus_hashes = list(rows_by_hash)
+
+    # Önbellek index başına tutulur; build sonunda bu korpusta olmayan kayıtlar silinir
+    embedding_model = embedding_system.model_name if use_domain_embedding else model_name
+    cache = EmbeddingCache(cache_path or os.path.splitext(index_path)[0] + '.emb_cache.sqlite',
+                           embedding_model)
+    embeddings = None
+    try:
+        # Boyut ilk vektörden; tüm korpus tek float32 diziye yerinde yazılır (vstack kopyası yok)
+        for h, vec in cache.get_many(list(rows_by_hash)):
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vec.shape[0]), dtype=np.float32)
+            embeddings[rows_by_hash.pop(h)] = vec
+
+        missing = list(rows_by_hash.items())
+        logging.info(f"Embedding cache: {len(texts) - sum(len(rows) for _, rows in missing)} chunks cached, "
+                     f"{len(missing)} texts to encode")
+
+        for i in tqdm(range(0, len(missing), batch_size), desc='Embedding'):
+            batch = missing[i:i + batch_size]
+            batch_texts = [texts[rows[0]] for _, rows in batch]
+
+            if use_domain_embedding:
+                # Domain-specific embedding kullan
+                emb = embedding_system.encode_documents(batch_texts, normalize_embeddings=True)
+            else:
+                # Base model kullan
+                emb = model.encode(batch_texts, batch_size=batch_size, show_progress_bar=False,
+                                   convert_to_numpy=True, normalize_embeddings=True)
+
+            # np.empty satırları doldurulmadan index'e girmesin: hatalı batch'te dur
+            emb = np.asarray(emb)
+            dim = emb.shape[1] if emb.ndim == 2 else None
+            if (emb.ndim != 2 or emb.shape[0] != len(batch) or
+                    (embeddings is not None and dim != embeddings.shape[1])):
+                raise ValueError(f"Embedding batch has shape {emb.shape}, expected "
+                                 f"({len(batch)}, {embeddings.shape[1] if embeddings is not None else 'dim'})")
+            if embeddings is None:
+                embeddings = np.empty((len(texts), dim), dtype=np.float32)
+            for (_, rows), vec in zip(batch, emb):
+                embeddings[rows] = vec
+            cache.put_many((h, vec) for (h, _), vec in zip(batch, emb))
+        cache.retain(corpus_hashes)
+    finally:
+        cache.close()
     
     # Domain embedding sistemi bilgisini metadata'ya ekle
     enhanced_metas = []
@@ -84,27 +309,123 @@ def build_index(chunks_path: str, index_path: str, meta_path: str, model_name: s
         enhanced_meta['embedding_model'] = model_name if not use_domain_embedding else "TurkishDefenseEmbedding"
         enhanced_metas.append(enhanced_meta)
 
-    # Normalize to use inner product as cosine similarity
+    # Embeddings are L2-normalized by the encoder, so inner product is cosine similarity
     faiss = _import_faiss()
-    faiss.normalize_L2(embeddings)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
+    index = _create_index(faiss, embeddings, index_type)
     index.add(embeddings)
 
-    faiss.write_index(index, index_path)
+    # New file + rename: readers that memory-mapped the old index keep a valid mapping
+    faiss.write_index(index, index_path + '.tmp')
+    os.replace(index_path + '.tmp', index_path)
+    # Pickle stays the canonical format (faiss_optimizer / enterprise_search read it directly)
     with open(meta_path, 'wb') as mf:
         pickle.dump(enhanced_metas, mf)
+    if PYARROW_AVAILABLE:
+        _write_columnar_meta(columnar_meta_path(meta_path), metas, {
+            'domain_embedding': use_domain_embedding,
+            'embedding_model': model_name if not use_domain_embedding else "TurkishDefenseEmbedding"
+        })
 
     print('Index saved to', index_path)
     print('Metadata saved to', meta_path)
 
 
 def load_index(index_path: str, meta_path: str):
+    """(index, metadata), shared per process until either file is rebuilt
+
+    Both are shared by every caller: metadata is a read-only sequence (tuple or
+    ColumnarMetadata) and the index is opened read-only.
+    """
+    return _cached_load(index_path, os.path.getmtime(index_path), meta_path, os.path.getmtime(meta_path))
+
+
+def _read_index_mapped(faiss, index_path: str):
+    """Index'i mümkünse memory-map ile oku (sayfalar OS page cache'ten, süreçler arası paylaşılır)
+
+    IO_FLAG_MMAP_IFC flat/HNSW vektör kodlarını, IO_FLAG_MMAP IVF ters listelerini
+    map eder; IVF ikisini birlikte kabul etmediği için sırayla denenir.
+    """
+    mmap_flags = (faiss.IO_FLAG_MMAP | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0), faiss.IO_FLAG_MMAP)
+    for flags in dict.fromkeys(mmap_flags):
+        try:
+            return faiss.read_index(index_path, flags | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            error = e
+    logging.warning(f"Memory-mapped index load failed, reading into memory: {error}")
+    return faiss.read_index(index_path)
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_load(index_path: str, index_mtime: float, meta_path: str, meta_mtime: float):
     faiss = _import_faiss()
-    index = faiss.read_index(index_path)
+    index = _read_index_mapped(faiss, index_path)
+
+    # Columnar copy written by the same build: memory-mapped, rows decoded on access
+    columnar_path = columnar_meta_path(meta_path)
+    if (PYARROW_AVAILABLE and os.path.exists(columnar_path)
+            and os.path.getmtime(columnar_path) >= os.path.getmtime(meta_path)):
+        return index, ColumnarMetadata(columnar_path)
+
     with open(meta_path, 'rb') as mf:
         metas = pickle.load(mf)
-    return index, metas
+    return index, tuple(metas)
+
+
+def _format_hits(scores: np.ndarray, ids: np.ndarray, metas) -> List[Dict[str, Any]]:
+    results = []
+    for score, idx in zip(scores, ids):
+        if idx < 0 or idx >= len(metas):
+            continue
+        m = metas[idx]
+        results.append({'score': float(score), 'file_path': m.get('file_path'), 'meta': m.get('meta')})
+    return results
+
+
+class QueryBatcher:
+    """Eşzamanlı domain search isteklerini tek encode + tek index.search çağrısında birleştir
+    
+    Biriktirme EmbeddingBatcher ile yapılır (max_wait_ms penceresi / max_batch_size);
+    her istek kendi satırının sonuçlarını alır.
+    """
+    
+    def __init__(self, index_path: str, meta_path: str, top_k: int = 5,
+                 max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.top_k = top_k
+        self._batcher = EmbeddingBatcher(self._search_batch, max_batch_size=max_batch_size,
+                                         max_wait_ms=max_wait_ms)
+    
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        return self._batcher.embed(query)
+    
+    def _search_batch(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        embedding_system = _get_domain_system()
+        if embedding_system is None:
+            raise RuntimeError("Domain embedding system is not available")
+        q_embs = np.ascontiguousarray(
+            embedding_system.encode_queries(queries, enhance_domain_terms=True), dtype='float32'
+        )
+        faiss = _import_faiss()
+        faiss.normalize_L2(q_embs)
+        
+        index, metas = load_index(self.index_path, self.meta_path)
+        D, I = index.search(q_embs, self.top_k)
+        return [_format_hits(D[row], I[row], metas) for row in range(len(queries))]
+
+
+# (index_path, meta_path, top_k) başına bir batcher; aynı batch'teki sorgular aynı index'i arar
+_query_batchers: Dict[Tuple[str, str, int], QueryBatcher] = {}
+_query_batchers_lock = threading.Lock()
+
+
+def _get_query_batcher(index_path: str, meta_path: str, top_k: int) -> QueryBatcher:
+    key = (index_path, meta_path, top_k)
+    with _query_batchers_lock:
+        batcher = _query_batchers.get(key)
+        if batcher is None:
+            batcher = _query_batchers[key] = QueryBatcher(index_path, meta_path, top_k)
+        return batcher
 
 
 def search(index_path: str, meta_path: str, query: str, model_name: str = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2', top_k: int = 5, use_domain_embedding: bool = True):
@@ -132,18 +453,14 @@ def search(index_path: str, meta_path: str, query: str, model_name: str = 'sente
         # Domain-specific search implementation
         if use_domain_embedding:
             logging.info("Using Turkish Defense Domain-Specific Search")
-            embedding_system = TurkishDefenseEmbedding()
-            if embedding_system.initialize():
+            embedding_system = _get_domain_system()
+            if embedding_system is not None:
                 # Analyze query first
                 query_analysis = embedding_system.analyze_query_complexity(query)
                 logging.info(f"Query analysis: Domain relevance: {query_analysis['domain_relevance']:.2f}")
                 
-                # Enhanced query encoding
-                q_emb = embedding_system.encode_query(query, enhance_domain_terms=True)
-                q_emb = q_emb.astype('float32').reshape(1, -1)
-                
-                faiss = _import_faiss()
-                faiss.normalize_L2(q_emb)
+                # Enhanced query encoding + search, batched with concurrent requests
+                return _get_query_batcher(index_path, meta_path, top_k).search(query)
             else:
                 logging.warning("Domain embedding failed, using base model")
                 use_domain_embedding = False
@@ -158,13 +475,7 @@ def search(index_path: str, meta_path: str, query: str, model_name: str = 'sente
 
         index, metas = load_index(index_path, meta_path)
         D, I = index.search(q_emb, top_k)
-        results = []
-        for score, idx in zip(D[0], I[0]):
-            if idx < 0 or idx >= len(metas):
-                continue
-            m = metas[idx]
-            results.append({'score': float(score), 'file_path': m.get('file_path'), 'meta': m.get('meta')})
-        return results
+        return _format_hits(D[0], I[0], metas)
 
 def search_batch(queries: List[str], index_path: str = './data/faiss.index', 
                 meta_path: str = './data/meta.pkl', top_k: int = 5) -> List[List[Dict]]:
@@ -190,6 +501,7 @@ if __name__ == '__main__':
     p_build.add_argument('--meta', required=True, help='Output metadata (pickle) path')
     p_build.add_argument('--model', default='sentence-transformers/paraphrase-multilingual-mpnet-base-v2')
     p_build.add_argument('--domain-embedding', action='store_true', help='Use Turkish Defense Domain-Specific Embedding')
+    p_build.add_argument('--index-type', choices=INDEX_TYPES, default='flat', help='flat (exact), hnsw or ivfpq (approximate)')
 
     p_search = sub.add_parser('search')
     p_search.add_argument('--index', required=True)
@@ -202,7 +514,8 @@ if __name__ == '__main__':
     args = parser.parse_args()
     if args.cmd == 'build':
         build_index(args.chunks, args.index, args.meta, model_name=args.model, 
-                   use_domain_embedding=getattr(args, 'domain_embedding', False))
+                   use_domain_embedding=getattr(args, 'domain_embedding', False),
+                   index_type=args.index_type)
     elif args.cmd == 'search':
         res = search(args.index, args.meta, args.query, model_name=args.model, top_k=args.topk,
                     use_domain_embedding=getattr(args, 'domain_embedding', False))
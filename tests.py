@@ -358,7 +358,8 @@ class TestPerformance(TestBase):
         
     def test_database_performance(self):
         """Test database operation performance"""
-        from database_optimizer import db_optimizer
+        from database_optimizer import get_db_optimizer
+        db_optimizer = get_db_optimizer()
         
         # Test query performance
         start_time = time.time()
@@ -486,6 +487,683 @@ class SecurityPenetrationTests(TestBase):
         # For now, just ensure the function handles it gracefully
         self.assertIsNone(result)
 
+class TestDatabaseOptimizer(unittest.TestCase):
+    """DatabaseOptimizer read/write routing"""
+    
+    def setUp(self):
+        from database_optimizer import DatabaseOptimizer
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseOptimizer(os.path.join(self.temp_dir.name, 'test.db'), pool_size=2)
+        self.db.execute_query("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    
+    def tearDown(self):
+        self.db.close_pool()
+        self.temp_dir.cleanup()
+    
+    def test_writes_run_immediately(self):
+        """INSERT/UPDATE/DELETE execute without consuming a result and return rowcount"""
+        self.assertEqual(self.db.execute_query("INSERT INTO items (name) VALUES (?)", ('a',)), 1)
+        self.assertEqual(self.db.execute_query("INSERT INTO items (name) VALUES (?)", ('b',)), 1)
+        self.assertEqual(self.db.execute_query("UPDATE items SET name = 'c'"), 2)
+        
+        row = self.db.execute_query("SELECT COUNT(*) AS n FROM items", fetch_one=True)
+        self.assertEqual(row, {'n': 2})
+        
+        self.assertEqual(self.db.execute_query("DELETE FROM items WHERE id = ?", (1,)), 1)
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) AS n FROM items", fetch_one=True)['n'], 1)
+    
+    def test_reads(self):
+        """SELECT returns Rows by default, dicts with dict_list and None on error"""
+        self.db.execute_query("INSERT INTO items (name) VALUES (?)", ('a',))
+        
+        rows = [dict(row) for row in self.db.execute_query("SELECT id, name FROM items")]
+        self.assertEqual(rows, [{'id': 1, 'name': 'a'}])
+        self.assertEqual(self.db.execute_query("SELECT id, name FROM items", fetch_mode='dict_list'), rows)
+        self.assertIsNone(self.db.execute_query("SELECT id FROM items WHERE id = 99", fetch_one=True))
+        
+        self.assertIsNone(self.db.execute_query("SELECT missing FROM items"))
+        self.assertEqual(self.db.execute_query("INSERT INTO items (name) VALUES (?)", ('b',)), 1)
+    
+    def test_instances_share_one_slow_query_thread(self):
+        """Creating optimizers does not start a logging thread per instance"""
+        from database_optimizer import DatabaseOptimizer
+        
+        before = threading.active_count()
+        extra = [DatabaseOptimizer(os.path.join(self.temp_dir.name, f'extra{i}.db'), pool_size=1)
+                 for i in range(3)]
+        for db in extra:
+            db.close_pool()
+        self.assertEqual(threading.active_count(), before)
+    
+    def test_optimize_database_runs_full_maintenance(self):
+        """optimize_database keeps VACUUM; the schedule runs incremental_optimize"""
+        from database_optimizer import DatabaseOptimizer
+        
+        with patch.object(self.db, '_run_maintenance') as run:
+            self.db.optimize_database()
+        commands = [command for call in run.call_args_list for command in call[0][0]]
+        self.assertEqual(commands, ["PRAGMA optimize", "VACUUM", "REINDEX", "ANALYZE"])
+        
+        ran = threading.Event()
+        with patch.object(DatabaseOptimizer, 'incremental_optimize', side_effect=lambda: ran.set()):
+            scheduled = DatabaseOptimizer(os.path.join(self.temp_dir.name, 'scheduled.db'),
+                                          pool_size=1, maintenance_interval=0.01)
+            self.assertTrue(ran.wait(2))
+            scheduled.close_pool()
+    
+    def test_cte_writes_use_writer(self):
+        """WITH ... INSERT is routed to the writer, not the read-only pool"""
+        inserted = self.db.execute_query(
+            "WITH names(name) AS (VALUES ('a'), ('b')) INSERT INTO items (name) SELECT name FROM names"
+        )
+        self.assertEqual(inserted, 2)
+        self.assertEqual(self.db.execute_query(
+            "WITH n AS (SELECT COUNT(*) AS n FROM items) SELECT n FROM n", fetch_one=True), {'n': 2})
+    
+    def test_get_connection_keeps_implicit_transactions(self):
+        """Legacy get_connection() callers still commit or roll back their own transaction"""
+        with self.db.get_connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            conn.rollback()
+            conn.execute("INSERT INTO items (name) VALUES ('b')")
+            conn.commit()
+        
+        rows = self.db.execute_query("SELECT name FROM items", fetch_mode='dict_list')
+        self.assertEqual(rows, [{'name': 'b'}])
+    
+    def test_readers_return_to_pool_across_threads(self):
+        """Each thread's reader goes back to the shared pool after the query"""
+        idle = self.db._readers.qsize()
+        
+        for _ in range(3):
+            worker = threading.Thread(target=lambda: list(self.db.execute_query("SELECT id FROM items")))
+            worker.start()
+            worker.join()
+        
+        self.assertEqual(self.db._readers.qsize(), idle)
+    
+    def test_user_documents_use_latest_insight(self):
+        """Both insight columns come from the same, most recent insight row"""
+        import database_optimizer
+        
+        self.db.execute_query("""CREATE TABLE documents (id INTEGER PRIMARY KEY, user_id INTEGER,
+                                 file_type TEXT, upload_date TEXT)""")
+        self.db.execute_query("""CREATE TABLE document_insights (id INTEGER PRIMARY KEY, document_id INTEGER,
+                                 business_category TEXT, sentiment_score REAL, processed_at TEXT)""")
+        self.db.execute_query("INSERT INTO documents VALUES (1, 7, 'pdf', '2024-01-01')")
+        for category, score, processed_at in (('new', 0.9, '2024-02-01'), ('old', 0.1, '2024-01-01'),
+                                              ('tie', 0.5, '2024-02-01')):
+            self.db.execute_query("""INSERT INTO document_insights
+                                     (document_id, business_category, sentiment_score, processed_at)
+                                     VALUES (1, ?, ?, ?)""", (category, score, processed_at))
+        
+        with patch('database_optimizer.get_db_optimizer', return_value=self.db):
+            rows = database_optimizer.get_optimized_user_documents(7)
+        
+        self.assertEqual(len(rows), 1)
+        self.assertIsInstance(rows[0], dict)
+        self.assertEqual((rows[0]['business_category'], rows[0]['sentiment_score']), ('tie', 0.5))
+
+class TestQueryOptimizer(unittest.TestCase):
+    """QueryOptimizer SQL assembly"""
+    
+    def test_search_term_uses_like_by_default(self):
+        """Without an FTS table the search term is a substring LIKE match"""
+        from database_optimizer import QueryOptimizer
+        
+        query, params = QueryOptimizer.add_search_conditions("SELECT * FROM bookmarks", 'port')
+        self.assertEqual(query, "SELECT * FROM bookmarks WHERE (query LIKE ? OR file_name LIKE ?)")
+        self.assertEqual(params, ('%port%', '%port%'))
+    
+    def test_filters_keep_order_and_accept_unhashable_values(self):
+        """Filter order is preserved and unhashable values bypass the memo cache"""
+        from database_optimizer import QueryOptimizer
+        
+        query, params = QueryOptimizer.add_search_conditions(
+            "SELECT * FROM documents", additional_filters={'user_id': 3, 'file_type': 'pdf'})
+        self.assertEqual(query, "SELECT * FROM documents WHERE user_id = ? AND file_type = ?")
+        self.assertEqual(params, (3, 'pdf'))
+        
+        query, params = QueryOptimizer.add_search_conditions(
+            "SELECT * FROM documents", additional_filters={'tags': ['a', 'b']})
+        self.assertEqual(query, "SELECT * FROM documents WHERE tags = ?")
+        self.assertEqual(params, (['a', 'b'],))
+    
+    def test_search_term_uses_given_fts_table(self):
+        """An FTS table opts into token-prefix matching on that table"""
+        from database_optimizer import QueryOptimizer
+        
+        query, params = QueryOptimizer.add_search_conditions(
+            "SELECT * FROM documents", 'rapor', fts_table='documents_fts', fts_column='filename')
+        self.assertEqual(query, "SELECT * FROM documents WHERE rowid IN "
+                                "(SELECT rowid FROM documents_fts WHERE filename MATCH ?)")
+        self.assertEqual(params, ('"rapor"*',))
+
+class TestConversationCache(unittest.TestCase):
+    """ConversationManager session/message caches"""
+    
+    def setUp(self):
+        from conversation_manager import ConversationManager
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = ConversationManager(os.path.join(self.temp_dir.name, 'chat.db'))
+        self.session_id = self.manager.create_session('user1', 'Test')
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_message_cache_invalidated_by_add(self):
+        """A cached message window is refreshed after a new message"""
+        self.manager.add_message(self.session_id, 'user1', 'user', 'first')
+        self.assertEqual([m.content for m in self.manager.get_session_messages(self.session_id, limit=5)], ['first'])
+        
+        self.manager.add_message(self.session_id, 'user1', 'assistant', 'second')
+        contents = [m.content for m in self.manager.get_session_messages(self.session_id, limit=5)]
+        self.assertEqual(sorted(contents), ['first', 'second'])
+    
+    def test_write_between_query_and_cache_is_not_masked(self):
+        """A message added after the SELECT but before caching must not leave a stale entry"""
+        manager = self.manager
+        cache_messages = manager._cache_messages
+        
+        def add_then_cache(*args):
+            manager.add_message(self.session_id, 'user1', 'user', 'late')
+            cache_messages(*args)
+        
+        with patch.object(manager, '_cache_messages', side_effect=add_then_cache):
+            self.assertEqual(manager.get_session_messages(self.session_id, limit=5), [])
+        self.assertEqual([m.content for m in manager.get_session_messages(self.session_id, limit=5)], ['late'])
+    
+    def test_session_cache_race(self):
+        """message_count is not served stale when a write races get_session"""
+        manager = self.manager
+        cache_session = manager._cache_session
+        
+        def add_then_cache(*args):
+            manager.add_message(self.session_id, 'user1', 'user', 'late')
+            cache_session(*args)
+        
+        with patch.object(manager, '_cache_session', side_effect=add_then_cache):
+            self.assertEqual(manager.get_session(self.session_id).message_count, 0)
+        self.assertEqual(manager.get_session(self.session_id).message_count, 1)
+
+class TestAnswerCache(unittest.TestCase):
+    """ConversationManager exact-match and semantic answer caches"""
+    
+    def setUp(self):
+        from conversation_manager import ConversationManager
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'chat.db')
+        self.manager = ConversationManager(self.db_path)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _count_rows(self, user_id):
+        import sqlite3
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM chat_semantic_cache WHERE user_id = ?',
+                                (user_id,)).fetchone()[0]
+    
+    def test_exact_match(self):
+        """Stored answers are found by exact query, also from a cold process"""
+        self.assertTrue(self.manager.store_answer('u1', 'radar menzili nedir', [1.0, 0.0, 0.0], 'cevap'))
+        self.assertEqual(self.manager.lookup_exact_answer('u1', 'radar menzili nedir')['answer'], 'cevap')
+        self.assertIsNone(self.manager.lookup_exact_answer('u2', 'radar menzili nedir'))
+        
+        from conversation_manager import ConversationManager
+        cold = ConversationManager(self.db_path)
+        self.assertEqual(cold.lookup_exact_answer('u1', 'radar menzili nedir')['answer'], 'cevap')
+    
+    def test_semantic_match(self):
+        """Close embeddings hit, distant embeddings and numeric queries miss"""
+        self.manager.store_answer('u1', 'radar menzili nedir', [1.0, 0.0, 0.0], 'cevap')
+        
+        hit = self.manager.lookup_cached_answer('u1', 'radarın menzili ne', [0.99, 0.05, 0.0])
+        self.assertEqual(hit['answer'], 'cevap')
+        self.assertGreater(hit['similarity'], 0.92)
+        self.assertIsNone(self.manager.lookup_cached_answer('u1', 'sonar nedir', [0.0, 1.0, 0.0]))
+        
+        self.assertFalse(self.manager.store_answer('u1', '2024 bütçesi', [1.0, 0.0, 0.0], 'x'))
+    
+    def test_expired_rows_pruned_per_user(self):
+        """store_answer prunes only the storing user's expired rows"""
+        self.manager.store_answer('u1', 'soru bir', [1.0, 0.0], 'a')
+        self.manager.store_answer('u2', 'soru iki', [1.0, 0.0], 'b')
+        
+        self.manager.semantic_cache_ttl = 0
+        time.sleep(0.01)
+        self.manager.store_answer('u1', 'soru uc', [0.0, 1.0], 'c')
+        
+        self.assertEqual(self._count_rows('u1'), 1)
+        self.assertEqual(self._count_rows('u2'), 1)
+    
+    def test_semantic_cache_user_limit(self):
+        """In-memory semantic buckets are capped by user count (LRU)"""
+        self.manager.semantic_cache_max_users = 2
+        for user_id in ('u1', 'u2', 'u1', 'u3'):
+            self.manager.lookup_cached_answer(user_id, 'radar', [1.0, 0.0])
+        self.assertEqual(list(self.manager._semantic_cache), ['u1', 'u3'])
+    
+    def test_invalidate_answer_cache(self):
+        """Corpus changes drop stored answers from memory and disk"""
+        self.manager.store_answer('u1', 'radar menzili nedir', [1.0, 0.0, 0.0], 'cevap')
+        self.manager.store_answer('u2', 'sonar nedir', [0.0, 1.0, 0.0], 'cevap')
+        
+        self.manager.invalidate_answer_cache()
+        
+        self.assertIsNone(self.manager.lookup_exact_answer('u1', 'radar menzili nedir'))
+        self.assertIsNone(self.manager.lookup_cached_answer('u2', 'sonar', [0.0, 1.0, 0.0]))
+        self.assertEqual(self._count_rows('u1') + self._count_rows('u2'), 0)
+    
+    def test_legacy_iso_rows_migrated(self):
+        """ISO text created_at values are converted to epoch microseconds"""
+        import sqlite3
+        from datetime import datetime
+        from conversation_manager import ConversationManager
+        
+        legacy_path = os.path.join(self.temp_dir.name, 'legacy.db')
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('''
+                CREATE TABLE chat_semantic_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, session_scope TEXT,
+                    query_type TEXT, query TEXT NOT NULL, embedding BLOB NOT NULL,
+                    answer TEXT NOT NULL, sources TEXT, created_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                INSERT INTO chat_semantic_cache (user_id, query_type, query, embedding, answer, sources, created_at)
+                VALUES ('u1', 'qa', 'radar', ?, 'cevap', '[]', ?)
+            ''', (bytes(8), datetime.now().isoformat()))
+        
+        ConversationManager(legacy_path)
+        with sqlite3.connect(legacy_path) as conn:
+            created_at, = conn.execute('SELECT created_at FROM chat_semantic_cache').fetchone()
+        self.assertIsInstance(created_at, int)
+        self.assertLess(abs(created_at / 1_000_000 - time.time()), 60)
+
+class TestClassificationRules(unittest.TestCase):
+    """Classification schema defaults and rule matching"""
+    
+    def setUp(self):
+        import sqlite3
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'users.db')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, role TEXT)")
+            conn.execute("INSERT INTO users (username, role) VALUES ('admin', 'admin')")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _counts(self):
+        import sqlite3
+        with sqlite3.connect(self.db_path) as conn:
+            return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                    for table in ('professional_categories', 'security_levels',
+                                  'classification_rules', 'user_permissions')}
+    
+    def test_schema_rerun_is_idempotent(self):
+        """Running the schema twice does not duplicate default rows"""
+        from document_classification_schema import create_classification_tables
+        
+        create_classification_tables(self.db_path)
+        first = self._counts()
+        self.assertEqual(first['classification_rules'], 8)
+        
+        create_classification_tables(self.db_path)
+        self.assertEqual(self._counts(), first)
+    
+    def test_best_match(self):
+        """The highest-scoring rule above its threshold wins"""
+        from classification_manager import ClassificationRuleSet
+        
+        rules = ClassificationRuleSet((
+            (1, '["bütçe", "gelir", "gider", "bilanço"]', 4, 2, 0.5, 'Finans', 'Sınırlı'),
+            (2, '["roket", "motor"]', 2, 2, 0.5, 'Mühendislik', 'Sınırlı'),
+            (3, 'sözleşme,dava', 5, 3, 0.8, 'Hukuk', 'Gizli'),
+        ))
+        
+        match = rules.best_match('Roket MOTOR testi ve bütçe planı')
+        self.assertEqual(match['rule_id'], 2)
+        self.assertEqual(match['confidence'], 1.0)
+        self.assertEqual(match['matched_keywords'], ['roket', 'motor'])
+        
+        match = rules.best_match('Yıllık bütçe ve gelir tablosu')
+        self.assertEqual((match['rule_id'], match['confidence']), (1, 0.5))
+        
+        # Below the legacy rule's 0.8 threshold
+        self.assertIsNone(rules.best_match('sözleşme taslağı'))
+        self.assertEqual(rules.best_match('sözleşme ve dava dosyası')['rule_id'], 3)
+    
+    def test_rules_from_schema(self):
+        """Default rules load from the database and classify a document"""
+        import sqlite3
+        from document_classification_schema import create_classification_tables
+        from classification_manager import ClassificationRuleSet
+        
+        create_classification_tables(self.db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('UPDATE classification_rules SET confidence_threshold = 0.3')
+            rules = ClassificationRuleSet.from_db(conn)
+        
+        self.assertEqual(len(rules.rules), 8)
+        match = rules.best_match('Roket motor tasarım çizim şema raporu')
+        self.assertEqual(match['category_name'], 'Mühendislik')
+    
+    def test_admin_grants_only_active_defaults(self):
+        """The admin grant skips user-added and deactivated categories"""
+        import sqlite3
+        from document_classification_schema import create_classification_tables
+        
+        create_classification_tables(self.db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DELETE FROM user_permissions')
+            conn.execute("INSERT INTO professional_categories (name) VALUES ('Özel Proje')")
+            conn.execute("UPDATE professional_categories SET is_active = 0 WHERE name = 'Üretim'")
+        
+        create_classification_tables(self.db_path)
+        with sqlite3.connect(self.db_path) as conn:
+            granted = {name for name, in conn.execute('''
+                SELECT DISTINCT pc.name FROM user_permissions up
+                JOIN professional_categories pc ON pc.id = up.category_id
+            ''')}
+            journal_mode, = conn.execute('PRAGMA journal_mode').fetchone()
+        
+        self.assertEqual(len(granted), 7)
+        self.assertNotIn('Özel Proje', granted)
+        self.assertNotIn('Üretim', granted)
+        self.assertNotEqual(journal_mode, 'wal')
+
+class TestDocumentInsights(unittest.TestCase):
+    """DocumentInsightsEngine analysis and persistence"""
+    
+    CONTENT = 'Bütçe raporu: gelir ve gider analizi. Acil olarak toplantı yapılmalı ve plan hazırlanmalı.'
+    
+    def setUp(self):
+        from document_insights import DocumentInsightsEngine
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'insights.db')
+        self.engine = DocumentInsightsEngine(db_path=self.db_path)
+    
+    def tearDown(self):
+        from document_insights import _close_thread_connections
+        _close_thread_connections()
+        self.temp_dir.cleanup()
+    
+    def test_analysis_has_no_db_side_effects(self):
+        """analyze_document_content is pure; it does not create or read the analysis table"""
+        import sqlite3
+        
+        analysis = self.engine.analyze_document_content('rapor.txt', self.CONTENT)
+        self.assertEqual(analysis['file_path'], 'rapor.txt')
+        with sqlite3.connect(self.db_path) as conn:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        self.assertEqual(tables, [])
+    
+    def test_analyze_and_save_reuses_unchanged_content(self):
+        """Stored analyses are reused only while the content hash matches"""
+        first = self.engine.analyze_and_save('rapor.txt', self.CONTENT)
+        self.assertEqual(self.engine.get_analysis_from_db('rapor.txt'), first)
+        
+        with patch.object(self.engine, 'analyze_document_content') as analyze:
+            self.assertEqual(self.engine.analyze_and_save('rapor.txt', self.CONTENT), first)
+            analyze.assert_not_called()
+        
+        changed = self.engine.analyze_and_save('rapor.txt', self.CONTENT + ' Ek madde.')
+        self.assertNotEqual(changed['content_hash'], first['content_hash'])
+    
+    def test_time_patterns_use_wall_clock(self):
+        """Timestamps with a UTC offset are bucketed by their written hour and date"""
+        from datetime import datetime
+        
+        conn = self.engine.get_db_connection()
+        conn.execute('CREATE TABLE search_logs (query TEXT, results_count INTEGER, timestamp DATETIME)')
+        conn.executemany('INSERT INTO search_logs VALUES (?, ?, ?)', [
+            ('radar', 1, '2025-01-06T01:30:00+03:00'),  # Monday 01:30 local, Sunday 22:30 UTC
+            ('radar', 1, '2025-01-06T01:45:00Z'),
+            ('radar', 1, '2025-01-06 01:50:00'),
+        ])
+        patterns = self.engine._analyze_time_patterns(conn.cursor(), datetime(2025, 1, 1))
+        
+        self.assertEqual(patterns['peak_hours'], [(1, 3)])
+        self.assertEqual(patterns['busy_days'], [('Monday', 3)])
+
+class TestEmbedIndex(unittest.TestCase):
+    """embed_index build/cache/search components"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.chunks_path = os.path.join(self.temp_dir.name, 'chunks.jsonl')
+        with open(self.chunks_path, 'w', encoding='utf-8') as f:
+            for i in range(6):
+                f.write(json.dumps({'text': f'chunk {i}', 'file_path': f'doc{i}.txt', 'meta': {'i': i}}) + '\n')
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def _path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+    
+    def test_build_index_rejects_failed_batch(self):
+        """A batch the encoder could not embed aborts the build instead of indexing garbage rows"""
+        import numpy as np
+        import embed_index
+        
+        embedding_system = Mock(model_name='test-model')
+        embedding_system.encode_documents.side_effect = [
+            np.ones((3, 4), dtype=np.float32),
+            np.array([]),
+        ]
+        faiss = Mock()
+        
+        with patch('embed_index._get_domain_system', return_value=embedding_system), \
+                patch('embed_index._import_faiss', return_value=faiss):
+            with self.assertRaises(ValueError):
+                embed_index.build_index(self.chunks_path, self._path('index'), self._path('meta.pkl'),
+                                        batch_size=3, use_domain_embedding=True)
+        faiss.write_index.assert_not_called()
+    
+    def test_embedding_cache_hit_miss_and_model_change(self):
+        """Cached vectors survive reopening and are dropped when the model changes"""
+        import numpy as np
+        from embed_index import EmbeddingCache
+        
+        cache_path = self._path('emb_cache.sqlite')
+        h1, h2 = EmbeddingCache.text_hash('bir'), EmbeddingCache.text_hash('iki')
+        
+        cache = EmbeddingCache(cache_path, 'model-a')
+        cache.put_many([(h1, np.array([1.0, 2.0], dtype=np.float32))])
+        cache.close()
+        
+        cache = EmbeddingCache(cache_path, 'model-a')
+        hits = dict(cache.get_many([h1, h2]))
+        cache.close()
+        self.assertEqual(list(hits), [h1])
+        np.testing.assert_array_equal(hits[h1], [1.0, 2.0])
+        
+        cache = EmbeddingCache(cache_path, 'model-b')
+        self.assertEqual(list(cache.get_many([h1, h2])), [])
+        cache.close()
+    
+    def test_build_index_reuses_cached_embeddings(self):
+        """A rebuild only encodes chunks missing from the cache"""
+        import numpy as np
+        import embed_index
+        
+        embedding_system = Mock(model_name='test-model')
+        embedding_system.encode_documents.side_effect = \
+            lambda texts, normalize_embeddings=False: np.ones((len(texts), 4), dtype=np.float32)
+        faiss = Mock()
+        faiss.write_index.side_effect = lambda index, path: open(path, 'wb').close()
+        
+        def build():
+            embed_index.build_index(self.chunks_path, self._path('index'), self._path('meta.pkl'),
+                                    batch_size=4, use_domain_embedding=True)
+        
+        with patch('embed_index._get_domain_system', return_value=embedding_system), \
+                patch('embed_index._import_faiss', return_value=faiss):
+            build()
+            self.assertEqual(embedding_system.encode_documents.call_count, 2)
+            
+            embedding_system.encode_documents.reset_mock()
+            build()
+            embedding_system.encode_documents.assert_not_called()
+            self.assertEqual(faiss.IndexFlatIP.return_value.add.call_args[0][0].shape, (6, 4))
+            
+            embedding_system.model_name = 'other-model'
+            build()
+            self.assertEqual(embedding_system.encode_documents.call_count, 2)
+    
+    def test_build_index_prunes_removed_chunks(self):
+        """Cache rows for chunks no longer in the corpus are deleted after a build"""
+        import sqlite3
+        import numpy as np
+        import embed_index
+        
+        embedding_system = Mock(model_name='test-model')
+        embedding_system.encode_documents.side_effect = \
+            lambda texts, normalize_embeddings=False: np.ones((len(texts), 4), dtype=np.float32)
+        faiss = Mock()
+        faiss.write_index.side_effect = lambda index, path: open(path, 'wb').close()
+        cache_path = self._path('emb_cache.sqlite')
+        
+        def build():
+            embed_index.build_index(self.chunks_path, self._path('index'), self._path('meta.pkl'),
+                                    use_domain_embedding=True, cache_path=cache_path)
+            with sqlite3.connect(cache_path) as conn:
+                return conn.execute('SELECT COUNT(*) FROM emb_cache').fetchone()[0]
+        
+        with patch('embed_index._get_domain_system', return_value=embedding_system), \
+                patch('embed_index._import_faiss', return_value=faiss):
+            self.assertEqual(build(), 6)
+            with open(self.chunks_path, 'w', encoding='utf-8') as f:
+                for i in range(4, 8):
+                    f.write(json.dumps({'text': f'chunk {i}', 'file_path': f'doc{i}.txt', 'meta': {}}) + '\n')
+            self.assertEqual(build(), 4)
+    
+    def test_query_batcher_results_per_caller(self):
+        """Concurrent queries share encode/search calls but each caller gets its own hits"""
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+        import embed_index
+        
+        queries = [f'query {i}' for i in range(8)]
+        embedding_system = Mock()
+        embedding_system.encode_queries.side_effect = lambda texts, enhance_domain_terms=True: \
+            np.eye(8, dtype=np.float32)[[queries.index(text) for text in texts]]
+        
+        class FlatIndex:
+            def search(self, q, k):
+                scores = q @ np.eye(8, dtype=np.float32).T
+                ids = np.argsort(-scores, axis=1)[:, :k]
+                return np.take_along_axis(scores, ids, axis=1), ids
+        
+        metas = tuple({'file_path': f'doc{i}.txt', 'meta': {'i': i}} for i in range(8))
+        batcher = embed_index.QueryBatcher('index', 'meta.pkl', top_k=1, max_wait_ms=200)
+        
+        with patch('embed_index._get_domain_system', return_value=embedding_system), \
+                patch('embed_index._import_faiss', return_value=Mock()), \
+                patch('embed_index.load_index', return_value=(FlatIndex(), metas)):
+            with ThreadPoolExecutor(len(queries)) as executor:
+                results = list(executor.map(batcher.search, queries))
+        
+        self.assertEqual([r[0]['file_path'] for r in results], [f'doc{i}.txt' for i in range(8)])
+        self.assertLess(embedding_system.encode_queries.call_count, len(queries))
+    
+    def test_embedding_batcher_failures_reach_callers(self):
+        """Short encoder results fail every caller and a stuck encoder times out"""
+        import threading
+        from concurrent.futures import TimeoutError
+        from domain_embeddings import EmbeddingBatcher
+        
+        batcher = EmbeddingBatcher(lambda texts: texts[:-1], max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.embed('soru')
+        
+        release = threading.Event()
+        stuck = EmbeddingBatcher(lambda texts: release.wait() and texts, max_wait_ms=1, timeout_s=0.05)
+        try:
+            with self.assertRaises(TimeoutError):
+                stuck.embed('soru')
+        finally:
+            release.set()
+    
+    def test_term_cache_separates_devices(self):
+        """Term embeddings cached on one device are not reused on another and are stored as float32"""
+        import numpy as np
+        from domain_embeddings import DefenseEmbeddingSystem
+        
+        system = DefenseEmbeddingSystem(term_cache_dir=self.temp_dir.name)
+        system.device = 'cuda'
+        system._save_term_cache(['radar'], np.ones((1, 4), dtype=np.float16))
+        self.assertEqual(system._load_term_cache(['radar'])[1].dtype, np.float32)
+        
+        system.device = 'cpu'
+        self.assertIsNone(system._load_term_cache(['radar']))
+    
+    def test_columnar_metadata_slices(self):
+        """ColumnarMetadata supports negative indexes and slices like the pickled list"""
+        import embed_index
+        if not embed_index.PYARROW_AVAILABLE:
+            self.skipTest('pyarrow is not installed')
+        
+        metas = [{'file_path': f'doc{i}.txt', 'meta': {'i': i}} for i in range(5)]
+        path = self._path('meta.parquet')
+        embed_index._write_columnar_meta(path, metas, {'domain_embedding': True})
+        columnar = embed_index.ColumnarMetadata(path)
+        
+        expected = [dict(m, domain_embedding=True) for m in metas]
+        self.assertEqual(columnar[-1], expected[-1])
+        self.assertEqual(columnar[1:4], expected[1:4])
+        self.assertEqual(columnar[::-2], expected[::-2])
+    
+    def test_load_index_is_cached_until_rebuild(self):
+        """load_index shares one read-only result per file version"""
+        import pickle
+        import embed_index
+        
+        index_path, meta_path = self._path('index'), self._path('meta.pkl')
+        with open(index_path, 'wb') as f:
+            f.write(b'index')
+        with open(meta_path, 'wb') as f:
+            pickle.dump([{'file_path': 'a.txt', 'meta': {}}], f)
+        
+        faiss = Mock(IO_FLAG_MMAP=1, IO_FLAG_MMAP_IFC=2, IO_FLAG_READ_ONLY=4)
+        faiss.read_index.side_effect = lambda path, flags=0: object()
+        embed_index._cached_load.cache_clear()
+        with patch('embed_index._import_faiss', return_value=faiss), \
+                patch('embed_index.PYARROW_AVAILABLE', False):
+            index, metas = embed_index.load_index(index_path, meta_path)
+            self.assertIsInstance(metas, tuple)
+            self.assertIs(embed_index.load_index(index_path, meta_path)[0], index)
+            self.assertTrue(faiss.read_index.call_args[0][1] & faiss.IO_FLAG_READ_ONLY)
+            
+            stat = os.stat(index_path)
+            os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            self.assertIsNot(embed_index.load_index(index_path, meta_path)[0], index)
+        embed_index._cached_load.cache_clear()
+
+class TestCreateTestPdfs(unittest.TestCase):
+    """Embedded test PDF stays in sync with its ReportLab source"""
+    
+    def test_blob_matches_reportlab_render(self):
+        """_PDF_BLOB is byte-identical to a fresh regenerate=True render"""
+        import base64
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest('reportlab is not installed')
+        import create_test_pdfs
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = os.path.join(temp_dir, 'test.pdf')
+            create_test_pdfs._render_test_pdf(pdf_path)
+            with open(pdf_path, 'rb') as f:
+                rendered = f.read()
+        
+        self.assertEqual(rendered, base64.b64decode(create_test_pdfs._PDF_BLOB),
+                         'create_test_pdfs._PDF_BLOB is stale; update it from create_test_pdf(regenerate=True)')
+
 # Performance benchmarks
 class PerformanceBenchmarks:
     """Performance benchmarking utilities"""
@@ -547,7 +1225,15 @@ def run_all_tests():
         TestSecurity,
         TestPerformance,
         TestIntegration,
-        SecurityPenetrationTests
+        SecurityPenetrationTests,
+        TestDatabaseOptimizer,
+        TestQueryOptimizer,
+        TestConversationCache,
+        TestAnswerCache,
+        TestClassificationRules,
+        TestDocumentInsights,
+        TestEmbedIndex,
+        TestCreateTestPdfs
     ]
     
     for test_class in test_classes:
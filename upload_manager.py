@@ -173,8 +173,7 @@ class FileUploadManager:
                     
                     # Perform document analysis
                     if content and len(content.strip()) > 50:  # Only analyze if substantial content
-                        analysis = insights_engine.analyze_document_content(filepath, content)
-                        insights_engine.save_analysis_to_db(analysis)
+                        insights_engine.analyze_and_save(filepath, content)
                         print(f"✨ Document analysis completed for: {filename}")
                         
                 except Exception as e: